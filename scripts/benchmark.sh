@@ -0,0 +1,4 @@
+#!/bin/sh -e
+set -x
+
+python scripts/benchmark/run.py "$@"
@@ -0,0 +1,61 @@
+"""
+Offline replacements of the cloud calls made by the provider modules.
+The real provider modules (and the platform SDKs) are still imported,
+so the import cost is measured, only the network round trips are skipped.
+"""
+
+from typing import Any, Dict, Final, Iterator, Tuple
+
+from pyclvm._common import providers
+
+_INSTANCES: Final[int] = 200
+
+_STATES: Final[Dict[str, Tuple[str, ...]]] = {
+    "AWS": ("running", "stopped", "pending"),
+    "GCP": ("RUNNING", "TERMINATED", "STAGING"),
+    "AZURE": ("VM running", "VM deallocated", "VM starting"),
+}
+
+_TARGETS: Final[Dict[str, Dict[str, Any]]] = {
+    "AWS": {
+        "instance_id": "i-00000000000000000",
+        "env": {
+            "AWS_ACCESS_KEY_ID": "benchmark",
+            "AWS_SECRET_ACCESS_KEY": "benchmark",
+            "AWS_SESSION_TOKEN": "benchmark",
+            "AWS_DEFAULT_REGION": "us-east-1",
+        },
+    },
+    "GCP": {"project": "benchmark", "zone": "us-central1-a"},
+    "AZURE": {"resource_group": "benchmark", "subscription": "benchmark"},
+}
+
+
+def _list_instances(cloud_platform: str, **kwargs: str) -> Tuple[str, Iterator]:
+    states = _STATES[cloud_platform]
+    return f"Benchmark {cloud_platform} Instances", (
+        (f"id-{i:05}", f"bench-{i}", states[i % len(states)]) for i in range(_INSTANCES)
+    )
+
+
+def _tunnel_target(cloud_platform: str, instance_name: str, **kwargs: str) -> Dict:
+    return _TARGETS[cloud_platform]
+
+
+def install() -> None:
+    """
+    Patches the provider registry, every provider module gets the fake calls
+    right after it is imported
+    """
+    get_provider = providers.get_provider
+
+    def _get_provider(cloud_platform: str):
+        module = get_provider(cloud_platform)
+        name = cloud_platform.upper()
+        module.list_instances = lambda **kwargs: _list_instances(name, **kwargs)
+        module.tunnel_target = lambda instance_name, **kwargs: _tunnel_target(
+            name, instance_name, **kwargs
+        )
+        return module
+
+    providers.get_provider = _get_provider
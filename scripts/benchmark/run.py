@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+"""
+Cold start benchmark of the clvm commands.
+
+Every case runs in a fresh interpreter, as a shell would run it, with the cloud calls
+replaced by offline fakes (see fake_provider.py). For each case the wall-clock time
+(median), the import time (`-X importtime`, median) and the peak RSS are recorded.
+The peak RSS comes from os.wait4, so the benchmark runs on Unix only.
+
+    python scripts/benchmark/run.py             # compare with baseline.json
+    python scripts/benchmark/run.py --update    # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import stat
+import statistics
+import sys
+import tempfile
+from importlib.util import find_spec
+from pathlib import Path
+from subprocess import DEVNULL, Popen
+from time import perf_counter
+from typing import Dict, Final, List, NamedTuple, Optional, Tuple
+
+_HERE: Final[Path] = Path(__file__).resolve().parent
+_BASELINE: Final[Path] = _HERE / "baseline.json"
+
+_ENTRY_POINTS: Final[Dict[str, str]] = {
+    "clvm": "pyclvm._clvm",
+    "clvm-proxy": "pyclvm._proxy",
+}
+
+# not shipped, see [tool.flit.sdist] in pyproject.toml
+_EXCLUDED: Final[Tuple[str, ...]] = ("jupyterlab", "web", "rdp.py")
+
+_METRICS: Final[Tuple[str, ...]] = ("wall_ms", "import_ms", "rss_mb")
+
+# regressions smaller than that are noise
+_MIN_DELTA: Final[Dict[str, float]] = {"wall_ms": 30, "import_ms": 30, "rss_mb": 5}
+
+# below that the start of the interpreter dominates, these cases get twice the delta
+_SMALL_MS: Final[float] = 100
+
+_BOOTSTRAP: Final = """
+import sys
+sys.path.insert(0, {here!r})
+import fake_provider
+fake_provider.install()
+sys.argv = {argv!r}
+from {module} import main
+main()
+"""
+
+
+class Case(NamedTuple):
+    name: str
+    argv: List[str]
+    exit_code: int = 0
+
+
+# ---
+def _find_commands(path: Path, group: Tuple[str, ...] = ()) -> List[Tuple[str, ...]]:
+    commands = []
+    for entry in sorted(path.iterdir()):
+        if entry.name.startswith("_") or entry.name in _EXCLUDED:
+            continue
+        if entry.is_dir() and (entry / "__init__.py").exists():
+            commands.extend(_find_commands(entry, (*group, entry.name)))
+        elif entry.suffix == ".py":
+            commands.append((*group, entry.stem))
+    return commands
+
+
+def _get_cases() -> List[Case]:
+    package = Path(find_spec("pyclvm").submodule_search_locations[0])
+    # --help makes dynacli discover and import the whole command group
+    cases = [Case("clvm --help", ["clvm", "--help"])]
+    cases.extend(
+        Case(f"clvm {' '.join(command)} --help", ["clvm", *command, "--help"])
+        for command in _find_commands(package)
+    )
+    cases.extend(
+        Case(f"clvm instance ls platform={name}", ["clvm", "instance", "ls"])
+        for name in ("AWS", "GCP", "AZURE", "all")
+    )
+    for case in cases[-4:]:
+        case.argv.append(case.name.rsplit(" ", 1)[-1])
+    # the scripts read the records, without rich
+    cases.append(
+        Case(
+            "clvm instance ls platform=AWS format=jsonl",
+            ["clvm", "instance", "ls", "platform=AWS", "format=jsonl"],
+        )
+    )
+    # ssh runs the ProxyCommand for every connection
+    cases.extend(
+        (
+            Case("clvm-proxy (usage)", ["clvm-proxy"], 2),
+            Case(
+                "clvm-proxy platform=AWS",
+                ["clvm-proxy", "bench-1", "22", "platform=AWS"],
+            ),
+            Case(
+                "clvm ssh start platform=AWS",
+                ["clvm", "ssh", "start", "bench-1", "22", "platform=AWS"],
+            ),
+        )
+    )
+    return cases
+
+
+# ---
+def _make_env(home: Path) -> Dict[str, str]:
+    # the tunnel commands end up in `aws ssm start-session`, fake it as well
+    bin_path = home / "bin"
+    bin_path.mkdir()
+    aws = bin_path / "aws"
+    aws.write_text("#!/bin/sh\nexit 0\n")
+    aws.chmod(aws.stat().st_mode | stat.S_IEXEC)
+    return {
+        **os.environ,
+        "HOME": str(home),
+        "USERPROFILE": str(home),
+        "PATH": f"{bin_path}{os.pathsep}{os.environ['PATH']}",
+        "CLVM_AGENT": "1",  # never forward to a running agent
+        "COLUMNS": "120",
+    }
+
+
+def _rss_mb(max_rss: int) -> float:
+    # kilobytes on Linux, bytes on macOS
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _run(
+    case: Case, env: Dict[str, str], log: Path, *options: str
+) -> Tuple[float, float]:
+    command = [
+        sys.executable,
+        *options,
+        "-c",
+        _BOOTSTRAP.format(
+            here=str(_HERE), argv=case.argv, module=_ENTRY_POINTS[case.argv[0]]
+        ),
+    ]
+    with log.open("w") as stderr:
+        started = perf_counter()
+        proc = Popen(command, env=env, stdin=DEVNULL, stdout=DEVNULL, stderr=stderr)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall_ms = (perf_counter() - started) * 1000
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != case.exit_code:
+        raise RuntimeError(log.read_text()[-2000:])
+    return wall_ms, _rss_mb(usage.ru_maxrss)
+
+
+def _parse_import_time(log: Path) -> Tuple[float, Dict[str, float]]:
+    total, top_level = 0, {}
+    for line in log.read_text().splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        total += int(self_us)
+        if not name.startswith("  "):
+            top_level[name.strip()] = round(int(cumulative_us) / 1000, 1)
+    top = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:10]
+    return round(total / 1000, 1), dict(top)
+
+
+def _import_time(case: Case, env: Dict[str, str], log: Path) -> Tuple[float, Dict]:
+    _run(case, env, log, "-X", "importtime")
+    return _parse_import_time(log)
+
+
+def _measure(case: Case, env: Dict[str, str], log: Path, repeat: int) -> Dict:
+    _run(case, env, log)  # warm up the bytecode cache
+    runs = [_run(case, env, log) for _ in range(repeat)]
+    # a single import time run varies by tens of ms, as much as the whole import
+    # of the lightest commands, the median run is kept
+    imports = sorted(
+        (_import_time(case, env, log) for _ in range(repeat)), key=lambda run: run[0]
+    )
+    import_ms, top_imports = imports[len(imports) // 2]
+    return {
+        "wall_ms": round(statistics.median(wall for wall, _ in runs), 1),
+        "import_ms": import_ms,
+        "rss_mb": round(max(rss for _, rss in runs), 1),
+        "top_imports": top_imports,
+    }
+
+
+# ---
+def _compare(
+    results: Dict, baseline: Dict, threshold: float
+) -> Tuple[List[str], Dict[str, str], List[str]]:
+    regressions, deltas, new_cases = [], {}, []
+    for name, result in results.items():
+        # a failed case fails the run, whether it has a baseline or not
+        if "error" in result:
+            regressions.append(f"{name}: failed, {result['error'].splitlines()[-1]}")
+            continue
+        expected = baseline.get(name)
+        if not expected:
+            new_cases.append(name)
+            continue
+        changes = []
+        for metric in _METRICS:
+            delta = result[metric] - expected[metric]
+            changes.append(f"{delta:+.0f}")
+            min_delta = _MIN_DELTA[metric] * (
+                2 if metric != "rss_mb" and expected[metric] < _SMALL_MS else 1
+            )
+            if delta > expected[metric] * threshold and delta > min_delta:
+                regressions.append(
+                    f"{name}: {metric} {expected[metric]} -> {result[metric]}"
+                )
+        deltas[name] = "/".join(changes)
+    return regressions, deltas, new_cases
+
+
+def _print_report(results: Dict, deltas: Dict[str, str]) -> None:
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  {'wall ms':>8}  {'import ms':>9}  {'rss MB':>7}  delta")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<{width}}  [ERROR] {result['error'].splitlines()[-1]}")
+            continue
+        print(
+            f"{name:<{width}}  {result['wall_ms']:>8}  {result['import_ms']:>9}"
+            f"  {result['rss_mb']:>7}  {deltas.get(name, '')}"
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="pattern", help="run the cases containing PATTERN")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative regression (default 0.2)",
+    )
+    parser.add_argument("--baseline", type=Path, default=_BASELINE)
+    parser.add_argument("--update", action="store_true", help="store the baseline")
+    return parser.parse_args()
+
+
+def main() -> Optional[int]:
+    args = _parse_args()
+    if not hasattr(os, "wait4"):
+        print("[ERROR] the benchmark needs os.wait4, it runs on Unix only")
+        return 1
+    baseline = (
+        json.loads(args.baseline.read_text())["cases"] if args.baseline.exists() else {}
+    )
+    results = {}
+    with tempfile.TemporaryDirectory() as home:
+        env = _make_env(Path(home))
+        for case in _get_cases():
+            if args.pattern and args.pattern not in case.name:
+                continue
+            print(f"[INFO] {case.name}", file=sys.stderr)
+            try:
+                results[case.name] = _measure(
+                    case, env, Path(home) / "stderr.log", args.repeat
+                )
+            except RuntimeError as err:
+                results[case.name] = {"error": str(err).strip() or "no output"}
+
+    regressions, deltas, new_cases = _compare(results, baseline, args.threshold)
+    _print_report(results, deltas)
+    if new_cases and not args.update:
+        print("[INFO] new cases, not in the baseline:", *new_cases, sep="\n  ")
+
+    if args.update:
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "platform": sys.platform,
+                    # the cases left out by -k keep their baseline
+                    "cases": {
+                        **baseline,
+                        **{
+                            name: result
+                            for name, result in results.items()
+                            if "error" not in result
+                        },
+                    },
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"[INFO] baseline stored to {args.baseline}")
+        return None
+
+    if regressions:
+        print("[ERROR] regressions:", *regressions, sep="\n  ")
+        return 1
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,9 @@ import sys
 
 from dynacli import main as dynamain
 
+from pyclvm._common.agent import forward
+from pyclvm._common.command_index import get_index, is_help_request, print_help, resolve
+
 cwd = os.path.dirname(os.path.realpath(__file__))
 
 
@@ -29,10 +32,29 @@ def _set_main_attrs(**kwargs):
         setattr(_main, key, val)
 
 
+def dispatch():
+    _set_main_attrs(**_map)
+    index = get_index(_map["__version__"])
+    args = sys.argv[1:]
+    names, entry = resolve(index, args)
+    if (entry is None or "commands" in entry) and is_help_request(names, args):
+        print_help(index, names, args)
+    elif entry and "module" in entry:
+        # dynacli starts from the command group, so it imports the command module only
+        group = len(names) - 1
+        sys.argv = [" ".join([sys.argv[0], *args[:group]]), *args[group:]]
+        dynamain(search_path, [entry["module"].rpartition(".")[0]])
+    else:
+        dynamain(search_path)
+
+
 # For package distro purposes
 def main():
-    _set_main_attrs(**_map)
-    dynamain(search_path)
+    code = forward(sys.argv)
+    if code is None:
+        dispatch()
+    else:
+        sys.exit(code)
 
 
 if __name__ == "__main__":
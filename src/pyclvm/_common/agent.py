@@ -0,0 +1,438 @@
+"""
+Local agent keeping authenticated cloud sessions warm between clvm invocations
+"""
+
+import io
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import traceback
+from contextlib import suppress
+from time import sleep, time
+from typing import IO, Any, Callable, Dict, Final, Iterable, List, Optional, Set, Tuple
+
+from .providers import (
+    expire_listings,
+    get_loaded_providers,
+    get_provider,
+    is_auth_failure,
+    reset_sessions,
+)
+from .user_data import SYSTEM_CLVM_PATH
+
+_SOCKET_PATH: Final[str] = str(SYSTEM_CLVM_PATH / "agent.sock")
+
+_IDLE_TIMEOUT: Final[int] = 3600
+
+# the agent answers at once, the commands within their own timeout= on top
+_CONNECT_TIMEOUT: Final[float] = 5.0
+_COMMAND_TIMEOUT: Final[float] = 900.0
+
+# commands executed inside of the agent, the rest of them run locally
+_DELEGATED_COMMANDS: Final[Set[Tuple[str, str]]] = {
+    ("instance", "start"),
+    ("instance", "stop"),
+    ("instance", "ls"),
+}
+
+# the agent returns the output once the command is done, these run locally
+_INTERACTIVE_ARGUMENTS: Final[Tuple[str, ...]] = ("watch=",)
+
+# the environment of the caller the commands depend on, sent with every request
+_CLOUD_VARIABLES: Final[Tuple[str, ...]] = (
+    "AWS_PROFILE",
+    "AWS_DEFAULT_REGION",
+    "CLOUDSDK_COMPUTE_ZONE",
+    "GOOGLE_APPLICATION_CREDENTIALS",
+    "AZURE_DEFAULT_LOCATION",
+    "CLVM_INVENTORY_TTL",
+    "VSCODE_AWS_PROMPT",
+)
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _exchange(sock: socket.socket, message: Dict) -> Dict:
+    with sock.makefile("rwb") as stream:
+        stream.write(json.dumps(message).encode() + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+def request(
+    op: str, response_timeout: float = _CONNECT_TIMEOUT, **payload: Any
+) -> Optional[Dict]:
+    """
+    Sends a request to the agent
+
+    Returns:
+        the response, None if the agent is not running, an error response
+        if it does not answer within `response_timeout` seconds once connected
+    """
+    if os.getenv("CLVM_AGENT") or not is_supported():
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(_CONNECT_TIMEOUT)
+        try:
+            sock.connect(_SOCKET_PATH)
+        except OSError:
+            return None
+        # the request may be in progress, so it is not sent again
+        sock.settimeout(response_timeout)
+        try:
+            return _exchange(sock, {"op": op, **payload})
+        except (OSError, ValueError) as err:  # socket.timeout too
+            return {
+                "status": "error",
+                "error": f"no response: {err or type(err).__name__}",
+            }
+
+
+def _get_response_timeout(arguments: Iterable[str]) -> float:
+    # a command waits for the instances up to its timeout=, on top of the requests
+    for argument in arguments:
+        name, _, value = argument.partition("=")
+        if name == "timeout":
+            with suppress(ValueError):
+                return _COMMAND_TIMEOUT + max(float(value), 0.0)
+    return _COMMAND_TIMEOUT
+
+
+def is_running() -> bool:
+    return request("status") is not None
+
+
+def _terminal_env() -> Dict[str, str]:
+    if not sys.stdout.isatty():
+        return {}
+    size = os.get_terminal_size()
+    return {"COLUMNS": str(size.columns), "LINES": str(size.lines), "FORCE_COLOR": "1"}
+
+
+def _cloud_env() -> Dict[str, str]:
+    return {name: os.environ[name] for name in _CLOUD_VARIABLES if name in os.environ}
+
+
+def _print_output(response: Dict) -> None:
+    print(response.get("output", ""), end="")
+
+
+def _is_executed(response: Optional[Dict]) -> bool:
+    # neither started by an agent that is not running nor by a busy one
+    return response is not None and response["status"] != "busy"
+
+
+def forward(argv: List[str]) -> Optional[int]:
+    """
+    Runs the command in the agent if it is running and the command is delegated.
+    `ssh start` and `redirect start` delegate their target() only, their tunnels
+    belong to the caller.
+
+    Returns:
+        the exit code of the command, None if it has to be executed locally
+    """
+    if tuple(argv[1:3]) not in _DELEGATED_COMMANDS or any(
+        arg.startswith(_INTERACTIVE_ARGUMENTS) for arg in argv[3:]
+    ):
+        return None
+    response = request(
+        "call",
+        _get_response_timeout(argv[3:]),
+        argv=argv,
+        env={**_cloud_env(), **_terminal_env()},
+        cwd=os.getcwd(),
+    )
+    if not _is_executed(response):
+        return None
+    _print_output(response)
+    if response["status"] != "ok":
+        # the command may have been run in part, so it is not run again
+        print(f"[ERROR] clvm agent: {response['error']}", file=sys.stderr)
+        return 1
+    return response["code"]
+
+
+def target(cloud_platform: str, instance_name: str, **kwargs: str) -> Dict:
+    """
+    Starts the instance and returns the data required to open a tunnel to it.
+    Uses the agent if it is running, otherwise the platform provider directly.
+    """
+    response = request(
+        "target",
+        _get_response_timeout(f"{name}={value}" for name, value in kwargs.items()),
+        platform=cloud_platform,
+        instance_name=instance_name,
+        kwargs=kwargs,
+        env=_cloud_env(),
+        cwd=os.getcwd(),
+    )
+    if not _is_executed(response):
+        return get_provider(cloud_platform).tunnel_target(instance_name, **kwargs)
+    _print_output(response)
+    if response["status"] != "ok":
+        raise RuntimeError(f"[ERROR] clvm agent: {response['error']}")
+    if "target" not in response:  # exited, e.g. to log in
+        sys.exit(response["code"])
+    return response["target"]
+
+
+# ---
+class _Output(io.TextIOBase):
+    """
+    Standard output and error of the agent, a request writes to a buffer of its own,
+    the threads of the running command write to the buffer of the command
+    """
+
+    def __init__(self, stream: IO[str]) -> None:
+        super().__init__()
+        self._stream = stream
+        self._local = threading.local()
+        self.command: Optional[io.StringIO] = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self.command if self.command is not None else self._stream
+        return buffer.write(text)
+
+    def flush(self) -> None:
+        pass
+
+    def capture(self, buffer: Optional[io.StringIO]) -> None:
+        self._local.buffer = buffer
+
+
+class _Context:
+    """
+    Environment and directory of the callers, the requests of the callers
+    in the same ones run at once, those of the others are turned away until then
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._count = 0
+        self._caller: Tuple = ()
+        self._environ: Dict[str, str] = {}
+        self._cwd = os.getcwd()
+
+    def enter(self, env: Dict[str, str], cwd: str) -> bool:
+        caller = (
+            {name: value for name, value in env.items() if name in _CLOUD_VARIABLES},
+            cwd,
+        )
+        with self._lock:
+            if self._count and caller != self._caller:
+                return False
+            if not self._count:
+                # the variables the caller has not set are unset for the time of the command
+                self._environ, self._cwd = dict(os.environ), os.getcwd()
+                for name in _CLOUD_VARIABLES:
+                    os.environ.pop(name, None)
+                os.chdir(cwd)
+                self._caller = caller
+            os.environ.update(env)
+            self._count += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self._count -= 1
+            if not self._count:
+                os.chdir(self._cwd)
+                os.environ.clear()
+                os.environ.update(self._environ)
+
+
+class _AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # a stopped agent waits for the commands in progress
+    daemon_threads = False
+
+    def __init__(self, dispatch: Callable[[], None], idle_timeout: int) -> None:
+        self.dispatch = dispatch
+        self.timeout = idle_timeout
+        self.started = time()
+        self.stopped = False
+        self.context = _Context()
+        # the command line is parsed from sys.argv, one command at a time
+        self.dispatching = threading.Lock()
+        self._active = 0
+        self._active_lock = threading.Lock()
+        super().__init__(_SOCKET_PATH, _AgentRequestHandler)
+
+    def process_request_thread(self, request: Any, client_address: Any) -> None:
+        with self._active_lock:
+            self._active += 1
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    def handle_timeout(self) -> None:
+        # idle, but not with a command in progress
+        with self._active_lock:
+            self.stopped = not self._active
+
+
+class _AgentRequestHandler(socketserver.StreamRequestHandler):
+    server: _AgentServer
+
+    def handle(self) -> None:
+        request_ = json.loads(self.rfile.readline())
+        handler = {
+            "status": self._status,
+            "stop": self._stop,
+            "call": self._call,
+            "target": self._target,
+        }[request_.pop("op")]
+        self.wfile.write(json.dumps(handler(**request_), default=str).encode() + b"\n")
+
+    def _status(self) -> Dict:
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime": int(time() - self.server.started),
+            "platforms": get_loaded_providers(),
+        }
+
+    def _stop(self) -> Dict:
+        self.server.stopped = True
+        return {"status": "ok"}
+
+    def _call(self, argv: List[str], env: Dict[str, str], cwd: str) -> Dict:
+        if not self.server.dispatching.acquire(blocking=False):
+            # the caller runs it locally rather than waiting
+            return {"status": "busy"}
+
+        def _run() -> None:
+            sys.argv = argv
+            self.server.dispatch()
+
+        try:
+            return self._execute(_run, env, cwd, command=True)
+        finally:
+            self.server.dispatching.release()
+
+    def _target(
+        self,
+        platform: str,
+        instance_name: str,
+        kwargs: Dict[str, str],
+        env: Dict[str, str],
+        cwd: str,
+    ) -> Dict:
+        result = {}
+
+        def _run() -> None:
+            result.update(get_provider(platform).tunnel_target(instance_name, **kwargs))
+
+        response = self._execute(_run, env, cwd)
+        if response["status"] == "ok" and result:
+            response["target"] = result
+        return response
+
+    def _execute(
+        self,
+        func: Callable[[], None],
+        env: Dict[str, str],
+        cwd: str,
+        command: bool = False,
+    ) -> Dict:
+        """
+        Runs the command in the environment and the directory of the caller,
+        beside the commands of the callers in the same ones
+        """
+        if not self.server.context.enter(env, cwd):
+            return {"status": "busy"}
+        output = io.StringIO()
+        code: Any = 0
+        try:
+            # the sessions are kept warm, the listings older than the TTL are not
+            expire_listings()
+            _capture(output, command)
+            func()
+        except SystemExit as err:
+            code = err.code
+            _reset_on_auth_failure(err)
+        except Exception as err:  # reported by the client, not run again
+            _reset_on_auth_failure(err)
+            return {
+                "status": "error",
+                "output": output.getvalue(),
+                "error": traceback.format_exc(),
+            }
+        finally:
+            _capture(None, command)
+            self.server.context.leave()
+        return {"status": "ok", "output": output.getvalue(), "code": code}
+
+
+def _reset_on_auth_failure(err: BaseException) -> None:
+    # e.g. expired or revoked credentials, the next command authenticates again
+    if is_auth_failure(err):
+        reset_sessions()
+
+
+def _capture(buffer: Optional[io.StringIO], command: bool) -> None:
+    for stream in (sys.stdout, sys.stderr):
+        if isinstance(stream, _Output):
+            stream.capture(buffer)
+            if command:
+                stream.command = buffer
+
+
+def serve(idle_timeout: int = _IDLE_TIMEOUT) -> None:
+    """
+    Runs the agent in the current process until stopped or idle for too long
+    """
+    # the agent runs the same command tree as the clvm script
+    from pyclvm._clvm import dispatch
+
+    os.environ["CLVM_AGENT"] = "1"
+    SYSTEM_CLVM_PATH.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.path.exists(_SOCKET_PATH):
+        os.remove(_SOCKET_PATH)
+
+    server = _AgentServer(dispatch, idle_timeout)
+    os.chmod(_SOCKET_PATH, 0o600)
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = _Output(stdout), _Output(stderr)
+    try:
+        while not server.stopped:
+            server.handle_request()
+    finally:
+        server.server_close()
+        os.remove(_SOCKET_PATH)
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+def spawn(idle_timeout: int = _IDLE_TIMEOUT, wait: float = 10) -> bool:
+    """
+    Starts the agent as a detached process
+    """
+    subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            f"from pyclvm._common.agent import serve; serve({idle_timeout})",
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    while wait > 0:
+        sleep(0.5)
+        if is_running():
+            return True
+        wait -= 0.5
+    return False
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*- #
 
-from typing import AnyStr, Dict, Generator, Iterable, Iterator, Tuple, Union
+from typing import AnyStr, Dict, Generator, Iterable, Iterator, Optional, Tuple, Union
 
 from instances_map_abc.vm_instance_mapping import VmInstanceMappingBase
 from instances_map_abc.vm_instance_proxy import VmInstanceProxy
@@ -77,6 +77,15 @@ class AzureInstanceMapping(VmInstanceMappingBase[VmInstanceProxy]):
     def items(self) -> Generator[Tuple[str, str], None, None]:
         yield from zip(self.keys(), self.values())
 
+    def find_instances(
+        self, instance_names: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Resolves several names at once, the instances of these names are then
+        looked up without a request
+        """
+        return self._session.find_instances(instance_names)
+
     def _get_instance(self, instance_name: str) -> AzureInstanceProxy:
         return AzureInstanceProxy(
             instance_name=instance_name,
@@ -1,16 +1,26 @@
 # -*- coding: utf-8 -*- #
 
 import json
-import os
-from pathlib import Path
+import sqlite3
+from contextlib import suppress
+from threading import Lock
 from time import time
-from typing import Dict, List, Optional, Union
+from typing import Dict, Final, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote
 
 import requests
 from azure.identity import AzureCliCredential, DefaultAzureCredential
-from plt import _get_cache_path
+from requests.adapters import HTTPAdapter
 from singleton_decorator import singleton
 
+from .user_data import fetch_credentials, lock, store_credentials
+
+_TOKEN_NAME: Final[str] = "azure-token"
+
+_VM_API_VERSION: Final[str] = "2022-08-01"
+
+_MAX_CONCURRENCY: Final[int] = 10
+
 
 @singleton
 class AzureRestApi:
@@ -27,39 +37,50 @@ class AzureRestApi:
             "https://management.azure.com/",
         ]
         self._credentials = credentials
-        self._token = self._get_token(scope=scope)
+        self._scope = scope
+        self._token, self._expires_on = self._get_token(scope=scope)
         self._base_url = "https://management.azure.com/"
         self._base_api_version = "2022-01-01"
         self._subscription_id = self._get_subscription_id(subscription_id)
 
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    @property
+    def subscription_id(self) -> str:
+        return self._subscription_id
+
     def _build_url(self, resource: str, filters: Optional[Dict] = {}) -> str:
-        _filters = "".join([f"&{k}={v}" for k, v in filters.items()])
+        _filters = "".join([f"&{k}={quote(str(v))}" for k, v in filters.items()])
         return f"{self._base_url}/{resource}?api-version={self._base_api_version}{_filters}"
 
-    def _get_token(self, scope: List):
-        token_path = Path(f"{os.path.dirname(_get_cache_path())}/token.json")
-        try:
-            t = open(token_path, "rb")
-            token = json.load(t)
-            t.close()
-            if token[1] - int(time()) < 100:
-                raise RuntimeError()
-            return token[0]
-        except (FileNotFoundError, PermissionError, RuntimeError):
+    def _get_token(self, scope: List) -> Tuple[str, int]:
+        # concurrent clvm processes wait for the one requesting the token
+        with lock(_TOKEN_NAME):
+            stored = fetch_credentials(_TOKEN_NAME)
+            if stored and stored.expires_on - int(time()) >= 100:
+                return stored.token, stored.expires_on
             token = self._credentials.get_token(*scope)
-            try:
-                t = open(token_path, "w+")
-                json.dump(token, t, indent=2)
-                t.close()
-            except (FileExistsError, PermissionError):
-                pass
-            return token.token
+            with suppress(sqlite3.Error):
+                store_credentials(
+                    _TOKEN_NAME,
+                    {"token": token.token, "expires_on": token.expires_on},
+                    str(token.expires_on),
+                )
+            return token.token, token.expires_on
 
-    def _get(self, url) -> Dict:
-        headers = {
+    def headers(self) -> Dict:
+        # long living processes (e.g. clvm agent) outlive the token
+        if self._expires_on - int(time()) < 100:
+            self._token, self._expires_on = self._get_token(scope=self._scope)
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self._token}",
         }
+
+    def _get(self, url) -> Dict:
+        headers = self.headers()
         resp = requests.get(url=url, headers=headers)
         if resp.status_code != 200:
             raise RuntimeError(
@@ -68,10 +89,7 @@ class AzureRestApi:
         return json.loads(resp.text)
 
     def _post(self, url) -> str:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self._token}",
-        }
+        headers = self.headers()
         resp = requests.post(url=url, headers=headers)
         if resp.status_code not in [200, 202]:
             raise RuntimeError(
@@ -95,14 +113,57 @@ class AzureRestApi:
             )
         )["value"]
 
-    def list_of_vm_instances(self, _filter: Optional[Dict] = {}) -> List[Dict]:
+    def _get_pages(self, url: str) -> Iterator[Dict]:
+        # the next page is requested once the previous one is consumed
+        while url:
+            page = self._get(url)
+            yield from page.get("value", ())
+            url = page.get("nextLink")
+
+    def iter_vm_instances(self, _filter: Optional[Dict] = {}) -> Iterator[Dict]:
+        """
+        Streams the VM instances of the subscription, following the nextLink of the pages
+
+        Args:
+            _filter (Dict): query parameters, e.g. statusOnly
+
+        Returns:
+            Iterator[Dict]
+        """
         self._base_api_version = "2022-08-01"
-        return self._get(
+        return self._get_pages(
             self._build_url(
                 f"subscriptions/{self._subscription_id}/providers/Microsoft.Compute/virtualMachines",
                 _filter,
             )
-        )["value"]
+        )
+
+    def find_vm_instances(self, vm_instance_name: str) -> Iterator[Dict]:
+        """
+        Finds the VM instances of a name in all the resource groups of the subscription
+        """
+        self._base_api_version = "2021-04-01"
+        resources = self._get_pages(
+            self._build_url(
+                f"subscriptions/{self._subscription_id}/resources",
+                {
+                    "$filter": "resourceType eq 'Microsoft.Compute/virtualMachines'"
+                    f" and name eq '{vm_instance_name}'"
+                },
+            )
+        )
+        for resource in resources:
+            if resource["name"].lower() == vm_instance_name.lower():
+                yield resource
+
+    def vm_instance(self, resource_group_name: str, vm_instance_name: str) -> Dict:
+        self._base_api_version = "2022-08-01"
+        return self._get(
+            self._build_url(
+                f"subscriptions/{self._subscription_id}/resourceGroups/{resource_group_name}/providers/Microsoft.Compute/virtualMachines/{vm_instance_name}",
+                {"$expand": "instanceView"},
+            )
+        )
 
     def vm_instance_view(self, resource_group_name: str, vm_instance_name: str) -> Dict:
         self._base_api_version = "2022-08-01"
@@ -135,3 +196,82 @@ class AzureRestApi:
                 f"subscriptions/{self._subscription_id}/resourceGroups/{resource_group_name}/providers/Microsoft.Compute/virtualMachines/{vm_instance_name}/start",
             )
         )
+
+
+# ---
+class PooledAzureRestApi:
+    """
+    Azure REST API of the operations on many VMs at once, called by a pool of threads.
+    The requests share a pool of `limit` connections, the token and the subscription
+    are the ones of the blocking API.
+    """
+
+    def __init__(self, rest_api: AzureRestApi, limit: int = _MAX_CONCURRENCY):
+        self._rest_api = rest_api
+        self._http = requests.Session()
+        self._http.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=limit)
+        )
+        # the token is renewed by one thread, the others wait for it
+        self._lock = Lock()
+
+    def __enter__(self) -> "PooledAzureRestApi":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._http.close()
+
+    def _vm_url(
+        self, resource_group_name: str, vm_instance_name: str, operation: str = ""
+    ) -> str:
+        # the api version is given by call, the url of the blocking API is shared
+        return (
+            f"{self._rest_api.base_url}subscriptions/{self._rest_api.subscription_id}"
+            f"/resourceGroups/{resource_group_name}/providers/Microsoft.Compute"
+            f"/virtualMachines/{vm_instance_name}{operation}?api-version={_VM_API_VERSION}"
+        )
+
+    def _request(self, method: str, url: str, codes: Tuple[int, ...]) -> Dict:
+        with self._lock:
+            headers = self._rest_api.headers()
+        resp = self._http.request(method, url, headers=headers)
+        if resp.status_code not in codes:
+            raise RuntimeError(
+                f"Azure REST API error: {resp.reason}, code: {resp.status_code}"
+            )
+        return json.loads(resp.text) if resp.text else {}
+
+    def vm_instance_view(self, resource_group_name: str, vm_instance_name: str) -> Dict:
+        return self._request(
+            "GET",
+            self._vm_url(resource_group_name, vm_instance_name, "/instanceView"),
+            (200,),
+        )
+
+    def vm_state(
+        self, resource_group_name: str, vm_instance_name: str
+    ) -> Optional[str]:
+        """
+        Returns the power state of the VM, e.g. VM running
+        """
+        statuses = self.vm_instance_view(resource_group_name, vm_instance_name).get(
+            "statuses", ()
+        )
+        return statuses[1]["displayStatus"] if len(statuses) > 1 else None
+
+    def vm_deallocate(self, resource_group_name: str, vm_instance_name: str) -> Dict:
+        return self._request(
+            "POST",
+            self._vm_url(resource_group_name, vm_instance_name, "/deallocate"),
+            (200, 202),
+        )
+
+    def vm_start(self, resource_group_name: str, vm_instance_name: str) -> Dict:
+        return self._request(
+            "POST",
+            self._vm_url(resource_group_name, vm_instance_name, "/start"),
+            (200, 202),
+        )
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*- #
+
+import enum
+import os
+import signal
+import socket
+import subprocess
+from time import sleep, time
+from typing import Iterable, Union
+
+from pyclvm.plt import _get_os
+
+_OS = _get_os()
+
+
+# ---
+def next_free_port(port=44500, max_port=45500):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    while port <= max_port:
+        try:
+            sock.bind(("127.0.0.1", port))
+            sock.close()
+            return port
+        except OSError:
+            port += 1
+    raise IOError("no free ports")
+
+
+# ---
+def build_azure_tunnel(
+    instance_name: str, resource_group: str, subscription: str, port: int
+) -> subprocess:
+    cmd = [
+        "az.cmd" if _OS == "Windows" else "az",
+        "network",
+        "bastion",
+        "tunnel",
+        "--port",
+        str(port),
+        "--resource-port",
+        "22",
+        "--name",
+        f"{resource_group}-vpc-bastion",  # TODO Retrieve Bastion name via REST API
+        "--resource-group",
+        resource_group,
+        "--target-resource-id",
+        f"/subscriptions/{subscription}/resourceGroups/{resource_group}/providers/Microsoft.Compute/virtualMachines/{instance_name}",
+        "--only-show-errors",
+    ]
+    tunnel_proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    sleep(3)  # Wait until tunnel to build
+    return tunnel_proc
+
+
+def grace_kill(proc: subprocess, sig: signal) -> enum:
+    # TODO Add any clearance procedures if necessary (e.g. stop VM)
+    if _OS == "Windows":
+        os.kill(proc.pid, sig)
+    else:
+        os.killpg(os.getpgid(proc.pid), sig)
+    return signal.getsignal(sig)
+
+
+def create_socket(tunnel_proc: subprocess, port: int, **kwargs) -> None:
+    account = kwargs.get("account")
+    key = kwargs.get("key")
+    cmd = [
+        "ssh",
+        "-p",
+        f"{port}",
+        "-i",
+        os.path.normpath(f"{key}"),
+        f"{account}@localhost",
+        "-o",
+        "UserKnownHostsFile=/dev/null",
+        "-o",
+        "StrictHostKeyChecking=no",
+        "-W",
+        "localhost:22",
+    ]
+    if _OS != "Windows":
+        cmd.extend(
+            [
+                "-o",
+                "ConnectTimeout=3",
+            ]
+        )
+
+    cnt = 10
+    while cnt > 0:
+        enter_sec = int(time())
+        subprocess.run(cmd)
+        if int(time() - enter_sec) > 5:
+            break
+        sleep(3)
+        cnt -= 1
+
+    signal.signal(signal.SIGTERM, grace_kill(tunnel_proc, signal.SIGTERM))
+
+
+def exec_command(
+    tunnel_proc: subprocess,
+    port: int,
+    *commands: Union[str, Iterable],
+    **kwargs: str,
+) -> None:
+    account = kwargs.get("account")
+    key = kwargs.get("key")
+    cmd = [
+        "ssh",
+        "-p",
+        str(port),
+        "-i",
+        os.path.normpath(key),
+        f"{account}@localhost",
+        "-o",
+        "UserKnownHostsFile=/dev/null",
+        "-o",
+        "StrictHostKeyChecking=no",
+    ]
+    if _OS != "Windows":
+        cmd.extend(
+            [
+                "-o",
+                "ConnectTimeout=5",
+            ]
+        )
+
+    _commands = " ".join(*commands) if len(commands) > 0 else ""
+    if _commands:
+        cmd.append(f"cd $HOME && {_commands}")
+
+    cnt = 10
+    while cnt > 0:
+        enter_time = time()
+        subprocess.run(cmd)
+        lag = time() - enter_time
+        if lag < 5.001 or lag > 5.02:  # TODO Fix it. It relies on SSH ConnectTimeout.
+            break
+        sleep(1)
+        cnt -= 1
+
+    signal.signal(signal.SIGTERM, grace_kill(tunnel_proc, signal.SIGTERM))
+
+
+def ssh_connection_std_output(
+    instance_name: str, resource_group: str, subscription: str, **kwargs
+) -> None:
+    port = next_free_port()
+    create_socket(
+        tunnel_proc=build_azure_tunnel(
+            instance_name, resource_group, subscription, port
+        ),
+        port=port,
+        **kwargs,
+    )
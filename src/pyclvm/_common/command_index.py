@@ -0,0 +1,175 @@
+"""
+Index of the clvm command tree, saves dynacli importing every command to discover them
+"""
+
+import ast
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from contextlib import suppress
+from os import path
+from pathlib import Path
+from typing import Dict, Final, List, Optional, Set, Tuple
+
+from .user_data import fetch_cache, store_cache
+
+_INDEX_NAME: Final[str] = "commands"
+
+_ROOT: Final[Path] = Path(__file__).resolve().parent.parent
+
+_HELP_FLAGS: Final[Set[str]] = {"-h", "--help"}
+
+_VERSION_FLAGS: Final[Set[str]] = {"-v", "--version"}
+
+Index = Dict[str, Dict]
+
+
+def _parse(file_name: Path) -> ast.Module:
+    return ast.parse(file_name.read_text(encoding="utf-8"), str(file_name))
+
+
+def _get_all(tree: ast.Module) -> Optional[List[str]]:
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and any(getattr(target, "id", None) == "__all__" for target in node.targets)
+            and isinstance(node.value, (ast.List, ast.Tuple))
+        ):
+            return [element.value for element in node.value.elts]
+    return None
+
+
+def _get_module_help(tree: ast.Module) -> str:
+    return (
+        ast.get_docstring(tree, clean=False) or "[ERROR] Missing the module docstring"
+    )
+
+
+def _get_command_help(tree: ast.Module, name: str) -> Optional[str]:
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == name:
+            doc = ast.get_docstring(node, clean=False)
+            return (
+                doc.partition("Args:")[0]
+                if doc
+                else "[ERROR] Missing command docstring"
+            )
+    return None
+
+
+def _get_names(package_path: Path, tree: Optional[ast.Module]) -> List[str]:
+    names = _get_all(tree) if tree else None
+    return names or sorted(
+        entry.stem
+        for entry in package_path.iterdir()
+        if not entry.name.startswith("_")
+        and (entry.suffix == ".py" or (entry / "__init__.py").exists())
+    )
+
+
+def _index_group(package_path: Path, package: str, tree: Optional[ast.Module]) -> Index:
+    """
+    Follows the dynacli discovery rules: a package is a group of commands,
+    listed by `__all__` if defined, a module is a command if it defines
+    a function of the same name
+    """
+    group: Index = {}
+    for name in _get_names(package_path, tree):
+        module_path = package_path / name
+        if (module_path / "__init__.py").exists():
+            init = _parse(module_path / "__init__.py")
+            group[name] = {
+                "help": _get_module_help(init),
+                "commands": _index_group(module_path, f"{package}.{name}", init),
+            }
+        elif module_path.with_suffix(".py").exists():
+            module = _parse(module_path.with_suffix(".py"))
+            help_ = _get_command_help(module, name)
+            # modules exposing several commands are left to dynacli
+            group[name] = (
+                {"help": help_, "module": f"{package}.{name}"}
+                if help_ is not None
+                else {"help": _get_module_help(module)}
+            )
+    return group
+
+
+def _get_signature() -> float:
+    # catches the source changes of development installs, the version does not
+    return max(file_name.stat().st_mtime for file_name in _ROOT.rglob("*.py"))
+
+
+def get_index(version: str) -> Index:
+    """
+    Returns the command index, rebuilds it if the package has changed
+    """
+    key = {"version": version, "path": str(_ROOT), "signature": _get_signature()}
+    with suppress(sqlite3.Error):
+        cached = fetch_cache(_INDEX_NAME)
+        if cached and all(cached[0].get(name) == value for name, value in key.items()):
+            return cached[0]["commands"]
+    commands = _index_group(_ROOT, _ROOT.name, None)
+    with suppress(sqlite3.Error, OSError):
+        store_cache(_INDEX_NAME, {**key, "commands": commands})
+    return commands
+
+
+# ---
+def _get_cli_name(name: str) -> str:
+    return name.replace("_", "-")
+
+
+def resolve(index: Index, args: List[str]) -> Tuple[List[str], Optional[Dict]]:
+    """
+    Finds the longest prefix of the arguments naming a group or a command
+
+    Returns:
+        names of the prefix and its entry (None for the root)
+    """
+    names: List[str] = []
+    entry = None
+    group = index
+    for arg in args:
+        entry_ = group.get(arg.replace("-", "_"))
+        if entry_ is None:
+            break
+        names.append(arg.replace("-", "_"))
+        entry = entry_
+        if "commands" not in entry:
+            break
+        group = entry["commands"]
+    return names, entry
+
+
+def print_help(index: Index, names: List[str], args: List[str]) -> None:
+    """
+    Prints the help of a group the same way dynacli does, without importing it
+    """
+    main_module = sys.modules["__main__"]
+    parser = ArgumentParser(
+        prog=path.basename(sys.argv[0]), description=main_module.__doc__
+    )
+    if getattr(main_module, "__version__", None):
+        parser.add_argument(
+            "-v",
+            "--version",
+            action="version",
+            version="%(prog)s - v" + main_module.__version__,
+        )
+    subparsers = parser.add_subparsers()
+    group = index
+    for name in names:
+        subparsers = subparsers.add_parser(
+            _get_cli_name(name), help=group[name]["help"]
+        ).add_subparsers()
+        group = group[name]["commands"]
+    for name, entry in group.items():
+        subparsers.add_parser(_get_cli_name(name), help=entry["help"])
+    if not vars(parser.parse_args(args)):
+        parser.print_usage()
+        sys.exit(1)
+
+
+def is_help_request(names: List[str], args: List[str]) -> bool:
+    flags = set(args[len(names) :])
+    return flags <= (_HELP_FLAGS | _VERSION_FLAGS if not names else _HELP_FLAGS)
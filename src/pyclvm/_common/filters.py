@@ -0,0 +1,61 @@
+"""
+Selection of the instances, shared by the platforms
+
+    states=running,stopped    states of the platform, case insensitive
+    names=web-*,db            instance names, with * and ? wildcards
+    selector=team=ml,env=dev  tags (AWS, Azure) or labels (GCP), all of them must match
+
+Each platform lets the service filter whatever it can, the rest is filtered on the way.
+"""
+
+import sys
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Mapping, NamedTuple, Union
+
+
+def _split(value: Union[str, List[str]]) -> List[str]:
+    items = value.split(",") if isinstance(value, str) else value
+    return [item.strip() for item in items if item.strip()]
+
+
+def _get_labels(selector: Union[str, List[str]]) -> Dict[str, str]:
+    labels = {}
+    for item in _split(selector):
+        key, equals, value = item.partition("=")
+        if not equals:
+            print(f"[ERROR] {item}: selector expects key=value pairs, e.g. team=ml")
+            sys.exit(-1)
+        labels[key.strip()] = value.strip()
+    return labels
+
+
+class Filters(NamedTuple):
+    """
+    Instance states, name patterns and labels to match
+    """
+
+    states: List[str]
+    names: List[str]
+    labels: Dict[str, str]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.states or self.names or self.labels)
+
+    def matches(self, name: str, state: str, labels: Mapping[str, str]) -> bool:
+        return (
+            (not self.states or state.lower() in map(str.lower, self.states))
+            and (not self.names or any(fnmatchcase(name, p) for p in self.names))
+            and all(labels.get(key) == value for key, value in self.labels.items())
+        )
+
+
+def get_filters(kwargs: Mapping[str, Any]) -> Filters:
+    """
+    Filters of the `states=`, `names=` and `selector=` arguments
+    """
+    return Filters(
+        states=_split(kwargs.get("states", "")),
+        names=_split(kwargs.get("names", "")),
+        labels=_get_labels(kwargs.get("selector", "")),
+    )
@@ -1,12 +1,25 @@
 # -*- coding: utf-8 -*- #
 
-from typing import AnyStr, Generator, Iterable, Iterator, Tuple, Union
+from typing import (
+    Any,
+    AnyStr,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from google.cloud import compute_v1
+from google.cloud.compute_v1 import Instance
 from instances_map_abc.vm_instance_mapping import VmInstanceMappingBase
 from instances_map_abc.vm_instance_proxy import VmInstanceProxy
 
+from .filters import get_filters
 from .gcp_instance_proxy import GcpInstanceProxy, GcpRemoteShellProxy
+from .output import get_columns, select_columns
 from .session_gcp import GcpSession, get_session
 
 
@@ -19,7 +32,8 @@ class GcpComputeAllInstancesData:
         self._session = get_session(**kwargs)  # TODO get session out of here
         self._client = self._session.get_client()
         self._zone = self._session.get_zone()
-        self._instances_data = self._instances()
+        self._filters = get_filters(kwargs)
+        self._columns = get_columns(kwargs)
 
     # ---
     def get_session(self) -> GcpSession:
@@ -31,19 +45,39 @@ class GcpComputeAllInstancesData:
         return self._session
 
     # ---
-    def _instances(self) -> Iterable:
-        return [
-            (
+    def _instances(self) -> Iterator:
+        # the rows are made as the pages of the listing come
+        for _instance in self._session.iter_instances(self._filters):
+            yield (
                 _instance.id,
                 self._get_instance_name(_instance.tags) or _instance.name,
                 _instance.status,
+                *self._get_details(_instance),
             )
-            for _instance in self._session.instances
-        ]
+
+    # ---
+    def _get_details(self, _instance: Instance) -> Tuple[Dict[str, str], ...]:
+        """
+        Returns the extra columns of `columns=`, if any
+        """
+        if not self._columns:
+            return ()
+        interfaces = _instance.network_interfaces
+        return (
+            select_columns(
+                self._columns,
+                {
+                    "zone": _instance.zone.rpartition("/")[2],
+                    "type": _instance.machine_type.rpartition("/")[2],
+                    "private_ip": interfaces[0].network_i_p if interfaces else None,
+                    "launch_time": _instance.last_start_timestamp,
+                },
+            ),
+        )
 
     # ---
     def __iter__(self) -> Iterator:
-        yield from self._instances_data
+        yield from self._instances()
 
     # ---
     @staticmethod
@@ -70,30 +104,56 @@ class GcpInstanceMapping(VmInstanceMappingBase[VmInstanceProxy]):
         return self._get_instance(instance_name=instance_name)
 
     def __iter__(self) -> Iterator:
-        # instances = (
-        #     r["Instances"][0] for r in self._client.describe_instances()["Reservations"]
-        # )
+        # the proxies are built from the listing, without fetching every instance
         for instance in self._session.instances:
-            yield self._get_instance(instance.name)
+            yield self._get_instance(instance.name, instance)
 
     def __len__(self) -> int:
-        return sum(1 for _ in self)
+        return sum(1 for _ in self._session.instances)
 
     def keys(self) -> Generator[str, None, None]:
-        for instance in self:
+        for instance in self._session.instances:
             yield instance.name
 
     def values(self) -> Generator[str, None, None]:
         yield from self
 
     def items(self) -> Generator[Tuple[str, str], None, None]:
-        yield from zip(self.keys(), self.values())
+        for instance in self:
+            yield instance.name, instance
 
-    def _get_instance(self, instance_name: str) -> GcpInstanceProxy:
+    def find_instances(
+        self, instance_names: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Resolves several names at once, the instances of these names are then
+        looked up without a request
+        """
+        return self._session.find_instances(instance_names)
+
+    def _get_proxy_kwargs(
+        self, instance_name: str, instance: Optional[Instance]
+    ) -> Dict[str, Any]:
+        if instance is not None:
+            zone = instance.zone.rpartition("/")[2]
+        elif "zone" in self._kwargs:
+            zone = self._kwargs["zone"]
+        else:
+            entry = self._session.find_instance(instance_name)
+            if not entry:
+                raise RuntimeError(
+                    "[ERROR] No such instance registered: wrong instance name provided"
+                )
+            zone = entry["zone"]
+        return {**self._kwargs, "zone": zone, "instance": instance}
+
+    def _get_instance(
+        self, instance_name: str, instance: Optional[Instance] = None
+    ) -> GcpInstanceProxy:
         return GcpInstanceProxy(
             instance_name=instance_name,
             session=self._session,
-            **self._kwargs,
+            **self._get_proxy_kwargs(instance_name, instance),
         )
 
     @property
@@ -103,5 +163,11 @@ class GcpInstanceMapping(VmInstanceMappingBase[VmInstanceProxy]):
 
 # ---
 class GcpRemoteShellMapping(GcpInstanceMapping, VmInstanceMappingBase):
-    def _get_instance(self, instance_name: str) -> GcpRemoteShellProxy:
-        return GcpRemoteShellProxy(instance_name, self._session, **self._kwargs)
+    def _get_instance(
+        self, instance_name: str, instance: Optional[Instance] = None
+    ) -> GcpRemoteShellProxy:
+        return GcpRemoteShellProxy(
+            instance_name,
+            self._session,
+            **self._get_proxy_kwargs(instance_name, instance),
+        )
@@ -3,12 +3,15 @@
 import json
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from distutils.util import strtobool
-from typing import Any, Iterable, NewType, Optional, Union
+from time import perf_counter, sleep
+from typing import Any, Dict, Final, Hashable, Iterable, NewType, Optional, Tuple, Union
 
 from google.api_core.exceptions import NotFound
 from google.api_core.extended_operation import ExtendedOperation
 from google.cloud import pubsub_v1
+from google.cloud.compute_v1 import Instance
 from google.cloud.pubsub_v1.exceptions import TimeoutError
 
 from pyclvm.plt import _get_os
@@ -20,22 +23,90 @@ _OS = _get_os()
 Status = NewType("status", str)
 status = Status("down")
 
+_POLL_INTERVAL: Final[float] = 2.0
+
+_MAX_POLL_WORKERS: Final[int] = 10
+
+
+def _print_warnings(operation: ExtendedOperation, verbose_name: str) -> None:
+    if operation.warnings:
+        print(f"Warnings during {verbose_name}:\n", file=sys.stderr)
+        for warning in operation.warnings:
+            print(f" - {warning.code}: {warning.message}", file=sys.stderr)
+
+
+def _is_done(operation: ExtendedOperation) -> Union[bool, Exception]:
+    try:
+        return operation.done()
+    except Exception as err:  # the operation can not be read, it is failed
+        return err
+
+
+def wait_for_extended_operations(
+    operations: Dict[Hashable, ExtendedOperation],
+    verbose_name: str = "operation",
+    timeout: float = 300,
+) -> Dict[Hashable, Tuple[float, Optional[str]]]:
+    """
+    Waits for several extended (long-running) operations at once, all of them
+    are polled every round by one waiter until done or the shared deadline.
+    An operation failing does not stop the wait for the others.
+
+    Args:
+        operations: the operations to wait on, by any key, e.g. instance name.
+        verbose_name: (optional) a more verbose name of the operations,
+            used only during warning reporting.
+        timeout: how long (in seconds) to wait for all the operations to finish.
+
+    Returns:
+        The time each operation took and its error, None if it succeeded, by key.
+    """
+    started = perf_counter()
+    results: Dict[Hashable, Tuple[float, Optional[str]]] = {}
+    pending = dict(operations)
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(len(pending), _MAX_POLL_WORKERS))
+    ) as executor:
+        while pending:
+            # the operations are refreshed concurrently, a request each
+            for key, done in zip(
+                list(pending), executor.map(_is_done, pending.values())
+            ):
+                if done is False:
+                    continue
+                operation = pending.pop(key)
+                if isinstance(done, Exception):
+                    error = f"{type(done).__name__}: {done}"
+                elif operation.error_code:
+                    error = f"[Code: {operation.error_code}]: {operation.error_message}"
+                else:
+                    error = None
+                    _print_warnings(operation, verbose_name)
+                results[key] = perf_counter() - started, error
+            if pending and perf_counter() - started >= timeout:
+                for key in pending:
+                    results[key] = timeout, f"not done in {timeout:.0f}s"
+                break
+            if pending:
+                sleep(_POLL_INTERVAL)
+    return results
+
 
 class GcpInstanceProxy:
     def __init__(
         self,
         instance_name: str,
         session: GcpSession,
+        zone: Optional[str] = None,
+        instance: Optional[Instance] = None,
         **kwargs: str,
     ) -> None:
         self._session = session
         self._instance_name = instance_name
+        self._zone = zone or session.zone
         self._client = session.get_client()
-        self._instance = self._client.get(
-            project=self._session.project_id,
-            zone=self._session.zone,
-            instance=self._instance_name,
-        )
+        # the data of a listed instance, fetched on first use otherwise
+        self._instance = instance
         self._subscription_id = instance_name
         self._wait_for_queue = kwargs.get("wait", "yes")
 
@@ -81,13 +152,28 @@ class GcpInstanceProxy:
             print(f"Operation ID: {operation.name}")
             raise operation.exception() or RuntimeError(operation.error_message)
 
-        if operation.warnings:
-            print(f"Warnings during {verbose_name}:\n", file=sys.stderr)
-            for warning in operation.warnings:
-                print(f" - {warning.code}: {warning.message}", file=sys.stderr)
-
+        _print_warnings(operation, verbose_name)
         return result
 
+    # ---
+    def refresh(self) -> None:
+        """
+        Fetches the current data of the instance
+
+        :return: None
+        """
+        self._instance = self._client.get(
+            project=self._session.project_id,
+            zone=self._zone,
+            instance=self._instance_name,
+        )
+
+    # ---
+    def _get_instance(self) -> Instance:
+        if self._instance is None:
+            self.refresh()
+        return self._instance
+
     # ---
     def start(self, wait: bool = True) -> Union[Any, None]:
         """
@@ -97,9 +183,10 @@ class GcpInstanceProxy:
         """
         operation = self._client.start(
             project=self._session.project_id,
-            zone=self._session.zone,
+            zone=self._zone,
             instance=self._instance_name,
         )
+        self._instance = None  # the state is changing
 
         vm_status = None
 
@@ -121,9 +208,10 @@ class GcpInstanceProxy:
         """
         operation = self._client.stop(
             project=self._session.project_id,
-            zone=self._session.zone,
+            zone=self._zone,
             instance=self._instance_name,
         )
+        self._instance = None  # the state is changing
         return (
             self._wait_for_extended_operation(operation, "instance stopping")
             if wait
@@ -132,18 +220,22 @@ class GcpInstanceProxy:
 
     @property
     def state(self) -> str:
-        return self._instance.status
+        return self._get_instance().status
 
     @property
     def id(self) -> str:
-        return str(self._instance.id)
+        return str(self._get_instance().id)
 
     @property
     def name(self) -> str:
         try:
-            return self._instance.tags.name
+            return self._get_instance().tags.name
         except AttributeError:
-            return self._instance.name
+            return self._get_instance().name
+
+    @property
+    def zone(self) -> str:
+        return self._zone
 
     # ---
     def _sub(self, timeout: Optional[float] = None) -> Status:
@@ -189,8 +281,15 @@ class GcpInstanceProxy:
 
 
 class GcpRemoteShellProxy(GcpInstanceProxy):
-    def __init__(self, instance_name: str, session: GcpSession, **kwargs) -> None:
-        super().__init__(instance_name, session, **kwargs)
+    def __init__(
+        self,
+        instance_name: str,
+        session: GcpSession,
+        zone: Optional[str] = None,
+        instance: Optional[Instance] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(instance_name, session, zone, instance, **kwargs)
         self._session = session
         self._proxy_client = (
             None  # TODO realise proxy client (SSH or any other remote call)
@@ -208,7 +307,7 @@ class GcpRemoteShellProxy(GcpInstanceProxy):
             "compute",
             "ssh",
             f"--project={self._session.project}",
-            f"--zone={self._session.zone}",
+            f"--zone={self._zone}",
             self._instance_name,
             "--strict-host-key-checking=no",
         ]
@@ -0,0 +1,205 @@
+"""
+Local inventory of the VM instances, resolves instance names without listing the fleet
+
+The inventory is kept per platform and account (AWS profile and region, GCP project,
+Azure subscription) and maps the instance names to whatever the platform needs
+to address an instance (id, zone, resource group) and its last known state.
+It is refreshed by listing the instances when older than the TTL (`ttl=<seconds>`,
+CLVM_INVENTORY_TTL, 10 minutes by default), on `refresh=yes`, or when a name is missing.
+Platforms able to find a single instance by name fetch just that one instead.
+"""
+
+import os
+import sqlite3
+import sys
+from contextlib import suppress
+from time import time
+from typing import Callable, Dict, Final, Iterable, Optional, Tuple
+
+from .user_data import fetch_cache, remove_cache, store_cache
+
+_DEFAULT_TTL: Final[float] = 600.0
+
+# distutils.util.strtobool imports setuptools, too slow for the name lookups
+_TRUE_VALUES: Final[Tuple[str, ...]] = ("y", "yes", "t", "true", "on", "1")
+
+Entry = Dict[str, str]
+Lister = Callable[[], Iterable[Tuple[str, Entry]]]
+Fetcher = Callable[[str], Optional[Entry]]
+
+
+def _get_ttl(kwargs: Dict[str, str]) -> float:
+    if "ttl" in kwargs:
+        name, value = "ttl", kwargs["ttl"]
+    else:
+        name = "CLVM_INVENTORY_TTL"
+        value = os.getenv(name, str(_DEFAULT_TTL))
+    try:
+        ttl = float(value)
+    except ValueError:
+        ttl = -1.0
+    if not ttl >= 0:  # nan as well
+        print(f"[ERROR] {name}={value}: a number of seconds expected")
+        sys.exit(-1)
+    return ttl
+
+
+class Inventory:
+    """
+    Instances of a platform account by name
+    """
+
+    def __init__(self, cloud_platform: str, scope: str, **kwargs: str) -> None:
+        self._name = f"inventory:{cloud_platform.upper()}:{scope}"
+        self._ttl = _get_ttl(kwargs)
+        self._refresh = str(kwargs.get("refresh", "no")).lower() in _TRUE_VALUES
+        self._instances: Optional[Dict[str, Entry]] = None
+        self._listed = False
+        self._loaded_at = 0.0
+
+    # ---
+    def _load_cached(self, name: str) -> Optional[Tuple[Dict, float]]:
+        if self._refresh:
+            return None
+        with suppress(sqlite3.Error):
+            cached = fetch_cache(name)
+            if cached and time() - cached[1] < self._ttl:
+                return cached
+        return None
+
+    # ---
+    def _load(self, name: str) -> Optional[Dict]:
+        cached = self._load_cached(name)
+        return cached[0] if cached else None
+
+    # ---
+    def _load_instances(self) -> None:
+        if self._instances is None:
+            cached = self._load_cached(self._name)
+            if cached:
+                self._instances, self._loaded_at = cached
+
+    # ---
+    @property
+    def listed(self) -> bool:
+        """
+        True once the instances are listed by this process, the inventory is current
+        """
+        return self._listed
+
+    # ---
+    @property
+    def outdated(self) -> bool:
+        """
+        True if the instances were listed longer ago than the TTL, or are to be
+        refreshed, a long running process, e.g. the agent, lists them again
+        """
+        return self._refresh or time() - self._loaded_at >= self._ttl
+
+    # ---
+    def store(self, instances: Iterable[Tuple[str, Entry]]) -> Dict[str, Entry]:
+        """
+        Replaces the inventory with a complete listing of the instances,
+        the first instance of a name wins, as the name lookups did so far
+        """
+        self._instances = {}
+        for instance_name, entry in instances:
+            self._instances.setdefault(instance_name, entry)
+        self._listed = True
+        self._loaded_at = time()
+        with suppress(sqlite3.Error, OSError):
+            store_cache(self._name, self._instances)
+        return self._instances
+
+    # ---
+    def discard(self, instance_names: Iterable[str]) -> None:
+        """
+        Drops the entries of instances found gone, e.g. terminated, their names
+        are resolved again by the next lookup, the stored listing is dropped too
+        """
+        names = list(instance_names)
+        self._load_instances()
+        for instance_name in names:
+            if self._instances:
+                self._instances.pop(instance_name, None)
+        with suppress(sqlite3.Error, OSError):
+            remove_cache(self._name)
+            for instance_name in names:
+                remove_cache(f"{self._name}:{instance_name}")
+
+    # ---
+    def _fetch(self, instance_name: str, fetch_instance: Fetcher) -> Optional[Entry]:
+        # kept apart from the listing, with a time of its own
+        name = f"{self._name}:{instance_name}"
+        entry = self._load(name)
+        if entry is None:
+            entry = fetch_instance(instance_name)
+            if entry is not None:
+                with suppress(sqlite3.Error, OSError):
+                    store_cache(name, entry)
+        return entry
+
+    # ---
+    def get(
+        self,
+        instance_name: str,
+        list_instances: Lister,
+        fetch_instance: Optional[Fetcher] = None,
+    ) -> Optional[Entry]:
+        """
+        Returns the inventory entry of an instance, lists the instances
+        if the inventory is outdated or does not know the name
+
+        Args:
+            instance_name (str): name of the instance
+            list_instances (Lister): lists (name, entry) of all the instances
+            fetch_instance (Fetcher): (optional) fetches the entry of a single
+                instance by name, used instead of listing the instances
+
+        Returns:
+            the entry, None if there is no such instance
+        """
+        self._load_instances()
+        if self._instances is not None and instance_name in self._instances:
+            return self._instances[instance_name]
+        if self._listed:
+            return None
+        if fetch_instance:
+            return self._fetch(instance_name, fetch_instance)
+        return self.store(list_instances()).get(instance_name)
+
+    # ---
+    def get_many(
+        self,
+        instance_names: Iterable[str],
+        list_instances: Lister,
+        fetch_instance: Optional[Fetcher] = None,
+    ) -> Dict[str, Optional[Entry]]:
+        """
+        Returns the inventory entries of several instances, the names missing
+        from the inventory are resolved by one listing, a single one is fetched
+
+        Args:
+            instance_names (Iterable[str]): names of the instances
+            list_instances (Lister): lists (name, entry) of all the instances
+            fetch_instance (Fetcher): (optional) fetches the entry of a single
+                instance by name
+
+        Returns:
+            the entries by name, None if there is no such instance
+        """
+        names = list(dict.fromkeys(instance_names))
+        self._load_instances()
+        entries = {
+            name: (self._instances or {}).get(name)
+            or self._load(f"{self._name}:{name}")
+            for name in names
+        }
+        missing = [name for name, entry in entries.items() if entry is None]
+        if not missing or self._listed:
+            return entries
+        if fetch_instance and len(missing) == 1:
+            entries[missing[0]] = self._fetch(missing[0], fetch_instance)
+            return entries
+        instances = self.store(list_instances())
+        return {name: instances.get(name) for name in names}
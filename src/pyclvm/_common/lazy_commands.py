@@ -0,0 +1,25 @@
+"""
+On demand import of the commands re-exported by a command group package
+"""
+
+from importlib import import_module
+from typing import Any, Callable, Dict, List
+
+
+def lazy_commands(package: str, names: List[str]) -> Callable[[str], Any]:
+    """
+    Returns module level __getattr__ importing the command module on first access,
+    so `clvm <group> <command>` imports only the module of that command.
+    Subpackages (command subgroups) are returned as is.
+    """
+    namespace: Dict[str, Any] = vars(import_module(package))
+
+    def __getattr__(name: str) -> Any:
+        if name not in names:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = import_module(f".{name}", package)
+        command = module if hasattr(module, "__path__") else getattr(module, name)
+        namespace[name] = command
+        return command
+
+    return __getattr__
@@ -0,0 +1,103 @@
+"""
+Streaming output of the listings for the scripts, `format=jsonl|csv|tsv`
+
+A record is written as soon as it is listed, without rich, so neither the import
+of rich nor a table of the whole listing is paid for. Extra columns are given
+by `columns=`, e.g. columns=zone,type,private_ip.
+"""
+
+import csv
+import json
+import re
+import sys
+from typing import Any, Dict, Final, Iterable, List, Mapping, Optional, Sequence
+
+_DELIMITERS: Final[Dict[str, str]] = {"csv": ",", "tsv": "\t"}
+
+_FORMATS: Final[List[str]] = ["jsonl", *_DELIMITERS]
+
+# the columns available on request, by name of the argument
+EXTRA_COLUMNS: Final[Dict[str, str]] = {
+    "zone": "Zone",
+    "resource_group": "Resource Group",
+    "private_ip": "Private IP",
+    "type": "Type",
+    "launch_time": "Launch Time",
+}
+
+
+def get_format(kwargs: Mapping[str, Any]) -> Optional[str]:
+    """
+    Returns the output format of `format=`, None for the table
+    """
+    output_format = kwargs.get("format")
+    if output_format is None:
+        return None
+    output_format = output_format.lower()
+    if output_format not in _FORMATS:
+        print(f"[ERROR] {output_format}: format is one of {', '.join(_FORMATS)}")
+        sys.exit(-1)
+    return output_format
+
+
+def get_columns(kwargs: Mapping[str, Any]) -> List[str]:
+    """
+    Returns the titles of the extra columns of `columns=`
+    """
+    columns = [
+        column.strip().lower()
+        for column in kwargs.get("columns", "").split(",")
+        if column.strip()
+    ]
+    for column in columns:
+        if column not in EXTRA_COLUMNS:
+            print(f"[ERROR] {column}: columns are {', '.join(EXTRA_COLUMNS)}")
+            sys.exit(-1)
+    return [EXTRA_COLUMNS[column] for column in columns]
+
+
+def select_columns(columns: List[str], details: Mapping[str, Any]) -> Dict[str, str]:
+    """
+    Returns the extra columns of a record, by title, from its details by argument name
+    """
+    values = {EXTRA_COLUMNS[name]: value for name, value in details.items()}
+    return {
+        column: "" if values.get(column) is None else str(values[column])
+        for column in columns
+    }
+
+
+def _get_key(column: str) -> str:
+    # "Private IP" and "SessionId" become private_ip and session_id
+    return re.sub(r"(?<=[a-z])(?=[A-Z])", "_", column).lower().replace(" ", "_")
+
+
+def write_records(
+    output_format: str, columns: Sequence[str], records: Iterable[Sequence[Any]]
+) -> None:
+    """
+    Writes the records one per line, flushed one by one for the pipelines
+
+    Args:
+        output_format (str): jsonl, csv or tsv
+        columns (Sequence[str]): titles of the columns, e.g. "Private IP",
+            the keys of jsonl and the header of csv are private_ip
+        records (Iterable[Sequence[Any]]): values of the columns, in order
+
+    Returns:
+        None
+    """
+    keys = [_get_key(column) for column in columns]
+    if output_format == "jsonl":
+        for record in records:
+            sys.stdout.write(json.dumps(dict(zip(keys, record)), default=str) + "\n")
+            sys.stdout.flush()
+        return
+
+    writer = csv.writer(
+        sys.stdout, delimiter=_DELIMITERS[output_format], lineterminator="\n"
+    )
+    writer.writerow(keys)
+    for record in records:
+        writer.writerow(record)
+        sys.stdout.flush()
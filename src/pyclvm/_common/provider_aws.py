@@ -0,0 +1,269 @@
+"""
+AWS platform implementation
+"""
+
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from boto3.session import Session
+from botocore.exceptions import BotoCoreError, ClientError
+from ec2instances.ec2_instance_mapping import Ec2RemoteShellMapping
+
+from pyclvm.instance._mapping import (
+    ALIVE_STATES,
+    Instance,
+    build_filters,
+    get_inventory,
+    iter_instances,
+    list_states,
+    read_states,
+    resolve_instances,
+)
+from pyclvm.instance.start import start as instance_start
+from pyclvm.login import _login_aws
+
+from .output import get_columns, select_columns
+from .session_aws import get_client, get_session, is_auth_error, reset_sessions
+
+__all__ = [
+    "remote_shell_mapping",
+    "list_instances",
+    "watch_states",
+    "select_instances",
+    "tunnel_target",
+    "expire_listings",
+    "reset_sessions",
+    "is_auth_error",
+    "get_session",
+]
+
+_MAX_WORKERS: Final[int] = 8
+
+# id, name, state and, listing several profiles or regions, the extra columns
+Row = Union[Tuple[str, str, str], Tuple[str, str, str, Dict[str, str]]]
+
+
+class _Ec2RemoteShellMapping(Ec2RemoteShellMapping):
+    """
+    Resolves the instance names through the local inventory
+    """
+
+    def __init__(
+        self, session: Session, auth_callback: Optional[Callable] = None, **kwargs: str
+    ) -> None:
+        super().__init__(session, auth_callback=auth_callback)
+        self._inventory = get_inventory(session, **kwargs)
+
+    def _resolve(
+        self, instance_names: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        try:
+            entries, _ = resolve_instances(
+                self._client, self._inventory, instance_names
+            )
+        except ClientError:
+            # e.g. expired credentials, renewed as the instance proxies do
+            if callable(self._reauth):
+                self._reauth()
+            raise
+        return entries
+
+    def _get_instance_id(self, instance_name: str) -> str:
+        """
+        Resolves the instance id through the inventory, checks it still exists
+        """
+        entry = self._resolve((instance_name,))[instance_name]
+        if not entry:
+            raise RuntimeError(
+                "[ERROR] No such instance registered: wrong instance name provided"
+            )
+        return entry["instance_id"]
+
+    def find_instances(
+        self, instance_names: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Resolves several names at once, the instances of these names are then
+        looked up without listing the instances
+        """
+        return self._resolve(instance_names)
+
+
+def remote_shell_mapping(**kwargs: str) -> Ec2RemoteShellMapping:
+    return _Ec2RemoteShellMapping(
+        get_session(kwargs), auth_callback=_login_aws, **kwargs
+    )
+
+
+def _split(value: Optional[str]) -> List[Optional[str]]:
+    return [item.strip() for item in value.split(",")] if value else [None]
+
+
+def _make_row(instance: Instance, columns: List[str], details: Dict[str, str]) -> Row:
+    if not (columns or details):
+        return instance.id, instance.name, instance.state
+    return (
+        instance.id,
+        instance.name,
+        instance.state,
+        {
+            **details,
+            **select_columns(
+                columns,
+                {
+                    "zone": instance.zone,
+                    "type": instance.instance_type,
+                    "private_ip": instance.private_ip,
+                    "launch_time": instance.launch_time,
+                },
+            ),
+        },
+    )
+
+
+def _list_pair(
+    profile: str, region: Optional[str], filters: Dict, columns: List[str]
+) -> List[Row]:
+    # the sessions are cached per profile and region, the credentials per profile
+    client = get_client("ec2", {"profile": profile, "region": region})
+    details = {"Profile": profile, "Region": client.meta.region_name}
+    return [
+        _make_row(instance, columns, details)
+        for instance in iter_instances(client, **filters)
+    ]
+
+
+def _list_many(
+    pairs: List[Tuple[str, Optional[str]]], filters: Dict, columns: List[str]
+) -> Iterator[Row]:
+    with ThreadPoolExecutor(max_workers=min(len(pairs), _MAX_WORKERS)) as executor:
+        futures = {
+            executor.submit(_list_pair, profile, region, filters, columns): (
+                profile,
+                region,
+            )
+            for profile, region in pairs
+        }
+        for future in as_completed(futures):
+            try:
+                yield from future.result()
+            except (BotoCoreError, ClientError) as err:
+                profile, region = futures[future]
+                # apart from the rows, format=jsonl|csv|tsv writes them to stdout
+                print(f"[ERROR] {profile} {region or ''}: {err}", file=sys.stderr)
+
+
+def _get_pairs(kwargs: Dict[str, str]) -> List[Tuple[str, Optional[str]]]:
+    return list(
+        product(
+            _split(kwargs.get("profiles", kwargs.get("profile", "default"))),
+            _split(kwargs.get("regions", kwargs.get("region"))),
+        )
+    )
+
+
+def list_instances(**kwargs: str) -> Tuple[str, Iterator[Row]]:
+    """
+    Lists the EC2 instances of a profile and region, or of every pair of
+    `profiles=a,b` and `regions=x,y` concurrently, as each pair is listed
+    """
+    filters = build_filters(kwargs)
+    columns = get_columns(kwargs)
+    pairs = _get_pairs(kwargs)
+    if len(pairs) > 1:
+        return (
+            f"EC2 Instances of {len(pairs)} Profiles and Regions",
+            _list_many(pairs, filters, columns),
+        )
+
+    profile, region = pairs[0]
+    session_kwargs = {"profile": profile, "region": region}
+    account = get_client("sts", session_kwargs).get_caller_identity()["Account"]
+    return f"{account} Account EC2 Instances", (
+        _make_row(instance, columns, {})
+        for instance in iter_instances(get_client("ec2", session_kwargs), **filters)
+    )
+
+
+def watch_states(**kwargs: str) -> Callable[..., Dict[str, str]]:
+    """
+    Returns a function reading the states of the instances by id, with the
+    clients of the profiles and regions of list_instances, kept between the calls,
+    given instance ids it reads just these by chunks, instead of the whole account
+    """
+    clients = [
+        get_client("ec2", {"profile": profile, "region": region})
+        for profile, region in _get_pairs(kwargs)
+    ]
+
+    def _read_states(instance_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        states: Dict[str, str] = {}
+        with ThreadPoolExecutor(
+            max_workers=min(len(clients), _MAX_WORKERS)
+        ) as executor:
+            for pair_states in executor.map(
+                lambda client: list_states(client)
+                if instance_ids is None
+                else read_states(client, instance_ids),
+                clients,
+            ):
+                states.update(pair_states)
+        return states
+
+    return _read_states
+
+
+def select_instances(**kwargs: str) -> List[str]:
+    """
+    Returns the names of the instances of `selector=`, `states=` and `names=`,
+    the tags are filtered by the service, the terminated instances too unless
+    asked by `states=`, the instances without a name can not be addressed
+    """
+    instances = iter_instances(
+        get_client("ec2", kwargs),
+        **build_filters({"states": ALIVE_STATES, **kwargs}),
+    )
+    names = Counter(instance.name for instance in instances if instance.name)
+    for name, count in names.items():
+        if count > 1:
+            # the names are resolved to one instance each
+            print(f"[INFO] {count} instances are named {name}, only one is selected")
+    return list(names)
+
+
+def expire_listings() -> None:
+    """
+    Nothing to drop, the inventory is read again by every command
+    """
+
+
+def _credentials_env(session: Session) -> Dict[str, str]:
+    credentials = session.get_credentials()
+    return {
+        "AWS_ACCESS_KEY_ID": credentials.access_key,
+        "AWS_SECRET_ACCESS_KEY": credentials.secret_key,
+        "AWS_SESSION_TOKEN": credentials.token,
+        "AWS_DEFAULT_REGION": session.region_name,
+    }
+
+
+def tunnel_target(instance_name: str, **kwargs: str) -> Dict[str, Any]:
+    session, instance_id = instance_start(
+        instance_name,
+        **dict(kwargs, wait=True),
+    )  # type: ignore
+    return {"instance_id": instance_id, "env": _credentials_env(session)}
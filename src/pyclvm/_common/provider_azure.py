@@ -0,0 +1,105 @@
+"""
+Azure platform implementation
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .azure_instance_mapping import AzureRemoteShellMapping
+from .filters import get_filters
+from .output import get_columns, select_columns
+from .session_azure import expire_listings, get_session, is_auth_error, reset_sessions
+
+__all__ = [
+    "remote_shell_mapping",
+    "list_instances",
+    "watch_states",
+    "select_instances",
+    "tunnel_target",
+    "expire_listings",
+    "reset_sessions",
+    "is_auth_error",
+]
+
+
+def remote_shell_mapping(**kwargs: str) -> AzureRemoteShellMapping:
+    return AzureRemoteShellMapping(**kwargs)
+
+
+def list_instances(**kwargs: str) -> Tuple[str, Iterator[Tuple[str, str, str]]]:
+    session = get_session(**kwargs)
+    filters = get_filters(kwargs)
+    instances = (
+        session.iter_instances()
+        if filters.empty
+        else session.iter_matching_instances(filters)
+    )
+    columns = get_columns(kwargs)
+    return f"{session.subscription_name} Azure Instances", (
+        (
+            str(params["instance_id"]),
+            instance_name,
+            params["state"],
+            *_get_details(columns, params),
+        )
+        for instance_name, params in instances
+    )
+
+
+def _get_details(columns: List[str], params: Dict) -> Tuple[Dict[str, str], ...]:
+    # the private IP belongs to the network interface, not listed with the VMs
+    if not columns:
+        return ()
+    return (
+        select_columns(
+            columns,
+            {
+                "zone": params["location"],
+                "resource_group": params["resource_group"],
+                "type": params.get("instance_type"),
+                "launch_time": params.get("launch_time"),
+            },
+        ),
+    )
+
+
+def watch_states(**kwargs: str) -> Callable[..., Dict[str, str]]:
+    """
+    Returns a function reading the states of the instances by id, with the session
+    of list_instances, the states of all of them are listed at once, whatever
+    the instance ids it is given
+    """
+    session = get_session(**kwargs)
+
+    def _read_states(instance_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        return session.list_states()
+
+    return _read_states
+
+
+def select_instances(**kwargs: str) -> List[str]:
+    """
+    Returns the names of the instances of `selector=`, `states=` and `names=`,
+    the listing of the VMs does not filter the tags, they are matched as it streams
+    """
+    return [
+        instance_name
+        for instance_name, _ in get_session(**kwargs).iter_matching_instances(
+            get_filters(kwargs)
+        )
+    ]
+
+
+def tunnel_target(instance_name: str, **kwargs: str) -> Dict[str, str]:
+    session = get_session(**kwargs)
+    instance = remote_shell_mapping(**kwargs).get(instance_name)
+
+    print(f"Starting {instance_name} ...")
+    instance.start(wait=False)  # type: ignore
+    print(f"\n{instance_name} is running")
+
+    return {
+        "resource_group": session.find_instance(instance_name)[
+            "resource_group"
+        ].lower(),
+        "subscription": session.subscription,
+    }
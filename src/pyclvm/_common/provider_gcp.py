@@ -0,0 +1,67 @@
+"""
+GCP platform implementation
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .filters import get_filters
+from .gcp_instance_mapping import GcpComputeAllInstancesData, GcpRemoteShellMapping
+from .session_gcp import expire_listings, get_session, is_auth_error, reset_sessions
+
+__all__ = [
+    "remote_shell_mapping",
+    "list_instances",
+    "watch_states",
+    "select_instances",
+    "tunnel_target",
+    "expire_listings",
+    "reset_sessions",
+    "is_auth_error",
+]
+
+
+def remote_shell_mapping(**kwargs: str) -> GcpRemoteShellMapping:
+    return GcpRemoteShellMapping(**kwargs)
+
+
+def list_instances(**kwargs: str) -> Tuple[str, Iterator[Tuple[str, str, str]]]:
+    instances = GcpComputeAllInstancesData(**kwargs)
+    return f"{instances.get_session().account_email} Account GCP Instances", (
+        (str(instance_id), instance_name, state, *details)
+        for instance_id, instance_name, state, *details in instances
+    )
+
+
+def watch_states(**kwargs: str) -> Callable[..., Dict[str, str]]:
+    """
+    Returns a function reading the states of the instances by id, with the session
+    of list_instances, the states of all of them are listed at once, whatever
+    the instance ids it is given
+    """
+    session = get_session(**kwargs)
+
+    def _read_states(instance_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        return session.list_states()
+
+    return _read_states
+
+
+def select_instances(**kwargs: str) -> List[str]:
+    """
+    Returns the names of the instances of `selector=`, `states=` and `names=`,
+    the labels are filtered by the service
+    """
+    return [
+        instance.name
+        for instance in get_session(**kwargs).iter_instances(get_filters(kwargs))
+    ]
+
+
+def tunnel_target(instance_name: str, **kwargs: str) -> Dict[str, str]:
+    instance = remote_shell_mapping(**kwargs).get(instance_name)
+
+    print(f"Starting {instance_name} ...")
+    instance.start()  # type: ignore
+    print(f"\n{instance_name} is running")
+
+    return {"project": instance.session.project, "zone": instance.zone}
@@ -0,0 +1,63 @@
+"""
+Lazy registry of cloud platform implementations
+"""
+
+import sys
+from importlib import import_module
+from types import ModuleType
+from typing import Dict, Final, List, Optional, Set
+
+_PROVIDERS: Final[Dict[str, str]] = {
+    "AWS": "pyclvm._common.provider_aws",
+    "GCP": "pyclvm._common.provider_gcp",
+    "AZURE": "pyclvm._common.provider_azure",
+}
+
+
+def get_provider(cloud_platform: str) -> ModuleType:
+    """
+    Returns the implementation module of a cloud platform.
+    The module (and the platform SDK behind it) is imported on the first request,
+    so a command pays only for the platform it actually works with.
+    """
+    return import_module(_PROVIDERS[cloud_platform.upper()])
+
+
+def get_loaded_providers() -> List[str]:
+    """
+    Returns the platforms whose implementation is already imported
+    """
+    return [name for name, module in _PROVIDERS.items() if module in sys.modules]
+
+
+def expire_listings() -> None:
+    """
+    Drops the listings of the instances the imported platforms keep longer
+    than the TTL, the credentials and the clients are kept
+    """
+    for cloud_platform in get_loaded_providers():
+        get_provider(cloud_platform).expire_listings()
+
+
+def reset_sessions() -> None:
+    """
+    Drops the sessions of the imported platforms, credentials and clients included
+    """
+    for cloud_platform in get_loaded_providers():
+        get_provider(cloud_platform).reset_sessions()
+
+
+def is_auth_failure(err: BaseException) -> bool:
+    """
+    True if the error, or an error it was raised on, e.g. the one a login
+    callback exits on, is an authentication failure of an imported platform
+    """
+    modules = [get_provider(name) for name in get_loaded_providers()]
+    seen: Set[int] = set()
+    error: Optional[BaseException] = err
+    while error is not None and id(error) not in seen:
+        if any(module.is_auth_error(error) for module in modules):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
@@ -3,25 +3,23 @@ import os
 import platform
 import sys
 from datetime import datetime
-from typing import Dict, Final, Optional
+from typing import Any, Dict, Final, NamedTuple, Optional, Tuple
 
 import backoff
 import boto3
 import botocore
 from boto3.session import Session
+from botocore.client import BaseClient
 from jdict import jdict, patch_module
 
 from pyclvm.login import _login_aws
 
-from .user_data import fetch, store
+from .user_data import fetch_credentials, lock, store_credentials
 
 patch_module("botocore.parsers")
 patch_module("botocore.configloader")
 
 
-_STS_CLIENT: Final = boto3.client("sts")
-
-
 class Credentials(jdict):
     AccessKeyId: str
     SecretAccessKey: str
@@ -30,17 +28,40 @@ class Credentials(jdict):
     Region: str
 
 
+class _CachedSession(NamedTuple):
+    session: Session
+    expiration: datetime
+    clients: Dict[str, BaseClient]
+
+
+# sessions and clients are built on demand and reused while the credentials are valid
+_SESSIONS: Final[Dict[Tuple[str, Optional[str]], _CachedSession]] = {}
+
+# the credentials refused before they expire, e.g. revoked
+_AUTH_ERROR_CODES: Final[Tuple[str, ...]] = (
+    "AuthFailure",
+    "ExpiredToken",
+    "ExpiredTokenException",
+    "InvalidClientTokenId",
+    "RequestExpired",
+    "UnrecognizedClientException",
+)
+
+
 def make_file_name(profile: str) -> str:
     return f"aws-{profile}-credentials"
 
 
+def _is_valid(expiration: datetime) -> bool:
+    return expiration > datetime.now(expiration.tzinfo)
+
+
 def _read_credentials(profile: str) -> Optional[Credentials]:
-    try:
-        credentials = fetch(make_file_name(profile))
-        expiration = datetime.fromisoformat(credentials.Expiration)
-        return credentials if expiration > datetime.now(expiration.tzinfo) else None
-    except FileNotFoundError:
+    credentials = fetch_credentials(make_file_name(profile))
+    if not credentials:
         return None
+    expiration = datetime.fromisoformat(credentials.Expiration)
+    return credentials if _is_valid(expiration) else None
 
 
 def _get_config(profile: str) -> jdict:
@@ -59,7 +80,7 @@ def _store_credentials(profile: str, credentials: Credentials) -> None:
     credentials.Expiration = datetime.isoformat(
         credentials.Expiration
     )  # to make it json serializable
-    store(make_file_name(profile), credentials)
+    store_credentials(make_file_name(profile), credentials, credentials.Expiration)
 
 
 def _invalid_mfa_code_provided(details):
@@ -114,9 +135,10 @@ def _get_profile_credentials(profile: str, config: jdict) -> Credentials:
 def _get_role_credentials(profile: str, config: jdict) -> Credentials:
     source_profile = config.source_profile
     source_config = _get_config(source_profile)
-    source_credentials = _read_credentials(source_profile) or _get_profile_credentials(
-        source_profile, source_config
-    )
+    with lock(make_file_name(source_profile)):
+        source_credentials = _read_credentials(
+            source_profile
+        ) or _get_profile_credentials(source_profile, source_config)
     credentials = (
         _make_session(source_credentials, profile)
         .client("sts")
@@ -140,19 +162,60 @@ def _get_credentials(profile: str) -> Dict:
     )
 
 
-def _make_session(credentials, profile) -> Session:
+def _make_session(credentials, profile, region: Optional[str] = None) -> Session:
     return Session(
         aws_access_key_id=credentials.AccessKeyId,
         aws_secret_access_key=credentials.SecretAccessKey,
         aws_session_token=credentials.SessionToken,
-        region_name=credentials.Region,
+        region_name=region or credentials.Region,
         profile_name=profile,
     )
 
 
-def get_session(kwargs: Dict[str, str]) -> Session:
+def _get_cached_session(kwargs: Dict[str, str]) -> _CachedSession:
     profile = kwargs.get("profile", "default")
+    key = (profile, kwargs.get("region"))
+    cached = _SESSIONS.get(key)
+    if cached and _is_valid(cached.expiration):
+        return cached
     boto3.setup_default_session(profile_name=profile)
-    return _make_session(
-        (_read_credentials(profile) or _get_credentials(profile)), profile
+    # concurrent clvm processes wait for the one asking for the MFA code
+    with lock(make_file_name(profile)):
+        credentials = _read_credentials(profile) or _get_credentials(profile)
+    _SESSIONS[key] = _CachedSession(
+        _make_session(credentials, profile, key[1]),
+        datetime.fromisoformat(credentials.Expiration),
+        {},
+    )
+    return _SESSIONS[key]
+
+
+def get_session(kwargs: Dict[str, str]) -> Session:
+    return _get_cached_session(kwargs).session
+
+
+def get_client(service: str, kwargs: Dict[str, str]) -> Any:
+    """
+    Returns a client of the service, shared by all callers with the same profile and region
+    """
+    cached = _get_cached_session(kwargs)
+    if service not in cached.clients:
+        cached.clients[service] = cached.session.client(service)
+    return cached.clients[service]
+
+
+def reset_sessions() -> None:
+    """
+    Drops the sessions and their clients, e.g. once their credentials are refused,
+    the next command reads the stored credentials again
+    """
+    _SESSIONS.clear()
+
+
+def is_auth_error(err: BaseException) -> bool:
+    if isinstance(err, botocore.exceptions.NoCredentialsError):
+        return True
+    return (
+        isinstance(err, botocore.exceptions.ClientError)
+        and err.response.get("Error", {}).get("Code") in _AUTH_ERROR_CODES
     )
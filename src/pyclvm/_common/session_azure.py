@@ -3,17 +3,24 @@
 import importlib
 import json
 import os
-from collections import defaultdict
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Final, Iterable, Iterator, List, Optional, Tuple
 
-from _common.azure_rest_api import AzureRestApi
 from azure.core.exceptions import ClientAuthenticationError
-from singleton_decorator import singleton
 
 from pyclvm.login import _login_azure
 
+from .azure_rest_api import AzureRestApi, PooledAzureRestApi
+from .filters import Filters
+from .inventory import Inventory
+
+# a session is reused by the callers with the same arguments and environment
+_SESSION_ARGUMENTS: Final[Tuple[str, ...]] = ("profile", "location", "ttl", "refresh")
+_SESSION_VARIABLES: Final[Tuple[str, ...]] = (
+    "AZURE_DEFAULT_LOCATION",
+    "CLVM_INVENTORY_TTL",
+)
+
 
-@singleton
 class AzureSession:
     """
     Azure session class
@@ -22,16 +29,30 @@ class AzureSession:
     def __init__(self, **kwargs):
         importlib.reload(json)
         self._profile = self._zone = kwargs.get("profile", None)  # TODO handle profiles
+        self._kwargs = kwargs
         self._login(**kwargs)
-        self._location = kwargs.get(
+        self.reset()
+
+    # ---
+    def reset(self) -> None:
+        """
+        Drops the listing of the instances, keeps the credentials
+        """
+        self._location = self._kwargs.get(
             "location", os.getenv("AZURE_DEFAULT_LOCATION", "westeurope")
         )
-        try:
-            self._instances = self._get_instances()
-        except ClientAuthenticationError:
-            self._login(**{**kwargs, **{"expired": True}})
-            self._instances = self._get_instances()
+        self._instances: Optional[Dict] = None
+        self._inventory = Inventory("AZURE", self._subscription_id, **self._kwargs)
 
+    # ---
+    @property
+    def outdated(self) -> bool:
+        """
+        True if the listing of the instances is older than the TTL, or to be refreshed
+        """
+        return self._inventory.outdated
+
+    # ---
     def _login(self, **kwargs):
         (
             self._credentials,
@@ -40,25 +61,102 @@ class AzureSession:
         ) = _login_azure(**kwargs)
 
     # ---
-    def _get_instances(self) -> Dict:
-        rest_client = AzureRestApi(
-            credentials=self._credentials, subscription_id=self._subscription_id
+    def _get_rest_api(self) -> AzureRestApi:
+        try:
+            return AzureRestApi(
+                credentials=self._credentials, subscription_id=self._subscription_id
+            )
+        except ClientAuthenticationError:
+            self._login(**{**self._kwargs, **{"expired": True}})
+            return AzureRestApi(
+                credentials=self._credentials, subscription_id=self._subscription_id
+            )
+
+    # ---
+    def get_pooled_rest_api(self, limit: int) -> PooledAzureRestApi:
+        """
+        Returns the REST API of the concurrent operations on VMs, over `limit` connections
+        """
+        return PooledAzureRestApi(self._get_rest_api(), limit)
+
+    # ---
+    @staticmethod
+    def _make_entry(instance: Dict) -> Dict:
+        statuses = instance["properties"]["instanceView"]["statuses"]
+        return {
+            "instance_id": instance["properties"]["vmId"],
+            "resource_group": instance["id"].split("/")[4],
+            "location": instance["location"],
+            "instance_name": instance["name"],
+            "state": statuses[1]["displayStatus"],
+            "instance_type": instance["properties"]
+            .get("hardwareProfile", {})
+            .get("vmSize"),
+            # the last provisioning operation, the start of a running VM
+            "launch_time": statuses[0].get("time"),
+        }
+
+    # ---
+    def _iter_vm_instances(self) -> Iterator[Tuple[str, Dict]]:
+        instances = {}
+        vm_instances = self._get_rest_api().iter_vm_instances(
+            _filter={"statusOnly": "true"}
+        )
+        for instance in vm_instances:
+            instances[instance["name"]] = self._make_entry(instance)
+            yield instance["name"], instances[instance["name"]]
+        # complete listings only
+        self._instances = instances
+
+    # ---
+    def iter_instances(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Streams the Azure VM instances page by page, indexes them on the way
+        """
+        if self._instances is not None:
+            yield from self._instances.items()
+            return
+        yield from self._iter_vm_instances()
+        self._inventory.store(self._instances.items())
+
+    # ---
+    def iter_matching_instances(self, filters: Filters) -> Iterator[Tuple[str, Dict]]:
+        """
+        Streams the Azure VM instances matching the filters, the service filters
+        the VMs by scale set only, so they are filtered on the way, page by page.
+        The states are the power states, e.g. running, deallocated.
+        """
+        vm_instances = self._get_rest_api().iter_vm_instances(
+            _filter={"statusOnly": "true"}
+        )
+        for instance in vm_instances:
+            power_state = instance["properties"]["instanceView"]["statuses"][1]["code"]
+            if filters.matches(
+                instance["name"],
+                power_state.rpartition("/")[2],
+                instance.get("tags", {}),
+            ):
+                yield instance["name"], self._make_entry(instance)
+
+    # ---
+    def list_states(self) -> Dict[str, str]:
+        """
+        Returns the states of the instances by id, with the run time status
+        of the VMs (statusOnly), the inventory is left as it is
+        """
+        vm_instances = self._get_rest_api().iter_vm_instances(
+            _filter={"statusOnly": "true"}
         )
-        _instances = rest_client.list_of_vm_instances(_filter={"statusOnly": "true"})
-
-        instances = defaultdict()
-        for instance in _instances:
-            resource_group = instance["id"].split("/")[4]
-            instances[f"{instance['name']}"] = {
-                "instance_id": instance["properties"]["vmId"],
-                "resource_group": resource_group,
-                "location": instance["location"],
-                "instance_name": instance["name"],
-                "state": instance["properties"]["instanceView"]["statuses"][1][
-                    "displayStatus"
-                ],
-            }
-        return dict(instances)
+        return {
+            instance["properties"]["vmId"]: instance["properties"]["instanceView"][
+                "statuses"
+            ][1]["displayStatus"]
+            for instance in vm_instances
+        }
+
+    # ---
+    def _list_inventory(self) -> List[Tuple[str, Dict]]:
+        return list(self._iter_vm_instances())
 
     # ---
     @property
@@ -66,8 +164,44 @@ class AzureSession:
         """
         Returns Azure VM instances
         """
+        if self._instances is None:
+            self._inventory.store(self._list_inventory())
         return self._instances
 
+    # ---
+    def _fetch_instance(self, instance_name: str) -> Optional[Dict]:
+        """
+        Finds the resource group of a VM, then gets the VM, two requests
+        instead of listing every VM of the subscription
+        """
+        rest_api = self._get_rest_api()
+        for resource in rest_api.find_vm_instances(instance_name):
+            return self._make_entry(
+                rest_api.vm_instance(resource["id"].split("/")[4], resource["name"])
+            )
+        return None
+
+    # ---
+    def find_instances(
+        self, instance_names: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Returns the inventory entries (id, resource group, location, state) of several instances by name,
+        resolved at once
+        """
+        return self._inventory.get_many(
+            instance_names, self._list_inventory, self._fetch_instance
+        )
+
+    # ---
+    def find_instance(self, instance_name: str) -> Optional[Dict]:
+        """
+        Returns the inventory entry (id, resource group, location, state) of an instance
+        """
+        return self._inventory.get(
+            instance_name, self._list_inventory, self._fetch_instance
+        )
+
     # ---
     def _get_subscription(self) -> Tuple[str, str]:
         return self._subscription_name, self._subscription_id
@@ -96,5 +230,39 @@ class AzureSession:
         return self._subscription_name
 
 
+_SESSIONS: Final[Dict[Tuple, AzureSession]] = {}
+
+
+def _get_key(kwargs: Dict[str, str]) -> Tuple:
+    return tuple(kwargs.get(name) for name in _SESSION_ARGUMENTS) + tuple(
+        os.getenv(name) for name in _SESSION_VARIABLES
+    )
+
+
+def expire_listings() -> None:
+    """
+    Drops the listings of the instances older than the TTL, e.g. between
+    the commands run by the agent, the credentials and the clients are kept
+    """
+    for session in _SESSIONS.values():
+        if session.outdated:
+            session.reset()
+
+
+def reset_sessions() -> None:
+    """
+    Drops the sessions, e.g. once their credentials are refused,
+    the next command authenticates again
+    """
+    _SESSIONS.clear()
+
+
+def is_auth_error(err: BaseException) -> bool:
+    return isinstance(err, ClientAuthenticationError)
+
+
 def get_session(**kwargs) -> AzureSession:
-    return AzureSession(**kwargs)
+    key = _get_key(kwargs)
+    if key not in _SESSIONS:
+        _SESSIONS[key] = AzureSession(**kwargs)
+    return _SESSIONS[key]
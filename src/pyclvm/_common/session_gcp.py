@@ -2,33 +2,132 @@
 
 import json
 import os
+import re
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser, NoOptionError
-from typing import Any, Iterable, Union
+from functools import partial
+from typing import Any, Dict, Final, Iterable, Iterator, List, Optional, Tuple, Union
 
 from google.auth.credentials import Credentials
 from google.auth.exceptions import DefaultCredentialsError, RefreshError
-from google.auth.transport.requests import AuthorizedSession
-from google.cloud.compute_v1 import AggregatedListInstancesRequest, InstancesClient
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.cloud.compute_v1 import (
+    AggregatedListInstancesRequest,
+    Instance,
+    InstancesClient,
+    ListInstancesRequest,
+)
 from google.oauth2 import credentials, service_account
-from singleton_decorator import singleton
 
 from pyclvm.login import _get_config_path, _login_gcp
 from pyclvm.plt import _get_os
 
+from .filters import Filters
+from .inventory import Inventory
+
 _OS = _get_os()
 
+_MAX_ZONE_WORKERS: Final[int] = 8
+
+# partial responses of the state reads, the `fields` system parameter as a header
+_FIELD_MASK_HEADER: Final[str] = "x-goog-fieldmask"
+_ZONE_STATE_FIELDS: Final[str] = "nextPageToken,items(id,status)"
+_STATE_FIELDS: Final[str] = "nextPageToken,items/*/instances(id,status)"
+
+# a session is reused by the callers with the same arguments and environment
+_SESSION_ARGUMENTS: Final[Tuple[str, ...]] = (
+    "profile",
+    "project",
+    "zone",
+    "zones",
+    "ttl",
+    "refresh",
+)
+_SESSION_VARIABLES: Final[Tuple[str, ...]] = (
+    "CLOUDSDK_COMPUTE_ZONE",
+    "GOOGLE_APPLICATION_CREDENTIALS",
+    "CLVM_INVENTORY_TTL",
+)
+
+
+def _get_zones(kwargs: Dict[str, str]) -> List[str]:
+    return sorted(set(filter(None, kwargs.get("zones", "").split(","))))
+
+
+def _to_regex(pattern: str) -> str:
+    # the names and labels are made of letters, digits, - and _, all literal
+    return "".join(
+        ".*"
+        if char == "*"
+        else "."
+        if char == "?"
+        else char
+        if char.isalnum() or char in "-_"
+        else re.escape(char)
+        for char in pattern
+    )
+
+
+def _build_filter(filters: Filters) -> str:
+    """
+    Filter expression of the Compute API, the `eq` syntax matches the whole field
+    with a regular expression, so the name patterns are filtered by the service too
+    """
+    expressions = []
+    if filters.states:
+        states = "|".join(state.upper() for state in filters.states)
+        expressions.append(f'(status eq "({states})")')
+    if filters.names:
+        names = "|".join(_to_regex(name) for name in filters.names)
+        expressions.append(f'(name eq "({names})")')
+    expressions.extend(
+        f'(labels.{key} eq "{_to_regex(value)}")'
+        for key, value in filters.labels.items()
+    )
+    return " ".join(expressions)
+
 
-@singleton
 class GcpSession:
     """
     GCP instance class
     """
 
     def __init__(self, **kwargs):
-        scopes = ["https://www.googleapis.com/auth/cloud-platform"]
         self._profile = self._zone = kwargs.get("profile", None)  # TODO handle profiles
+        self._kwargs = kwargs
+        self._authenticate(**kwargs)
+        self._client = InstancesClient(credentials=self._credentials)
+        self._zones = _get_zones(kwargs)
+        self.reset()
+
+    # ---
+    def reset(self) -> None:
+        """
+        Drops the listing of the instances, keeps the credentials and the client
+        """
+        self._zone = self._kwargs.get(
+            "zone", os.getenv("CLOUDSDK_COMPUTE_ZONE", "europe-west2-b")
+        )
+        # listed on first use only, the commands on a named instance do not need it
+        self._instances: Optional[Iterable] = None
+        # a listing of some of the zones is an inventory of its own
+        self._inventory = Inventory(
+            "GCP", ":".join([self.project_id, *self._zones]), **self._kwargs
+        )
+
+    # ---
+    @property
+    def outdated(self) -> bool:
+        """
+        True if the listing of the instances is older than the TTL, or to be refreshed
+        """
+        return self._inventory.outdated
+
+    # ---
+    def _authenticate(self, **kwargs) -> None:
+        scopes = ["https://www.googleapis.com/auth/cloud-platform"]
         self._credentials = None
 
         try:
@@ -81,29 +180,173 @@ class GcpSession:
 
         self._expired = self._authed_session.credentials.expired
         self._verify = self._authed_session.verify
-        self._client = InstancesClient(credentials=self._credentials)
-        self._zone = kwargs.get(
-            "zone", os.getenv("CLOUDSDK_COMPUTE_ZONE", "europe-west2-b")
-        )
-        self._instances = self._get_instances()
+        # fails here on the outdated credentials, get_session() logs in again
+        if not self._credentials.valid:
+            self._credentials.refresh(Request())
+
+    # ---
+    def _list_zone(self, zone: str, _filter: str = "") -> List[Instance]:
+        request = ListInstancesRequest(project=self.project_id, zone=zone)
+        request.filter = _filter
+        return list(self._client.list(request=request))
 
     # ---
-    def _get_instances(self) -> Iterable:
+    def _list_zones(
+        self, _filter: str = ""
+    ) -> Iterator[Tuple[str, Iterable[Instance]]]:
+        """
+        Lists the zones of `zones=` concurrently, all the zones at once otherwise
+        """
+        if self._zones:
+            with ThreadPoolExecutor(
+                max_workers=min(len(self._zones), _MAX_ZONE_WORKERS)
+            ) as executor:
+                yield from zip(
+                    self._zones,
+                    executor.map(
+                        partial(self._list_zone, _filter=_filter), self._zones
+                    ),
+                )
+            return
+
         request = AggregatedListInstancesRequest()
         request.project = self.project_id
+        request.filter = _filter
+        for zone, instances_in_zone in self._client.aggregated_list(request=request):
+            if instances_in_zone.instances:
+                yield zone.rpartition("/")[2], instances_in_zone.instances
+
+    # ---
+    @staticmethod
+    def _make_entry(zone: str, instance: Instance) -> Dict[str, str]:
+        return {"instance_id": str(instance.id), "zone": zone, "state": instance.status}
+
+    # ---
+    def _list_inventory(self) -> List[Tuple[str, Dict[str, str]]]:
+        self._instances = []
+        inventory = []
+        for zone, instances in self._list_zones():
+            self._instances.extend(instances)
+            inventory.extend(
+                (instance.name, self._make_entry(zone, instance))
+                for instance in instances
+            )
+        return inventory
 
+    # ---
+    def _fetch_instance(self, instance_name: str) -> Optional[Dict[str, str]]:
+        """
+        Finds an instance of any zone by name, the listing is filtered
+        by the service, so the response holds this instance only
+        """
+        request = AggregatedListInstancesRequest()
+        request.project = self.project_id
+        request.filter = f'name = "{instance_name}"'
         for zone, instances_in_zone in self._client.aggregated_list(request=request):
-            if f"zones/{self._zone}" == zone:
-                return instances_in_zone.instances
+            zone = zone.rpartition("/")[2]
+            if self._zones and zone not in self._zones:
+                continue
+            for instance in instances_in_zone.instances:
+                return self._make_entry(zone, instance)
+        return None
 
     # ---
     @property
     def instances(self) -> Iterable:
         """
-        Returns Azure VM instances
+        Returns GCP VM instances of all the zones, or of the zones of `zones=`
         """
+        if self._instances is None:
+            self._inventory.store(self._list_inventory())
         return self._instances
 
+    # ---
+    def _iter_listing(self) -> Iterator[Instance]:
+        instances = []
+        inventory = []
+        for zone, zone_instances in self._list_zones():
+            instances.extend(zone_instances)
+            inventory.extend(
+                (instance.name, self._make_entry(zone, instance))
+                for instance in zone_instances
+            )
+            yield from zone_instances
+        # complete listings only
+        self._instances = instances
+        self._inventory.store(inventory)
+
+    # ---
+    def iter_instances(self, filters: Optional[Filters] = None) -> Iterator[Instance]:
+        """
+        Streams the instances matching the filters, filtered by the service.
+        Not a complete listing, so the inventory is left as it is.
+        Without filters all the instances are streamed page by page of the
+        aggregated listing, and indexed on the way.
+        """
+        if filters and not filters.empty:
+            for _, instances in self._list_zones(_build_filter(filters)):
+                yield from instances
+        elif self._instances is not None:
+            yield from self._instances
+        else:
+            yield from self._iter_listing()
+
+    # ---
+    def _list_zone_states(self, zone: str) -> List[Instance]:
+        request = ListInstancesRequest(project=self.project_id, zone=zone)
+        return list(
+            self._client.list(
+                request=request, metadata=[(_FIELD_MASK_HEADER, _ZONE_STATE_FIELDS)]
+            )
+        )
+
+    # ---
+    def list_states(self) -> Dict[str, str]:
+        """
+        Returns the states of the instances by id, the responses hold
+        the ids and the states only
+        """
+        if self._zones:
+            with ThreadPoolExecutor(
+                max_workers=min(len(self._zones), _MAX_ZONE_WORKERS)
+            ) as executor:
+                zones = list(executor.map(self._list_zone_states, self._zones))
+        else:
+            request = AggregatedListInstancesRequest()
+            request.project = self.project_id
+            zones = [
+                instances_in_zone.instances
+                for _, instances_in_zone in self._client.aggregated_list(
+                    request=request, metadata=[(_FIELD_MASK_HEADER, _STATE_FIELDS)]
+                )
+            ]
+        return {
+            str(instance.id): instance.status
+            for instances in zones
+            for instance in instances
+        }
+
+    # ---
+    def find_instances(
+        self, instance_names: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Returns the inventory entries (id, zone, state) of several instances by name,
+        resolved at once
+        """
+        return self._inventory.get_many(
+            instance_names, self._list_inventory, self._fetch_instance
+        )
+
+    # ---
+    def find_instance(self, instance_name: str) -> Optional[Dict[str, str]]:
+        """
+        Returns the inventory entry (id, zone, state) of an instance
+        """
+        return self._inventory.get(
+            instance_name, self._list_inventory, self._fetch_instance
+        )
+
     # ---
     def get_credentials(self) -> Credentials:
         return self._credentials
@@ -131,8 +374,49 @@ class GcpSession:
         return self.project_id
 
 
+_SESSIONS: Final[Dict[Tuple, GcpSession]] = {}
+
+
+def _get_key(kwargs: Dict[str, str]) -> Tuple:
+    return tuple(kwargs.get(name) for name in _SESSION_ARGUMENTS) + tuple(
+        os.getenv(name) for name in _SESSION_VARIABLES
+    )
+
+
+# ---
+def expire_listings() -> None:
+    """
+    Drops the listings of the instances older than the TTL, e.g. between
+    the commands run by the agent, the credentials and the clients are kept
+    """
+    for session in _SESSIONS.values():
+        if session.outdated:
+            session.reset()
+
+
+# ---
+def reset_sessions() -> None:
+    """
+    Drops the sessions, e.g. once their credentials are refused,
+    the next command authenticates again
+    """
+    _SESSIONS.clear()
+
+
+# ---
+def is_auth_error(err: BaseException) -> bool:
+    return isinstance(err, (RefreshError, DefaultCredentialsError))
+
+
 # ---
 def get_session(**kwargs) -> GcpSession:
+    key = _get_key(kwargs)
+    if key not in _SESSIONS:
+        _SESSIONS[key] = _make_session(**kwargs)
+    return _SESSIONS[key]
+
+
+def _make_session(**kwargs) -> GcpSession:
     try:
         return GcpSession(**kwargs)
     except RefreshError:
@@ -1,35 +1,288 @@
 """
 User Data Access Utility
-Adopted from https://gist.github.com/jslay88/1fd8a8ba1d05ff2a4810520785a67891
+
+The local state of clvm (settings, credentials, redirection sessions, caches)
+is kept in a single SQLite database, so that concurrent clvm processes
+(e.g. parallel ssh ProxyCommands) update it atomically.
 """
 import json
 import os
 import pathlib
-from typing import Final
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from time import time
+from typing import Dict, Final, Iterator, List, Optional, Tuple
 
 from jdict import jdict, set_json_decoder
 
+try:
+    import fcntl
+except ImportError:  # Windows, the store itself is still safe, see lock()
+    fcntl = None  # type: ignore
+
 _SYSTEM_CLVM_PATH: Final[pathlib.Path] = os.path.expanduser("~/.clvm")
 SYSTEM_CLVM_PATH = pathlib.Path(_SYSTEM_CLVM_PATH)
 
+_DATABASE_PATH: Final[pathlib.Path] = SYSTEM_CLVM_PATH / "state.db"
+
+# the data directory of ec2instances, the previous versions kept the redirects there
+_SYSTEM_USER_DIR: Final[Dict[str, str]] = {
+    "win32": "AppData/Roaming",
+    "linux": ".local/share",
+    "darwin": "Library/Application Support",
+}
+_SYSTEM_SSM_PATH: Final[Optional[pathlib.Path]] = (
+    pathlib.Path.home() / _SYSTEM_USER_DIR[sys.platform] / "ssm"
+    if sys.platform in _SYSTEM_USER_DIR
+    else None
+)
+
+_SCHEMA_VERSION: Final[int] = 1
+
+_SCHEMA: Final[
+    str
+] = """
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS credentials (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at TEXT
+);
+CREATE TABLE IF NOT EXISTS redirects (
+    name TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    session_id TEXT
+);
+CREATE TABLE IF NOT EXISTS cache (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
 set_json_decoder(json)
 
-SYSTEM_CLVM_PATH.mkdir(parents=True, exist_ok=True)
+# one connection per process, shared by the threads
+_LOCK: Final = threading.RLock()
+_connection: Optional[sqlite3.Connection] = None
+
+
+def _migrate(connection: sqlite3.Connection) -> List[pathlib.Path]:
+    """
+    Imports the JSON files used by the previous versions
+
+    Returns:
+        the files imported, to be removed once committed
+    """
+    migrations = (
+        (SYSTEM_CLVM_PATH, ".cache.json", _migrate_settings),
+        (SYSTEM_CLVM_PATH, "token.json", _migrate_azure_token),
+        (SYSTEM_CLVM_PATH, "aws-*-credentials.json", _migrate_credentials),
+        (SYSTEM_CLVM_PATH, "*-8080=*.json", _migrate_redirect),
+        (_SYSTEM_SSM_PATH, "*-8080=*.json", _migrate_redirect),
+        (SYSTEM_CLVM_PATH, "commands.json", None),
+    )
+    migrated = []
+    for directory, pattern, migrate in migrations:
+        if directory is None:
+            continue
+        for file_path in directory.glob(pattern):
+            try:
+                if migrate:
+                    with file_path.open("r") as file:
+                        migrate(connection, file_path.stem, json.load(file))
+                migrated.append(file_path)
+            except (OSError, ValueError, KeyError, TypeError):
+                continue  # a broken file, leave it as is
+    return migrated
+
+
+def _migrate_settings(connection: sqlite3.Connection, _: str, data: Dict) -> None:
+    connection.executemany(
+        "INSERT OR REPLACE INTO settings VALUES (?, ?)", data.items()
+    )
+
+
+def _migrate_azure_token(connection: sqlite3.Connection, _: str, data: list) -> None:
+    token, expires_on = data
+    _store_credentials(
+        connection,
+        "azure-token",
+        {"token": token, "expires_on": expires_on},
+        str(expires_on),
+    )
+
+
+def _migrate_credentials(connection: sqlite3.Connection, name: str, data: Dict) -> None:
+    _store_credentials(connection, name, data, data.get("Expiration"))
+
+
+def _migrate_redirect(connection: sqlite3.Connection, name: str, data: Dict) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)",
+        (name, data["pid"], data.get("session_id")),
+    )
+
+
+def _connect() -> sqlite3.Connection:
+    SYSTEM_CLVM_PATH.mkdir(mode=0o700, parents=True, exist_ok=True)
+    connection = sqlite3.connect(
+        _DATABASE_PATH, timeout=30, isolation_level=None, check_same_thread=False
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    if connection.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        _create_schema(connection)
+    return connection
+
+
+def _create_schema(connection: sqlite3.Connection) -> None:
+    migrated = []
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        # another process may have done it while we were waiting for the lock
+        if connection.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            for statement in filter(str.strip, _SCHEMA.split(";")):
+                connection.execute(statement)
+            migrated = _migrate(connection)
+            connection.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+    for file_path in migrated:
+        file_path.unlink(missing_ok=True)
+
+
+def _get_connection() -> sqlite3.Connection:
+    global _connection
+    if _connection is None:
+        _connection = _connect()
+    return _connection
+
+
+@contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    with _LOCK:
+        connection = _get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+def _fetch_one(query: str, *params) -> Optional[Tuple]:
+    with _LOCK:
+        return _get_connection().execute(query, params).fetchone()
+
+
+@contextmanager
+def lock(name: str) -> Iterator[None]:
+    """
+    Cross process lock, e.g. for not asking for the same MFA code
+    in several ssh ProxyCommands started at once
+    """
+    SYSTEM_CLVM_PATH.mkdir(mode=0o700, parents=True, exist_ok=True)
+    with (SYSTEM_CLVM_PATH / f"{name}.lock").open("a") as file:
+        if fcntl:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        yield
+
+
+def data_version() -> int:
+    """
+    Changes whenever another process modifies the store
+    """
+    return _fetch_one("PRAGMA data_version")[0]
+
+
+# --- settings
+def fetch_settings() -> Dict[str, str]:
+    with _LOCK:
+        return dict(_get_connection().execute("SELECT name, value FROM settings"))
+
+
+def store_setting(name: str, value: str) -> None:
+    with _transaction() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO settings VALUES (?, ?)", (name, value)
+        )
+
+
+# --- credentials
+def _store_credentials(
+    connection: sqlite3.Connection, name: str, data: Dict, expires_at: Optional[str]
+) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO credentials VALUES (?, ?, ?)",
+        (name, json.dumps(data), expires_at),
+    )
+
+
+def fetch_credentials(name: str) -> Optional[jdict]:
+    row = _fetch_one("SELECT data FROM credentials WHERE name = ?", name)
+    return json.loads(row[0]) if row else None
+
+
+def store_credentials(name: str, data: Dict, expires_at: Optional[str] = None) -> None:
+    with _transaction() as connection:
+        _store_credentials(connection, name, data, expires_at)
+
+
+def remove_credentials(name: str) -> bool:
+    with _transaction() as connection:
+        return (
+            connection.execute(
+                "DELETE FROM credentials WHERE name = ?", (name,)
+            ).rowcount
+            > 0
+        )
+
+
+# --- port redirection sessions
+def fetch_redirect(name: str) -> Optional[jdict]:
+    row = _fetch_one("SELECT pid, session_id FROM redirects WHERE name = ?", name)
+    return jdict(pid=row[0], session_id=row[1]) if row else None
+
+
+def store_redirect(name: str, pid: int, session_id: Optional[str]) -> None:
+    with _transaction() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)",
+            (name, pid, session_id),
+        )
 
 
-def get_credentials_file_path(name: str) -> pathlib.Path:
-    return SYSTEM_CLVM_PATH / f"{name}.json"
+def remove_redirect(name: str) -> None:
+    with _transaction() as connection:
+        connection.execute("DELETE FROM redirects WHERE name = ?", (name,))
 
 
-def fetch(name: str) -> jdict:
-    with get_credentials_file_path(name).open("r") as file:
-        return json.load(file)
+# --- caches
+def fetch_cache(name: str) -> Optional[Tuple[jdict, float]]:
+    """
+    Returns the cached data and the time it was stored at
+    """
+    row = _fetch_one("SELECT data, updated_at FROM cache WHERE name = ?", name)
+    return (json.loads(row[0]), row[1]) if row else None
 
 
-def store(name: str, data: jdict) -> None:
-    with get_credentials_file_path(name).open("w") as file:
-        json.dump(data, file)
+def store_cache(name: str, data: Dict) -> None:
+    with _transaction() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+            (name, json.dumps(data), time()),
+        )
 
 
-def remove(name: str) -> None:
-    get_credentials_file_path(name).unlink(missing_ok=True)
+def remove_cache(name: str) -> None:
+    with _transaction() as connection:
+        connection.execute("DELETE FROM cache WHERE name = ?", (name,))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+"""
+Minimal entry point for the SSH ProxyCommand generated by `clvm ssh new`
+"""
+
+import sys
+from typing import Dict, List, Tuple
+
+from pyclvm.ssh.start import start
+
+_USAGE = "usage: clvm-proxy instance_name port [name=value ...]"
+
+
+def _parse_args(args: List[str]) -> Tuple[str, int, Dict[str, str]]:
+    instance_name, port, *params = args
+    kwargs = {}
+    for param in params:
+        name, _, value = param.partition("=")
+        kwargs[name.replace("-", "_")] = value
+    return instance_name, int(port), kwargs
+
+
+def main() -> None:
+    """
+    Same as `clvm ssh start`, but without the command discovery of the full CLI.
+    ssh runs it for every connection, so only the selected platform is imported.
+    """
+    try:
+        instance_name, port, kwargs = _parse_args(sys.argv[1:])
+    except ValueError:
+        print(_USAGE, file=sys.stderr)
+        sys.exit(2)
+
+    start(instance_name, port, **kwargs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""background agent keeping cloud sessions warm"""
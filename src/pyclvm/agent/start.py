@@ -0,0 +1,33 @@
+"""start clvm agent"""
+
+import sys
+
+from pyclvm._common import agent
+
+
+def start(**kwargs: str) -> None:
+    """
+    start clvm agent keeping authenticated sessions, SDK clients and inventory in memory
+
+    Args:
+        **kwargs (str): (optional) classifiers, at the moment, idle (seconds before the agent exits, default 3600) and foreground (yes/no)
+
+    Returns:
+        None
+    """
+    if not agent.is_supported():
+        print("[ERROR] clvm agent requires Unix domain sockets support")
+        sys.exit(-1)
+
+    if agent.is_running():
+        print("[SKIPPED] clvm agent is already running")
+        return
+
+    idle_timeout = int(kwargs.get("idle", 3600))
+    if kwargs.get("foreground") in {"True", "true", "y", "yes"}:
+        agent.serve(idle_timeout)
+    elif agent.spawn(idle_timeout):
+        print("[INFO] clvm agent started")
+    else:
+        print("[ERROR] clvm agent failed to start")
+        sys.exit(-1)
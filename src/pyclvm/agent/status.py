@@ -0,0 +1,24 @@
+"""show clvm agent status"""
+
+from pyclvm._common import agent
+
+
+def status() -> None:
+    """
+    show clvm agent status
+
+    Returns:
+        None
+    """
+    response = agent.request("status")
+    if not response:
+        print("clvm agent is not running")
+        return
+    if response["status"] != "ok":
+        print(f"[ERROR] clvm agent: {response['error']}")
+        return
+    print(
+        f"clvm agent is running, pid {response['pid']}, uptime {response['uptime']}s",
+        f"warm platforms: {', '.join(response['platforms']) or '-'}",
+        sep="\n",
+    )
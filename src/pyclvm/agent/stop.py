@@ -0,0 +1,19 @@
+"""stop clvm agent"""
+
+from pyclvm._common import agent
+
+
+def stop() -> None:
+    """
+    stop clvm agent
+
+    Returns:
+        None
+    """
+    response = agent.request("stop")
+    if not response:
+        print("[SKIPPED] clvm agent is not running")
+    elif response["status"] != "ok":
+        print(f"[ERROR] clvm agent: {response['error']}")
+    else:
+        print("[INFO] clvm agent stopped")
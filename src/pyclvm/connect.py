@@ -3,21 +3,21 @@
 from functools import partial
 from typing import Dict, Union
 
-from pyclvm._common.azure_instance_mapping import AzureRemoteShellProxy
-from pyclvm._common.gcp_instance_mapping import GcpRemoteShellProxy
+from instances_map_abc.vm_instance_proxy import RemoteShellProxy
+
 from pyclvm.instance._process import process_instances
 from pyclvm.plt import (
     _default_platform,
     _get_supported_platforms,
     _unsupported_platform,
 )
-from pyclvm.ssm.session import start as start_session
+from pyclvm.ssm.session.start import start as start_session
 
 
 # ---
 def _connect(
     instance_name: str,
-    instance: Union[GcpRemoteShellProxy, AzureRemoteShellProxy],
+    instance: RemoteShellProxy,
     **kwargs,
 ) -> None:
     print(f"Starting {instance_name} ...")
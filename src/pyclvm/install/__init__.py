@@ -8,6 +8,8 @@
 # C:\> setx AWS_PROFILE user1
 """
 
-from .aws import aws
+from pyclvm._common.lazy_commands import lazy_commands
 
 __all__ = ["aws"]
+
+__getattr__ = lazy_commands(__name__, __all__)
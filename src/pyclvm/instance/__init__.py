@@ -1,7 +1,7 @@
 """vm instance management"""
-from .command import command
-from .ls import ls
-from .start import start
-from .stop import stop
+
+from pyclvm._common.lazy_commands import lazy_commands
 
 __all__ = ["start", "stop", "ls", "command"]
+
+__getattr__ = lazy_commands(__name__, __all__)
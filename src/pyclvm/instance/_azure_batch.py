@@ -0,0 +1,209 @@
+"""
+Bulk start and stop of Azure VMs
+
+The instance views, the start or deallocate requests and the polls of the states
+of all the VMs are run concurrently by a pool of threads, over a pool of connections.
+"""
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from time import perf_counter, sleep
+from typing import Any, Dict, Final, List, Optional, Tuple
+
+from pyclvm._common.session_azure import get_session
+
+from ._bulk import (
+    BatchAction,
+    InstanceResult,
+    get_timeout,
+    get_workers,
+    print_results,
+    should_wait,
+)
+
+_POLL_INTERVAL: Final[float] = 5.0
+
+_TIMEOUT: Final[float] = 600.0
+
+_ACTIONS: Final[Dict[str, BatchAction]] = {
+    "start": BatchAction(
+        "vm_start",
+        "VM running",
+        ("VM stopped", "VM deallocated"),
+        ("VM starting", "VM running"),
+    ),
+    "stop": BatchAction(
+        "vm_deallocate",
+        "VM deallocated",
+        ("VM running", "VM stopped"),
+        ("VM deallocating", "VM deallocated"),
+    ),
+}
+
+
+def _gather(
+    executor: Executor, func: Any, entries: Dict[str, Dict[str, str]]
+) -> Dict[str, Tuple[Any, Optional[str]]]:
+    """
+    Calls the API for every VM at once, returns the results and the errors by name
+    """
+
+    def _call(entry: Dict[str, str]) -> Tuple[Any, Optional[str]]:
+        try:
+            return func(entry["resource_group"].lower(), entry["instance_name"]), None
+        except Exception as err:
+            return None, f"{type(err).__name__}: {err}"
+
+    return dict(zip(entries, executor.map(_call, entries.values())))
+
+
+def _wait(
+    executor: Executor,
+    rest_api: Any,
+    action: BatchAction,
+    entries: Dict[str, Dict[str, str]],
+    started: float,
+    timeout: float,
+) -> Tuple[Dict[str, Optional[str]], Dict[str, float], Dict[str, str]]:
+    """
+    Polls the states of all the VMs concurrently, until they reach the target
+    state or the time is out, the states are read at least once
+
+    Returns:
+        the last states, the time each VM took to reach the target and the errors,
+        of the VMs not done in time as well
+    """
+    states: Dict[str, Optional[str]] = {}
+    elapsed: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    pending = dict(entries)
+    while pending:
+        sleep(min(_POLL_INTERVAL, max(0.0, timeout - (perf_counter() - started))))
+        for name, (state, error) in _gather(
+            executor, rest_api.vm_state, pending
+        ).items():
+            if error:
+                errors[name] = error
+                del pending[name]
+                continue
+            states[name] = state
+            if state == action.target:
+                elapsed[name] = perf_counter() - started
+                del pending[name]
+        if pending and perf_counter() - started >= timeout:
+            break
+    errors.update((name, f"not done in {timeout:.0f}s") for name in pending)
+    elapsed.update(dict.fromkeys(pending, timeout))
+    return states, elapsed, errors
+
+
+def _process_batch(
+    executor: Executor,
+    rest_api: Any,
+    action_name: str,
+    entries: Dict[str, Dict[str, str]],
+    started: float,
+    timeout: float,
+    wait: bool,
+) -> Tuple[Dict[str, Optional[str]], Dict[str, Optional[str]], Dict, Dict]:
+    action = _ACTIONS[action_name]
+    errors = {}
+    old_states = {}
+    for name, (state, error) in _gather(executor, rest_api.vm_state, entries).items():
+        old_states[name] = state
+        if error:
+            errors[name] = error
+        elif state not in action.ready + action.done:
+            errors[name] = f"can not {action_name} an instance in {state} state"
+
+    print(f"[INFO] {action_name.capitalize()} {len(entries)} instances ...")
+    sent = {
+        name: entry
+        for name, entry in entries.items()
+        if name not in errors and old_states[name] in action.ready
+    }
+    errors.update(
+        (name, error)
+        for name, (_, error) in _gather(
+            executor, getattr(rest_api, action.call), sent
+        ).items()
+        if error
+    )
+
+    awaited = {
+        name: entry
+        for name, entry in entries.items()
+        if name not in errors and old_states[name] != action.target
+    }
+    new_states = dict(old_states)
+    elapsed = {name: 0.0 for name in entries if name not in awaited}
+    if awaited and not wait:
+        new_states.update(
+            (name, state)
+            for name, (state, _) in _gather(
+                executor, rest_api.vm_state, awaited
+            ).items()
+        )
+    elif awaited:
+        states, waited, wait_errors = _wait(
+            executor, rest_api, action, awaited, started, timeout
+        )
+        new_states.update(states)
+        elapsed.update(waited)
+        errors.update(wait_errors)
+    return old_states, new_states, elapsed, errors
+
+
+def process_batch(
+    action_name: str, instance_names: Tuple[str, ...], **kwargs: str
+) -> List[InstanceResult]:
+    """
+    Starts or deallocates several Azure VMs concurrently, then waits for all
+    of them, unless wait=no
+
+    Args:
+        action_name (str): start or stop
+        instance_names (Tuple[str, ...]): names of the instances
+        **kwargs (str): workers=<n> requests at once, wait=no,
+            timeout=<seconds> (600 by default)
+
+    Returns:
+        List[InstanceResult]: old and new state, elapsed time or error, by instance
+    """
+    started = perf_counter()
+    workers = get_workers(kwargs)
+    timeout = get_timeout(kwargs, _TIMEOUT)
+    session = get_session(**kwargs)
+    entries = session.find_instances(instance_names)
+    found = {name: entry for name, entry in entries.items() if entry}
+
+    with session.get_pooled_rest_api(workers) as rest_api, ThreadPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        old_states, new_states, elapsed, errors = _process_batch(
+            executor,
+            rest_api,
+            action_name,
+            found,
+            started,
+            timeout,
+            should_wait(kwargs),
+        )
+
+    results = []
+    for name in dict.fromkeys(instance_names):
+        if name not in found:
+            results.append(
+                InstanceResult(name, None, None, 0.0, "No such instance registered")
+            )
+            continue
+        results.append(
+            InstanceResult(
+                name,
+                old_states.get(name),
+                None if name in errors else new_states.get(name),
+                elapsed.get(name, perf_counter() - started),
+                errors.get(name),
+            )
+        )
+    print_results(results)
+    return results
@@ -0,0 +1,81 @@
+"""
+The pieces shared by the start and stop of several instances,
+on a pool of threads or by the batches of a platform
+"""
+
+import sys
+from typing import Dict, Final, List, NamedTuple, Optional, Tuple
+
+MAX_WORKERS: Final[int] = 10
+
+_FALSE_VALUES: Final[Tuple[str, ...]] = ("n", "no", "f", "false", "off", "0")
+
+
+class InstanceResult(NamedTuple):
+    """
+    Outcome of the start or stop of an instance of several
+    """
+
+    name: str
+    old_state: Optional[str]
+    new_state: Optional[str]
+    elapsed: float
+    error: Optional[str] = None
+
+
+class BatchAction(NamedTuple):
+    """
+    Call of a bulk start or stop and the states it goes through
+    """
+
+    call: str
+    target: str
+    # the states the call applies to, the states already on the way to the target
+    ready: Tuple[str, ...]
+    done: Tuple[str, ...]
+
+
+def get_workers(kwargs: Dict[str, str]) -> int:
+    """
+    Returns the number of the requests at once, `workers=` (10 by default)
+    """
+    try:
+        workers = int(kwargs.get("workers", MAX_WORKERS))
+    except ValueError:
+        workers = 0
+    if workers <= 0:
+        print(f"[ERROR] workers={kwargs['workers']}: a positive number expected")
+        sys.exit(-1)
+    return workers
+
+
+def get_timeout(kwargs: Dict[str, str], default: float) -> float:
+    """
+    Returns the seconds to wait for the instances, `timeout=`, 0 checks them once
+    """
+    try:
+        timeout = float(kwargs.get("timeout", default))
+    except ValueError:
+        timeout = -1.0
+    if not timeout >= 0:  # nan as well
+        print(f"[ERROR] timeout={kwargs['timeout']}: a number of seconds expected")
+        sys.exit(-1)
+    return timeout
+
+
+def should_wait(kwargs: Dict[str, str]) -> bool:
+    """
+    False on `wait=no`, the instances are left on the way to the target state
+    """
+    return str(kwargs.get("wait", "yes")).lower() not in _FALSE_VALUES
+
+
+def print_results(results: List[InstanceResult]) -> None:
+    for result in results:
+        if result.error:
+            print(f"[ERROR] {result.name}: {result.error}")
+        else:
+            print(
+                f"[INFO] {result.name}: {result.old_state} -> {result.new_state}"
+                f" in {result.elapsed:.1f}s"
+            )
@@ -0,0 +1,198 @@
+"""
+Batched start and stop of EC2 instances
+
+The instances are grouped by the call they need, started or stopped by chunks
+of ids per call, then awaited together by one describe_instance_status loop.
+"""
+
+from time import perf_counter, sleep
+from typing import Any, Dict, Final, List, Tuple
+
+from botocore.exceptions import ClientError
+
+from pyclvm._common.session_aws import get_client, get_session
+
+from ._bulk import BatchAction, InstanceResult, get_timeout, print_results, should_wait
+from ._mapping import chunks, get_inventory, is_gone, read_states, resolve_instances
+
+_POLL_INTERVAL: Final[float] = 5.0
+
+# the call is tried again after 1, 2, 4 ... seconds while throttled
+_THROTTLING_ERRORS: Final[Tuple[str, ...]] = (
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+)
+_MAX_TRIES: Final[int] = 4
+
+_TIMEOUT: Final[float] = 600.0
+
+_ACTIONS: Final[Dict[str, BatchAction]] = {
+    "start": BatchAction(
+        "start_instances", "running", ("stopped",), ("pending", "running")
+    ),
+    "stop": BatchAction(
+        "stop_instances", "stopped", ("running",), ("stopping", "stopped")
+    ),
+}
+
+
+def _get_code(err: ClientError) -> str:
+    return err.response.get("Error", {}).get("Code", "")
+
+
+def _is_instance_error(err: ClientError) -> bool:
+    # errors of a single instance, failing the whole call of its chunk
+    return is_gone(err) or _get_code(err) == "IncorrectInstanceState"
+
+
+def _request(client: Any, action: BatchAction, instance_ids: List[str]) -> None:
+    for attempt in range(_MAX_TRIES):
+        try:
+            getattr(client, action.call)(InstanceIds=instance_ids)
+            return
+        except ClientError as err:
+            if _get_code(err) not in _THROTTLING_ERRORS or attempt == _MAX_TRIES - 1:
+                raise
+            sleep(2.0**attempt)
+
+
+def _call(client: Any, action: BatchAction, instance_ids: List[str]) -> Dict[str, str]:
+    """
+    Starts or stops the instances by chunks, returns the errors by instance id
+    """
+    errors = {}
+    for chunk in chunks(instance_ids):
+        try:
+            _request(client, action, chunk)
+        except ClientError as err:
+            if len(chunk) == 1 or not _is_instance_error(err):
+                # throttled for too long or failed as a whole, e.g. no permission
+                errors.update(dict.fromkeys(chunk, str(err)))
+                continue
+            # an instance in a wrong state fails the whole call, the rest go one by one
+            for instance_id in chunk:
+                try:
+                    _request(client, action, [instance_id])
+                except ClientError as err:
+                    errors[instance_id] = str(err)
+    return errors
+
+
+def _wait(
+    client: Any,
+    action: BatchAction,
+    instance_ids: List[str],
+    started: float,
+    timeout: float,
+) -> Tuple[Dict[str, str], Dict[str, float], Dict[str, str]]:
+    """
+    Polls the states of all the instances at once, until they reach the target
+    state or the time is out, the states are read at least once
+
+    Returns:
+        the last states, the time each instance took to reach the target
+        and the errors of the instances not done in time
+    """
+    states: Dict[str, str] = {}
+    elapsed: Dict[str, float] = {}
+    pending = list(instance_ids)
+    while pending:
+        sleep(min(_POLL_INTERVAL, max(0.0, timeout - (perf_counter() - started))))
+        states.update(read_states(client, pending))
+        for instance_id in pending:
+            if states.get(instance_id) == action.target:
+                elapsed[instance_id] = perf_counter() - started
+        pending = [instance_id for instance_id in pending if instance_id not in elapsed]
+        if pending and perf_counter() - started >= timeout:
+            break
+    errors = {instance_id: f"not done in {timeout:.0f}s" for instance_id in pending}
+    elapsed.update(dict.fromkeys(pending, timeout))
+    return states, elapsed, errors
+
+
+def process_batch(
+    action_name: str, instance_names: Tuple[str, ...], **kwargs: str
+) -> List[InstanceResult]:
+    """
+    Starts or stops several EC2 instances with a call per chunk of instances,
+    then waits for all of them, unless wait=no
+
+    Args:
+        action_name (str): start or stop
+        instance_names (Tuple[str, ...]): names of the instances
+        **kwargs (str): profile, region, wait=no, timeout=<seconds> (600 by default)
+
+    Returns:
+        List[InstanceResult]: old and new state, elapsed time or error, by instance
+    """
+    action = _ACTIONS[action_name]
+    started = perf_counter()
+    timeout = get_timeout(kwargs, _TIMEOUT)
+    client = get_client("ec2", kwargs)
+    entries, old_states = resolve_instances(
+        client, get_inventory(get_session(kwargs), **kwargs), instance_names
+    )
+    instance_ids = {
+        name: entry["instance_id"] for name, entry in entries.items() if entry
+    }
+
+    errors = {
+        name: "No such instance registered"
+        for name, entry in entries.items()
+        if not entry
+    }
+    for name, instance_id in instance_ids.items():
+        state = old_states.get(instance_id)
+        if state is None:
+            errors[name] = "No such instance"
+        elif state not in action.ready + action.done:
+            errors[name] = f"can not {action_name} an instance in {state} state"
+
+    print(f"[INFO] {action_name.capitalize()} {len(instance_ids)} instances ...")
+    call_errors = _call(
+        client,
+        action,
+        [
+            instance_id
+            for name, instance_id in instance_ids.items()
+            if name not in errors and old_states[instance_id] in action.ready
+        ],
+    )
+    errors.update(
+        (name, call_errors[instance_id])
+        for name, instance_id in instance_ids.items()
+        if instance_id in call_errors
+    )
+
+    awaited = [
+        instance_id
+        for name, instance_id in instance_ids.items()
+        if name not in errors and old_states[instance_id] != action.target
+    ]
+    new_states, elapsed = dict(old_states), {}
+    if awaited and not should_wait(kwargs):
+        new_states.update(read_states(client, awaited))
+    elif awaited:
+        states, elapsed, wait_errors = _wait(client, action, awaited, started, timeout)
+        new_states.update(states)
+        errors.update(
+            (name, wait_errors[instance_id])
+            for name, instance_id in instance_ids.items()
+            if instance_id in wait_errors
+        )
+
+    results = []
+    for name in dict.fromkeys(instance_names):
+        instance_id = instance_ids.get(name)
+        results.append(
+            InstanceResult(
+                name,
+                old_states.get(instance_id),
+                None if name in errors else new_states.get(instance_id),
+                elapsed.get(instance_id, 0.0),
+                errors.get(name),
+            )
+        )
+    print_results(results)
+    return results
@@ -0,0 +1,143 @@
+"""
+Bulk start and stop of GCP instances
+
+All the start or stop requests are sent first, then their long-running operations
+are awaited together by one waiter, so the instances take the time of the slowest.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, Final, List, Tuple
+
+from pyclvm._common.gcp_instance_proxy import wait_for_extended_operations
+from pyclvm._common.session_gcp import get_session
+
+from ._bulk import (
+    BatchAction,
+    InstanceResult,
+    get_timeout,
+    get_workers,
+    print_results,
+    should_wait,
+)
+
+_TIMEOUT: Final[float] = 300.0
+
+_ACTIONS: Final[Dict[str, BatchAction]] = {
+    "start": BatchAction(
+        "start",
+        "RUNNING",
+        ("TERMINATED", "STOPPED"),
+        ("PROVISIONING", "STAGING", "RUNNING"),
+    ),
+    "stop": BatchAction("stop", "TERMINATED", ("RUNNING",), ("STOPPING", "TERMINATED")),
+}
+
+
+def _send(session: Any, action: BatchAction, instance_name: str, zone: str) -> Any:
+    return getattr(session.get_client(), action.call)(
+        project=session.project_id, zone=zone, instance=instance_name
+    )
+
+
+def _send_all(
+    session: Any, action: BatchAction, zones: Dict[str, str], workers: int
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Sends the requests concurrently, returns the operations and the errors by name
+    """
+    operations, errors = {}, {}
+
+    def _send_one(instance_name: str) -> None:
+        try:
+            operations[instance_name] = _send(
+                session, action, instance_name, zones[instance_name]
+            )
+        except Exception as err:
+            errors[instance_name] = f"{type(err).__name__}: {err}"
+
+    if zones:
+        with ThreadPoolExecutor(max_workers=min(len(zones), workers)) as executor:
+            list(executor.map(_send_one, zones))
+    return operations, errors
+
+
+def process_batch(
+    action_name: str, instance_names: Tuple[str, ...], **kwargs: str
+) -> List[InstanceResult]:
+    """
+    Starts or stops several GCP instances, the requests are sent at once
+    and the operations awaited together, unless wait=no
+
+    Args:
+        action_name (str): start or stop
+        instance_names (Tuple[str, ...]): names of the instances
+        **kwargs (str): zones, workers=<n>, wait=no, timeout=<seconds> (300 by default)
+
+    Returns:
+        List[InstanceResult]: old and new state, elapsed time or error, by instance
+    """
+    action = _ACTIONS[action_name]
+    started = perf_counter()
+    workers = get_workers(kwargs)
+    timeout = get_timeout(kwargs, _TIMEOUT)
+    session = get_session(**kwargs)
+    entries = session.find_instances(instance_names)
+    old_states = session.list_states()
+
+    errors = {
+        name: "No such instance registered"
+        for name, entry in entries.items()
+        if not entry
+    }
+    states = {}
+    for name, entry in entries.items():
+        if entry:
+            states[name] = old_states.get(entry["instance_id"])
+            if states[name] is None:
+                errors[name] = "No such instance"
+            elif states[name] not in action.ready + action.done:
+                errors[
+                    name
+                ] = f"can not {action_name} an instance in {states[name]} state"
+
+    print(f"[INFO] {action_name.capitalize()} {len(states)} instances ...")
+    operations, send_errors = _send_all(
+        session,
+        action,
+        {
+            name: entries[name]["zone"]
+            for name in states
+            if name not in errors and states[name] in action.ready
+        },
+        workers,
+    )
+    errors.update(send_errors)
+
+    done: Dict[str, Tuple[float, Any]] = {}
+    waited = perf_counter()
+    if operations and should_wait(kwargs):
+        done = wait_for_extended_operations(
+            operations, f"instances {action_name}", timeout
+        )
+        errors.update((name, error) for name, (_, error) in done.items() if error)
+
+    new_states = session.list_states() if operations else old_states
+    results = []
+    for name in dict.fromkeys(instance_names):
+        entry = entries.get(name)
+        results.append(
+            InstanceResult(
+                name,
+                states.get(name),
+                None if name in errors else new_states.get(entry["instance_id"]),
+                waited - started + done[name][0]
+                if name in done
+                else perf_counter() - started
+                if name in operations
+                else 0.0,
+                errors.get(name),
+            )
+        )
+    print_results(results)
+    return results
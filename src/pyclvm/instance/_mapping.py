@@ -1,72 +1,322 @@
 from collections.abc import Mapping
-from typing import Dict, Final, Generator, List, Optional, Tuple, Type
+from datetime import datetime
+from functools import partial
+from typing import (
+    Any,
+    Dict,
+    Final,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 from boto3.session import Session
+from botocore.exceptions import ClientError
 
-from pyclvm._common.session_aws import get_session
+from pyclvm._common.filters import get_filters
+from pyclvm._common.inventory import Inventory
+from pyclvm._common.session_aws import get_client, get_session
 
 _FILTERS: Final[Dict[str, str]] = {"states": "instance-state-name", "names": "tag:Name"}
 
-Instance = Type["Instance"]  # can not import from boto3
+# the name lookups and the selectors ignore the terminated instances
+ALIVE_STATES: Final[List[str]] = [
+    "pending",
+    "running",
+    "shutting-down",
+    "stopping",
+    "stopped",
+]
+
+# the largest page describe_instances returns
+_PAGE_SIZE: Final[int] = 1000
+
+# the most ids describe_instance_status takes per call
+_BATCH_SIZE: Final[int] = 100
+
+# the states of the instances an inventory entry must not resolve to any more
+_GONE_STATES: Final[Tuple[Optional[str], ...]] = (None, "terminated")
+
+
+class Instance(NamedTuple):
+    """
+    EC2 instance data, as returned by describe_instances
+    """
+
+    id: str
+    name: str
+    state: str
+    instance_type: str
+    zone: str
+    private_ip: Optional[str]
+    launch_time: datetime
+
+
+def _get_instance_name(instance: Dict[str, Any]) -> str:
+    for tag in instance.get("Tags", ()):
+        if tag["Key"] == "Name":
+            return tag["Value"]
+    return ""
+
+
+def _make_instance(instance: Dict[str, Any]) -> Instance:
+    return Instance(
+        id=instance["InstanceId"],
+        name=_get_instance_name(instance),
+        state=instance["State"]["Name"],
+        instance_type=instance["InstanceType"],
+        zone=instance["Placement"]["AvailabilityZone"],
+        private_ip=instance.get("PrivateIpAddress"),
+        launch_time=instance["LaunchTime"],
+    )
+
+
+def iter_instances(client: Any, **params: Any) -> Iterator[Instance]:
+    """
+    Streams the instances page by page, the next page is requested
+    only when the previous one is consumed
+
+    Args:
+        client: EC2 client
+        **params: describe_instances parameters, e.g. Filters or InstanceIds
+
+    Returns:
+        Iterator[Instance]
+    """
+    if "InstanceIds" not in params:  # both can not be used at once
+        params["PaginationConfig"] = {"PageSize": _PAGE_SIZE}
+    for page in client.get_paginator("describe_instances").paginate(**params):
+        for reservation in page["Reservations"]:
+            for instance in reservation["Instances"]:
+                yield _make_instance(instance)
+
+
+def list_states(client: Any, **params: Any) -> Dict[str, str]:
+    """
+    Returns the states of the instances by id, from describe_instance_status,
+    lighter than describe_instances, as it holds the states only
+
+    Args:
+        client: EC2 client
+        **params: describe_instance_status parameters, e.g. InstanceIds
+
+    Returns:
+        Dict[str, str]
+    """
+    if "InstanceIds" not in params:
+        params["PaginationConfig"] = {"PageSize": _PAGE_SIZE}
+    pages = client.get_paginator("describe_instance_status").paginate(
+        IncludeAllInstances=True, **params
+    )
+    return {
+        status["InstanceId"]: status["InstanceState"]["Name"]
+        for page in pages
+        for status in page["InstanceStatuses"]
+    }
+
+
+def chunks(items: List[str]) -> Iterator[List[str]]:
+    """
+    Splits the ids by as many as the EC2 calls take at once
+    """
+    for index in range(0, len(items), _BATCH_SIZE):
+        yield items[index : index + _BATCH_SIZE]
+
+
+def is_gone(err: ClientError) -> bool:
+    """
+    True if the call failed on an instance id that does not exist (any more)
+    """
+    return (
+        err.response.get("Error", {}).get("Code", "").startswith("InvalidInstanceID.")
+    )
+
+
+def read_states(client: Any, instance_ids: List[str]) -> Dict[str, str]:
+    """
+    Returns the states of the instances by id, read by chunks of ids,
+    the ids that do not exist are left out
+
+    Args:
+        client: EC2 client
+        instance_ids (List[str]): ids of the instances
+
+    Returns:
+        Dict[str, str]
+    """
+    states: Dict[str, str] = {}
+    for chunk in chunks(instance_ids):
+        try:
+            states.update(list_states(client, InstanceIds=chunk))
+        except ClientError as err:
+            if not is_gone(err):
+                raise
+            # an id gone fails the whole call, the filter of describe_instances does not
+            states.update(
+                (instance.id, instance.state)
+                for instance in iter_instances(
+                    client, Filters=[{"Name": "instance-id", "Values": chunk}]
+                )
+            )
+    return {
+        instance_id: states[instance_id]
+        for instance_id in instance_ids
+        if instance_id in states
+    }
+
+
+def build_filters(kwargs: dict) -> dict:
+    """
+    Translates the classifiers, e.g. states=running,stopped or selector=team=ml,
+    to describe_instances Filters
+    """
+    filters = [
+        {
+            "Name": _FILTERS[name],
+            "Values": values.split(",") if str == type(values) else values,
+        }
+        for name, values in kwargs.items()
+        if name in _FILTERS
+    ]
+    filters.extend(
+        {"Name": f"tag:{key}", "Values": [value]}
+        for key, value in get_filters(kwargs).labels.items()
+    )
+    return {"Filters": filters} if filters else {}
+
+
+def get_inventory(session: Session, **kwargs: str) -> Inventory:
+    return Inventory("AWS", f"{session.profile_name}:{session.region_name}", **kwargs)
+
+
+def list_inventory(client: Any) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Lists the named EC2 instances for the inventory
+    """
+    instances = iter_instances(
+        client, Filters=[{"Name": "instance-state-name", "Values": ALIVE_STATES}]
+    )
+    for instance in instances:
+        if instance.name:
+            yield instance.name, {"instance_id": instance.id, "state": instance.state}
+
+
+def fetch_inventory_entry(client: Any, instance_name: str) -> Optional[Dict[str, str]]:
+    """
+    Fetches the inventory entry of a single instance, by its Name tag
+    """
+    instances = iter_instances(
+        client,
+        Filters=[
+            {"Name": "tag:Name", "Values": [instance_name]},
+            {"Name": "instance-state-name", "Values": ALIVE_STATES},
+        ],
+    )
+    for instance in instances:
+        return {"instance_id": instance.id, "state": instance.state}
+    return None
+
+
+def resolve_instances(
+    client: Any, inventory: Inventory, instance_names: Iterable[str]
+) -> Tuple[Dict[str, Optional[Dict[str, str]]], Dict[str, str]]:
+    """
+    Returns the inventory entries and the current states of the instances,
+    the entries of instances gone or terminated since are dropped and their
+    names resolved again, once: a single one by its Name tag, several by a listing
+
+    Args:
+        client: EC2 client
+        inventory (Inventory): inventory of the profile and region
+        instance_names (Iterable[str]): names of the instances
+
+    Returns:
+        the entries by name, None if there is no such instance, and the states by id
+    """
+    list_instances = partial(list_inventory, client)
+    fetch_instance = partial(fetch_inventory_entry, client)
+    entries = inventory.get_many(instance_names, list_instances, fetch_instance)
+    states = read_states(
+        client, [entry["instance_id"] for entry in entries.values() if entry]
+    )
+    gone = [
+        name
+        for name, entry in entries.items()
+        if entry and states.get(entry["instance_id"]) in _GONE_STATES
+    ]
+    if not gone or inventory.listed:
+        return entries, states
+    # an outdated inventory, e.g. an instance was terminated and created again
+    inventory.discard(gone)
+    entries.update(inventory.get_many(gone, list_instances, fetch_instance))
+    states.update(
+        read_states(
+            client,
+            [entries[name]["instance_id"] for name in gone if entries[name]],
+        )
+    )
+    return entries, states
 
 
 class InstanceMapping(Mapping):
     def __init__(self, **kwargs: str):
         self._session = get_session(kwargs)
-        self._client = self._session.client("ec2")
-        self._resource = self._session.resource("ec2")
+        self._client = get_client("ec2", kwargs)
         self._filters = self._build_filters(kwargs)
+        self._inventory = get_inventory(self._session, **kwargs)
 
     @property
     def session(self) -> Session:
         return self._session
 
     def _build_filters(self, kwargs: dict) -> dict:
-        filters = [
-            {
-                "Name": _FILTERS[name],
-                "Values": values.split(",") if str == type(values) else values,
-            }
-            for name, values in kwargs.items()
-            if name in _FILTERS
-        ]
-        return {"Filters": filters} if filters else {}
+        return build_filters(kwargs)
 
     def _get_instances(
         self, filters: Optional[Dict[str, List[str]]] = None
-    ) -> Generator[Instance, None, None]:
-        instances = self._client.describe_instances(**filters or self._filters)
-        for reservation in instances.Reservations:
-            for instance in reservation.Instances:
-                yield self._resource.Instance(instance.InstanceId)
+    ) -> Iterator[Instance]:
+        return iter_instances(self._client, **filters or self._filters)
 
-    def __getitem__(self, instance_name: str) -> Instance:
+    def _get_instance(
+        self, instance_name: str, entry: Optional[Dict[str, str]]
+    ) -> Instance:
+        if not entry:
+            raise KeyError(instance_name)
         try:
-            return next(
-                self._get_instances(self._build_filters({"names": instance_name}))
-            )
-        except StopIteration as err:
+            return next(self._get_instances({"InstanceIds": [entry["instance_id"]]}))
+        except (StopIteration, ClientError) as err:  # e.g. InvalidInstanceID.NotFound
             raise KeyError(instance_name) from err
 
+    def __getitem__(self, instance_name: str) -> Instance:
+        list_instances = partial(list_inventory, self._client)
+        entry = self._inventory.get(instance_name, list_instances)
+        try:
+            return self._get_instance(instance_name, entry)
+        except KeyError:
+            if self._inventory.listed:
+                raise
+        # an id of an outdated inventory, e.g. the instance was created again
+        return self._get_instance(
+            instance_name, self._inventory.store(list_instances()).get(instance_name)
+        )
+
     def __iter__(self) -> Generator[str, None, None]:
         return self.keys()
 
     def __len__(self) -> int:
         return sum(1 for _ in self._get_instances())
 
-    def _get_instance_name(self, instance: Instance) -> str:
-        try:
-            return next(t for t in instance.tags if t.Key == "Name").Value
-        except (StopIteration, TypeError):
-            return ""
-
     def keys(self) -> Generator[str, None, None]:
         for instance in self._get_instances():
-            yield self._get_instance_name(instance)
+            yield instance.name
 
-    def values(self) -> Generator[Instance, None, None]:
+    def values(self) -> Iterator[Instance]:
         return self._get_instances()
 
     def items(self) -> Generator[Tuple[str, Instance], None, None]:
         for instance in self._get_instances():
-            yield self._get_instance_name(instance), instance
+            yield instance.name, instance
@@ -1,30 +1,16 @@
 from concurrent.futures import ThreadPoolExecutor
-from functools import partial
-from typing import Callable, Dict, Optional, Tuple, Union
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from ec2instances.ec2_instance_mapping import Ec2RemoteShellMapping
-
-from pyclvm._common.azure_instance_mapping import AzureRemoteShellMapping
-from pyclvm._common.gcp_instance_mapping import GcpRemoteShellMapping
-from pyclvm._common.session_aws import Session, get_session
-from pyclvm.login import _login_aws
+from pyclvm._common.providers import get_provider
 from pyclvm.plt import (
     _default_platform,
     _get_supported_platforms,
     _unsupported_platform,
 )
 
-
-def _process_aws(**kwargs: str) -> Ec2RemoteShellMapping:
-    return Ec2RemoteShellMapping(get_session(kwargs), auth_callback=_login_aws)
-
-
-def _process_gcp(**kwargs: str) -> GcpRemoteShellMapping:
-    return GcpRemoteShellMapping()
-
-
-def _process_azure(**kwargs: str):
-    return AzureRemoteShellMapping()
+from ._bulk import InstanceResult, get_workers, print_results
 
 
 def _return_instances(**kwargs) -> Union[Dict, None]:
@@ -33,40 +19,119 @@ def _return_instances(**kwargs) -> Union[Dict, None]:
         _get_supported_platforms(),
     )
     if default_platform in supported_platforms:
-        return {
-            "AWS": partial(_process_aws, **kwargs),
-            "GCP": partial(_process_gcp, **kwargs),
-            "AZURE": partial(_process_azure, **kwargs),
-        }[default_platform.upper()]()
+        return get_provider(default_platform).remote_shell_mapping(**kwargs)
     else:
         _unsupported_platform(default_platform)
     return None
 
 
+def _get_state(instance: Any) -> str:
+    state = instance.state
+    return state if isinstance(state, str) else state.name
+
+
+def select_instances(instance_names: Tuple[str, ...], **kwargs: str) -> Tuple[str, ...]:
+    """
+    Adds the instances of `selector=` (tags on AWS and Azure, labels on GCP) to the names,
+    with `states=` and `names=` too, as filtered by the platform
+
+    Returns:
+        Tuple[str, ...]: the names, empty if the selector matches nothing
+    """
+    if "selector" not in kwargs:
+        return instance_names
+    selected = get_provider(_default_platform(**kwargs).upper()).select_instances(
+        **kwargs
+    )
+    if not selected:
+        print(f"[INFO] No instance matches selector={kwargs['selector']}")
+    return tuple(dict.fromkeys((*instance_names, *selected)))
+
+
+def _process_instance(
+    func: Callable,
+    mapping: Any,
+    lock: Lock,
+    instance_name: str,
+    **kwargs: str,
+) -> Tuple[Optional[str], InstanceResult]:
+    started = perf_counter()
+    instance_id = old_state = error = None
+    try:
+        # the boto3 sessions are not thread safe, the proxies are made one at a time
+        with lock:
+            instance = mapping.get(instance_name)
+        if instance is None:
+            raise RuntimeError("No such instance registered")
+        old_state, instance_id = _get_state(instance), instance.id
+        func(instance_name, instance, **kwargs)
+    except Exception as err:
+        error = f"{type(err).__name__}: {err}"
+    return instance_id, InstanceResult(
+        instance_name, old_state, None, perf_counter() - started, error
+    )
+
+
+def _read_states(
+    cloud_platform: str, instance_ids: List[str], **kwargs: str
+) -> Dict[str, str]:
+    # the new states of the instances at once, the cheapest read of the platform
+    try:
+        return get_provider(cloud_platform).watch_states(**kwargs)(instance_ids)
+    except Exception as err:
+        print(f"[ERROR] the states can not be read: {type(err).__name__}: {err}")
+        return {}
+
+
 def _process_many(
     func: Callable,
     state: str,
     instance_names: Tuple[str],
     **kwargs: str,
-) -> None:
-    # TODO realize platform selection
-    instances = [
-        (name, instance)
-        for name, instance in Ec2RemoteShellMapping(get_session(kwargs)).items()
-        if instance.name in instance_names
+) -> List[InstanceResult]:
+    """
+    Runs the handler of every instance on a pool of `workers=` threads (10 by default),
+    the names are resolved at once through the inventory of the platform
+
+    Returns:
+        List[InstanceResult]: old and new state, elapsed time or error, by instance
+    """
+    cloud_platform = _default_platform(**kwargs).upper()
+    workers = get_workers(kwargs)
+    mapping = _return_instances(**kwargs)
+    mapping.find_instances(instance_names)
+
+    lock = Lock()
+    with ThreadPoolExecutor(max_workers=min(len(instance_names), workers)) as executor:
+        processed = list(
+            executor.map(
+                lambda instance_name: _process_instance(
+                    func, mapping, lock, instance_name, **kwargs
+                ),
+                instance_names,
+            )
+        )
+
+    states = _read_states(
+        cloud_platform,
+        [instance_id for instance_id, _ in processed if instance_id],
+        **kwargs,
+    )
+    results = [
+        result._replace(new_state=states.get(instance_id))
+        if instance_id and not result.error
+        else result
+        for instance_id, result in processed
     ]
-
-    with ThreadPoolExecutor() as executor:
-        res = executor.map(lambda t: func(*t), instances)
-        print(list(res))
-    return None
+    print_results(results)
+    return results
 
 
 def _process_one(
     func: Callable,
     instance_name: str,
     **kwargs: str,
-) -> Optional[Tuple[Session, str]]:
+) -> Optional[Tuple[Any, str]]:
     try:
         instance = _return_instances(**kwargs).get(instance_name)
     except RuntimeError as err:
@@ -81,7 +146,7 @@ def process_instances(
     state: str,
     instance_names: Tuple[str],
     **kwargs: str,
-) -> Optional[Tuple[Session, str]]:
+) -> Union[Tuple[Any, str], List[InstanceResult], None]:
     return (
         _process_one(func, instance_names[0], **kwargs)
         if len(instance_names) == 1
@@ -1,23 +1,22 @@
 # -*- coding: utf-8 -*- #
 """send system commands to VM"""
 
+import sys
 from functools import partial
-from typing import Any, Tuple, Union
+from typing import Any, List, Tuple, Union
 
-from ec2instances.ec2_instance_proxy import Ec2RemoteShellProxy
+from instances_map_abc.vm_instance_proxy import RemoteShellProxy
 
-from pyclvm._common.azure_instance_mapping import AzureRemoteShellProxy
-from pyclvm._common.gcp_instance_mapping import GcpRemoteShellProxy
 from pyclvm.plt import (
     _default_platform,
     _get_supported_platforms,
     _unsupported_platform,
 )
 
-from ._process import process_instances
+from ._process import process_instances, select_instances
 
 
-def _execute_aws(instance_name: str, instance: Ec2RemoteShellProxy, **kwargs) -> None:
+def _execute_aws(instance_name: str, instance: RemoteShellProxy, **kwargs) -> None:
     print(f"Working {instance_name} ...")
     instance.start()
     # to get rid of the overloading warning script assigned to a variable
@@ -27,7 +26,7 @@ def _execute_aws(instance_name: str, instance: Ec2RemoteShellProxy, **kwargs) ->
     print("\n".join(instance.execute(custom_script)))
 
 
-def _execute_gcp(instance_name: str, instance: GcpRemoteShellProxy, **kwargs) -> None:
+def _execute_gcp(instance_name: str, instance: RemoteShellProxy, **kwargs) -> None:
     print(f"Starting {instance_name} ...")
     instance.start()
     print(f"{instance_name} is running")
@@ -36,9 +35,7 @@ def _execute_gcp(instance_name: str, instance: GcpRemoteShellProxy, **kwargs) ->
     instance.execute((f"cd $HOME && {kwargs.get('script')}",), **kwargs)
 
 
-def _execute_azure(
-    instance_name: str, instance: AzureRemoteShellProxy, **kwargs
-) -> None:
+def _execute_azure(instance_name: str, instance: RemoteShellProxy, **kwargs) -> None:
     print(f"Starting {instance_name} ...")
     instance.start(wait=False)
     print(f"{instance_name} is running")
@@ -47,39 +44,50 @@ def _execute_azure(
     instance.execute((kwargs.get("script"),), **kwargs)
 
 
-def command(
-    instance_name: str, script: str, **kwargs: str
-) -> Union[Tuple[Any, str], None]:
+def command(*arguments: str, **kwargs: str) -> Union[Tuple[Any, str], List, None]:
     """
     send system commands to VM
 
     Args:
-        instance_name (str): vm instance name
-        script (str): system commands wrapped around " "
-        **kwargs (str): (optional) additional arguments, currently only profile
+        *arguments (str): vm instance names, then the system commands wrapped around " ",
+            unless they are given as script="..."
+        **kwargs (str): (optional) additional arguments, currently only profile,
+            script="..." the system commands, as in vm-1 script="uptime",
+            selector=team=ml,env=dev sends them to the instances of these tags (labels on GCP)
+            as well, several instances are processed concurrently, workers=<n> at once
 
     Returns:
-        Union[Tuple[Any, str], None]
+        Union[Tuple[Any, str], List, None]
     """
-    kwargs["script"] = script
+    instance_names = list(arguments)
+    if "script" not in kwargs and instance_names:
+        kwargs["script"] = instance_names.pop()
+    if not kwargs.get("script") or not (instance_names or "selector" in kwargs):
+        print(
+            '[ERROR] instance names or selector= and the commands, e.g. vm-1 "uptime"'
+        )
+        sys.exit(-1)
     default_platform, supported_platforms = (
         _default_platform(**kwargs),
         _get_supported_platforms(),
     )
 
     if default_platform in supported_platforms:
+        instance_names = select_instances(tuple(instance_names), **kwargs)
+        if not instance_names:
+            return None
         return {
             "AWS": partial(
-                process_instances, _execute_aws, "running", (instance_name,), **kwargs
+                process_instances, _execute_aws, "running", instance_names, **kwargs
             ),
             "GCP": partial(
-                process_instances, _execute_gcp, "RUNNING", (instance_name,), **kwargs
+                process_instances, _execute_gcp, "RUNNING", instance_names, **kwargs
             ),
             "AZURE": partial(
                 process_instances,
                 _execute_azure,
                 "VM running",
-                (instance_name,),
+                instance_names,
                 **kwargs,
             ),
         }[default_platform.upper()]()
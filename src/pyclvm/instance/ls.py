@@ -1,14 +1,13 @@
-from functools import partial
-from typing import Dict, Final, Tuple, Union
-
-import boto3
-from _common.session_azure import get_session as azure_get_session
-from ec2instances.ec2_instance_mapping import Ec2AllInstancesData
-from rich.console import Console
-from rich.table import Table
-
-from pyclvm._common.gcp_instance_mapping import GcpComputeAllInstancesData
-from pyclvm.login import _login_aws
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from threading import Lock
+from time import sleep, strftime
+from typing import Any, Dict, Final, Iterable, List, Tuple, Union
+
+from pyclvm._common.output import get_columns, get_format, write_records
+from pyclvm._common.providers import get_provider
 from pyclvm.plt import (
     _default_platform,
     _get_supported_platforms,
@@ -17,16 +16,21 @@ from pyclvm.plt import (
 
 _COLUMNS: Final[Tuple[str, ...]] = ("Id", "Name", "Status")
 
+# the order of the platforms in the merged table
+_PLATFORMS: Final[Tuple[str, ...]] = ("AWS", "GCP", "AZURE")
+
+_IMPORT_LOCK: Final = Lock()
+
 # --- The list of colours of "rich"
 # https://rich.readthedocs.io/en/stable/appendix/colors.html
 
-_STATE_COLOR: Final[Dict[int, str]] = {
-    0: "bright_yellow",
-    16: "bright_green",
-    32: "yellow",
-    48: "red",
-    64: "bright_magneta",
-    80: "bright_red",
+_STATE_COLOR: Final[Dict[str, str]] = {
+    "pending": "bright_yellow",
+    "running": "bright_green",
+    "shutting-down": "yellow",
+    "terminated": "red",
+    "stopping": "bright_magenta",
+    "stopped": "bright_red",
 }
 
 _STATE_COLOR_GCP: Final[Dict[str, str]] = {
@@ -53,125 +57,316 @@ _STATE_COLOR_AZURE: Final[Dict[str, str]] = {
     "Provisioning succeeded": "bright_red",
 }
 
+_PLATFORM_STATE_COLOR: Final[Dict[str, Dict[str, str]]] = {
+    "AWS": _STATE_COLOR,
+    "GCP": _STATE_COLOR_GCP,
+    "AZURE": _STATE_COLOR_AZURE,
+}
+
 
 def ls(**kwargs: str) -> Union[Dict, None]:
     """
     list vm instances
 
     Args:
-        **kwargs (str): (optional) classifiers, at the moment, profile name, instance state, name patterns
+        **kwargs (str): (optional) classifiers, at the moment, profile name, instance state, name patterns,
+            e.g. states=running names=web-* selector=team=ml,env=dev (tags or labels),
+            platform=all or a comma separated list of platforms lists them at once in one table,
+            on AWS profiles=a,b and regions=x,y list every profile in every region concurrently,
+            format=jsonl|csv|tsv streams the records instead of the table, columns=zone,type,private_ip,
+            resource_group,launch_time adds these columns,
+            watch=<seconds> keeps the table of one platform on the screen and refreshes the states
 
     Returns:
         None
 
     """
+    platforms = _get_platforms(str(kwargs.get("platform", "")))
+    if len(platforms) > 1:
+        if "watch" in kwargs:
+            print("[ERROR] watch= refreshes the table of one platform at a time")
+            sys.exit(-1)
+        return _ls_many(platforms, **kwargs)
+    if platforms:
+        kwargs["platform"] = platforms[0]
+
     default_platform, supported_platforms = (
         _default_platform(**kwargs),
         _get_supported_platforms(),
     )
     if default_platform in supported_platforms:
-        return {
-            "AWS": partial(_ls_aws, **kwargs),
-            "GCP": partial(_ls_gcp, **kwargs),
-            "AZURE": partial(_ls_azure, **kwargs),
-        }[default_platform.upper()]()
+        if "watch" in kwargs:
+            return _watch(default_platform.upper(), **kwargs)
+        return _ls(default_platform.upper(), **kwargs)
     else:
         _unsupported_platform(default_platform)
 
 
-def _ls_aws(**kwargs: str) -> None:
+def _ls(cloud_platform: str, **kwargs: str) -> None:
     """
-    list vm instances of AWS Cloud Platform
+    list vm instances of a particular cloud platform
 
     Args:
+        cloud_platform (str): one of the supported platforms (AWS, GCP, AZURE)
         **kwargs (str): (optional) classifiers, at the moment, profile name, instance state, name patterns
 
     Returns:
         None
 
     """
-    current_profile = kwargs.get("profile", "")
-    if current_profile:
-        boto3.setup_default_session(profile_name=current_profile)
+    output_format = get_format(kwargs)
+    title, instances = get_provider(cloud_platform).list_instances(**kwargs)
+    state_color = _PLATFORM_STATE_COLOR[cloud_platform]
+
+    # the extra columns, e.g. profile and region, come with the rows
+    rows = iter(instances)
+    first = list(islice(rows, 1))
+    details = _get_details(first) or get_columns(kwargs)
+
+    if output_format:
+        write_records(
+            output_format,
+            (*_COLUMNS, *details),
+            (
+                (instance_id, instance_name, state, *_get_extra(extra, details))
+                for instance_id, instance_name, state, *extra in chain(first, rows)
+            ),
+        )
+        return
 
-    instances = Ec2AllInstancesData(auth_callback=_login_aws)
-    sts_client = boto3.client("sts")
+    # rich is imported for the table only, the scripts do not wait for it
+    from rich.console import Console
+    from rich.live import Live
+    from rich.table import Table
 
-    account = sts_client.get_caller_identity().Account
-    table = Table(title=f"{account} Account EC2 Instances")
-    for column in _COLUMNS:
+    table = Table(title=title)
+    for column in (*_COLUMNS, *details):
         table.add_column(column, justify="left", no_wrap=True)
 
-    for instance_id, instance_name, state_value, state_name in instances:
-        table.add_row(
-            *(
+    # the rows are shown as they are listed
+    with Live(table, console=Console(), vertical_overflow="visible"):
+        for instance_id, instance_name, state, *extra in chain(first, rows):
+            table.add_row(
                 instance_id,
                 instance_name,
-                f"[{_STATE_COLOR[state_value]}]{state_name}",
+                f"[{state_color.get(state, 'white')}]{state}",
+                *_get_extra(extra, details),
             )
-        )
 
-    console = Console()
-    console.print(table)
+
+def _get_interval(kwargs: Dict[str, str]) -> float:
+    try:
+        interval = float(kwargs["watch"])
+    except ValueError:
+        interval = 0
+    if not math.isfinite(interval) or interval <= 0:
+        print(f"[ERROR] watch={kwargs['watch']}: the period is a number of seconds")
+        sys.exit(-1)
+    return interval
 
 
-# ---
-def _ls_gcp(**kwargs: str) -> None:
+def _watch(cloud_platform: str, **kwargs: str) -> None:
     """
-    list vm instances of Google Cloud Platform
+    list vm instances of a particular cloud platform, then refresh their states
+    until interrupted, with the session of the listing and the cheapest state read
+    of the platform, the transitions are highlighted
 
     Args:
-        **kwargs (str): (optional) classifiers, at the moment, profile name, instance state, name patterns
+        cloud_platform (str): one of the supported platforms (AWS, GCP, AZURE)
+        **kwargs (str): (optional) classifiers, watch=<seconds> the refresh period
 
     Returns:
         None
 
     """
-    instances = GcpComputeAllInstancesData(**kwargs)
-    table = Table(
-        title=f"{instances.get_session().account_email} Account GCP Instances"
-    )
-    for column in _COLUMNS:
+    from rich.console import Console
+    from rich.live import Live
+
+    interval = _get_interval(kwargs)
+    if get_format(kwargs):
+        print("[ERROR] watch= shows the table, format= can not be used with it")
+        sys.exit(-1)
+
+    provider = get_provider(cloud_platform)
+    title, instances = provider.list_instances(**kwargs)
+    rows = [list(row) for row in instances]
+    details = _get_details(rows) or get_columns(kwargs)
+    read_states = provider.watch_states(**kwargs)
+    state_color = _PLATFORM_STATE_COLOR[cloud_platform]
+
+    previous: Dict[str, str] = {}
+    with Live(console=Console(), auto_refresh=False) as live:
+        try:
+            while True:
+                live.update(
+                    _make_watch_table(
+                        f"{title} at {strftime('%X')}",
+                        rows,
+                        details,
+                        previous,
+                        state_color,
+                    ),
+                    refresh=True,
+                )
+                sleep(interval)
+                states = read_states()
+                previous = {}
+                for row in rows:
+                    state = states.get(row[0], row[2])
+                    if state != row[2]:
+                        previous[row[0]] = row[2]
+                        row[2] = state
+        except KeyboardInterrupt:
+            pass
+
+
+def _make_watch_table(
+    title: str,
+    rows: List[List],
+    details: List[str],
+    previous: Dict[str, str],
+    state_color: Dict[str, str],
+) -> Any:
+    from rich.table import Table
+
+    table = Table(title=title)
+    for column in (*_COLUMNS, *details):
         table.add_column(column, justify="left", no_wrap=True)
-
-    for instance_id, instance_name, state in instances:
+    for instance_id, instance_name, state, *extra in rows:
+        color = state_color.get(state, "white")
         table.add_row(
-            *(
-                str(instance_id),
-                instance_name,
-                f"[{_STATE_COLOR_GCP[state]}]{state}",
-            )
+            instance_id,
+            instance_name,
+            f"[bold reverse {color}]{previous[instance_id]} -> {state}"
+            if instance_id in previous
+            else f"[{color}]{state}",
+            *_get_extra(extra, details),
         )
+    return table
 
-    console = Console()
-    console.print(table)
+
+def _get_details(instances: Iterable[Tuple]) -> List[str]:
+    """
+    Names of the extra columns of the rows, in order of appearance
+    """
+    return list(
+        dict.fromkeys(
+            column
+            for instance in instances
+            for extra in instance[3:]
+            for column in extra
+        )
+    )
+
+
+def _get_extra(extra: List[Dict[str, str]], details: List[str]) -> List[str]:
+    columns = extra[0] if extra else {}
+    return [columns.get(column, "") for column in details]
+
+
+def _get_platforms(cloud_platform: str) -> List[str]:
+    """
+    Platforms of `platform=all` or of a comma separated list, e.g. `platform=aws,gcp`
+    """
+    if cloud_platform.upper() == "ALL":
+        return list(_PLATFORMS)
+    platforms = [name.strip().upper() for name in cloud_platform.split(",")]
+    return [name for name in _PLATFORMS if name in platforms] + [
+        name for name in platforms if name and name not in _PLATFORMS
+    ]
+
+
+def _list_instances(cloud_platform: str, **kwargs: str) -> Tuple[str, List]:
+    # the providers are imported one at a time, only the cloud calls run in parallel
+    with _IMPORT_LOCK:
+        provider = get_provider(cloud_platform)
+    title, instances = provider.list_instances(**kwargs)
+    return title, list(instances)
+
+
+def _get_error(err: BaseException) -> str:
+    return f"[ERROR] {type(err).__name__}: {err}"
 
 
-# ---
-def _ls_azure(**kwargs: str) -> None:
+def _ls_many(platforms: List[str], **kwargs: str) -> None:
     """
-    list vm instances of Azure Cloud Platform
+    list vm instances of several cloud platforms concurrently, in one table
 
     Args:
+        platforms (List[str]): supported platforms (AWS, GCP, AZURE)
         **kwargs (str): (optional) classifiers, at the moment, profile name, instance state, name patterns
 
     Returns:
         None
 
     """
-    _session = azure_get_session()
-
-    table = Table(title=f"{_session.subscription_name} Azure Instances")
-    for column in _COLUMNS:
+    output_format = get_format(kwargs)
+    supported_platforms = _get_supported_platforms()
+    for cloud_platform in platforms:
+        if cloud_platform not in supported_platforms:
+            _unsupported_platform(cloud_platform)
+
+    with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
+        futures = [
+            executor.submit(_list_instances, cloud_platform, **kwargs)
+            for cloud_platform in platforms
+        ]
+
+    results = []
+    for cloud_platform, future in zip(platforms, futures):
+        try:
+            results.append((cloud_platform, *future.result()))
+        # a failing platform, e.g. not logged in, does not hide the others
+        except (Exception, SystemExit) as err:
+            results.append((cloud_platform, None, [("", _get_error(err), "")]))
+
+    details = _get_details(
+        instance for _, _, instances in results for instance in instances
+    ) or get_columns(kwargs)
+
+    if output_format:
+        _write_many(output_format, results, details)
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(title=", ".join(title for _, title, _ in results if title))
+    for column in ("Platform", *_COLUMNS, *details):
         table.add_column(column, justify="left", no_wrap=True)
 
-    for instance, params in _session.instances.items():
-        table.add_row(
-            *(
-                str(params["instance_id"]),
-                instance,
-                f"[{_STATE_COLOR_AZURE[params['state']]}]{params['state']}",
+    for cloud_platform, title, instances in results:
+        state_color = _PLATFORM_STATE_COLOR[cloud_platform]
+        for instance_id, instance_name, state, *extra in instances:
+            table.add_row(
+                cloud_platform,
+                instance_id,
+                instance_name if title else f"[red]{instance_name}",
+                f"[{state_color.get(state, 'white')}]{state}" if title else state,
+                *_get_extra(extra, details),
             )
-        )
+
     console = Console()
     console.print(table)
+
+
+def _write_many(output_format: str, results: List[Tuple], details: List[str]) -> None:
+    for cloud_platform, title, instances in results:
+        if title is None:  # the errors are kept apart from the records
+            print(f"{cloud_platform} {instances[0][1]}", file=sys.stderr)
+    write_records(
+        output_format,
+        ("Platform", *_COLUMNS, *details),
+        (
+            (
+                cloud_platform,
+                instance_id,
+                instance_name,
+                state,
+                *_get_extra(extra, details),
+            )
+            for cloud_platform, title, instances in results
+            if title is not None
+            for instance_id, instance_name, state, *extra in instances
+        ),
+    )
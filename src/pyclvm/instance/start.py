@@ -1,23 +1,21 @@
 """start vm instance"""
 
 from functools import partial
-from typing import Any, Tuple, Union
+from typing import Any, List, Tuple, Union
 
-from ec2instances.ec2_instance_mapping import Ec2InstanceProxy
+from instances_map_abc.vm_instance_proxy import VmInstanceProxy
 
-from pyclvm._common.azure_instance_mapping import AzureInstanceProxy
-from pyclvm._common.gcp_instance_mapping import GcpInstanceProxy
 from pyclvm.plt import (
     _default_platform,
     _get_supported_platforms,
     _unsupported_platform,
 )
 
-from ._process import process_instances
+from ._process import process_instances, select_instances
 
 
 def _start_instance_aws(
-    instance_name: str, instance: Ec2InstanceProxy, **kwargs: str
+    instance_name: str, instance: VmInstanceProxy, **kwargs: str
 ) -> Any:
     return {
         "running": partial(_is_running, instance_name, **kwargs),
@@ -35,7 +33,7 @@ def _start_instance_aws(
 
 
 def _start_instance_gcp(
-    instance_name: str, instance: GcpInstanceProxy, **kwargs: str
+    instance_name: str, instance: VmInstanceProxy, **kwargs: str
 ) -> Any:
     return {
         "RUNNING": partial(_is_running, instance_name, **kwargs),
@@ -58,7 +56,7 @@ def _start_instance_gcp(
 
 
 def _start_instance_azure(
-    instance_name: str, instance: AzureInstanceProxy, **kwargs: str
+    instance_name: str, instance: VmInstanceProxy, **kwargs: str
 ) -> Any:
     return {
         "VM running": partial(_is_running, instance_name, **kwargs),
@@ -85,7 +83,7 @@ def _is_running(instance_name: str, **kwargs) -> None:
 
 def _is_stopped_or_terminated(
     instance_name: str,
-    instance: Union[Ec2InstanceProxy, GcpInstanceProxy, AzureInstanceProxy],
+    instance: VmInstanceProxy,
     wait: bool = False,
     **kwargs: str,
 ) -> None:
@@ -95,7 +93,7 @@ def _is_stopped_or_terminated(
 
 def _in_transition(
     instance_name: str,
-    instance: Union[Ec2InstanceProxy, GcpInstanceProxy, AzureInstanceProxy],
+    instance: VmInstanceProxy,
     **kwargs,
 ) -> None:
     print(
@@ -113,7 +111,13 @@ def start(*instance_names: str, **kwargs: str) -> Union[Tuple, None]:
 
     Args:
         *instance_names (str): list of instance names (if empty will start all stopped instances)
-        **kwargs (str): (optional) additional arguments, currently only profile
+        **kwargs (str): (optional) additional arguments, currently only profile,
+            workers=<n> the number of instances processed at once (10 by default),
+            on AWS several instances are started by batches and awaited, unless wait=no,
+            on GCP their operations are awaited together, on Azure their requests run
+            concurrently on a pool of threads, timeout=<seconds> bounds the wait,
+            selector=team=ml,env=dev adds the instances of these tags (labels on GCP), also
+            filtered by states= and names=
 
     Returns:
         Union[Tuple, None]
@@ -124,6 +128,9 @@ def start(*instance_names: str, **kwargs: str) -> Union[Tuple, None]:
     )
 
     if default_platform in supported_platforms:
+        instance_names = select_instances(instance_names, **kwargs)
+        if not instance_names:
+            return None
         return {
             "AWS": partial(_start_aws, *instance_names, **kwargs),
             "GCP": partial(_start_gcp, *instance_names, **kwargs),
@@ -132,17 +139,32 @@ def start(*instance_names: str, **kwargs: str) -> Union[Tuple, None]:
     _unsupported_platform(default_platform)
 
 
-def _start_aws(*instance_names: str, **kwargs: str) -> Union[Tuple, None]:
+def _start_aws(*instance_names: str, **kwargs: str) -> Union[Tuple, List, None]:
+    if len(instance_names) > 1:
+        # the EC2 calls take many instances at once
+        from ._ec2_batch import process_batch
+
+        return process_batch("start", instance_names, **kwargs)
     return process_instances(_start_instance_aws, "stopped", instance_names, **kwargs)
 
 
-def _start_gcp(*instance_names: str, **kwargs: str) -> Union[Tuple, None]:
+def _start_gcp(*instance_names: str, **kwargs: str) -> Union[Tuple, List, None]:
+    if len(instance_names) > 1:
+        # the requests are sent at once, then their operations awaited together
+        from ._gcp_batch import process_batch
+
+        return process_batch("start", instance_names, **kwargs)
     return process_instances(
         _start_instance_gcp, "TERMINATED", instance_names, **kwargs
     )
 
 
-def _start_azure(*instance_names: str, **kwargs: str) -> Union[Tuple, None]:
+def _start_azure(*instance_names: str, **kwargs: str) -> Union[Tuple, List, None]:
+    if len(instance_names) > 1:
+        # the requests of all the VMs run concurrently over pooled connections
+        from ._azure_batch import process_batch
+
+        return process_batch("start", instance_names, **kwargs)
     return process_instances(
         _start_instance_azure, "VM deallocated", instance_names, **kwargs
     )
@@ -3,21 +3,19 @@
 from functools import partial
 from typing import Any, Dict, Union
 
-from ec2instances.ec2_instance_mapping import Ec2InstanceProxy
+from instances_map_abc.vm_instance_proxy import VmInstanceProxy
 
-from pyclvm._common.azure_instance_mapping import AzureInstanceProxy
-from pyclvm._common.gcp_instance_mapping import GcpInstanceProxy
 from pyclvm.plt import (
     _default_platform,
     _get_supported_platforms,
     _unsupported_platform,
 )
 
-from ._process import process_instances
+from ._process import process_instances, select_instances
 
 
 def _stop_instance_aws(
-    instance_name: str, instance: Ec2InstanceProxy, **kwargs: str
+    instance_name: str, instance: VmInstanceProxy, **kwargs: str
 ) -> Any:
 
     return {
@@ -32,7 +30,7 @@ def _stop_instance_aws(
 
 
 def _stop_instance_gcp(
-    instance_name: str, instance: GcpInstanceProxy, **kwargs: str
+    instance_name: str, instance: VmInstanceProxy, **kwargs: str
 ) -> Any:
     return {
         "STOPPED": partial(_is_already_stopped, instance_name),
@@ -49,7 +47,7 @@ def _stop_instance_gcp(
 
 
 def _stop_instance_azure(
-    instance_name: str, instance: AzureInstanceProxy, **kwargs: str
+    instance_name: str, instance: VmInstanceProxy, **kwargs: str
 ) -> Any:
     return {
         "VM stopped": partial(_is_already_stopped, instance_name),
@@ -74,7 +72,7 @@ def _is_terminated(instance_name: str) -> None:
 
 def _stopping_instance(
     instance_name: str,
-    instance: Union[Ec2InstanceProxy, GcpInstanceProxy, AzureInstanceProxy],
+    instance: VmInstanceProxy,
 ) -> None:
     print(f"Stopping {instance_name} ...")
     print(instance.stop(wait=False))
@@ -82,7 +80,7 @@ def _stopping_instance(
 
 def _in_transition(
     instance_name: str,
-    instance: Union[Ec2InstanceProxy, GcpInstanceProxy, AzureInstanceProxy],
+    instance: VmInstanceProxy,
 ) -> None:
     print(
         f"{instance_name} is now in transition state. Wait untill current state is determined."
@@ -99,7 +97,13 @@ def stop(*instance_names: str, **kwargs: str) -> Union[Dict, None]:
 
     Args:
         *instance_names (str): list of instance names, if empty will stop all running instances
-        **kwargs (str): (optional) additional arguments, currently only profile
+        **kwargs (str): (optional) additional arguments, currently only profile,
+            workers=<n> the number of instances processed at once (10 by default),
+            on AWS several instances are stopped by batches and awaited, unless wait=no,
+            on GCP their operations are awaited together, on Azure their requests run
+            concurrently on a pool of threads, timeout=<seconds> bounds the wait,
+            selector=team=ml,env=dev adds the instances of these tags (labels on GCP), also
+            filtered by states= and names=
 
     Returns:
         None
@@ -110,6 +114,9 @@ def stop(*instance_names: str, **kwargs: str) -> Union[Dict, None]:
     )
 
     if default_platform in supported_platforms:
+        instance_names = select_instances(instance_names, **kwargs)
+        if not instance_names:
+            return None
         return {
             "AWS": partial(_stop_aws, *instance_names, **kwargs),
             "GCP": partial(_stop_gcp, *instance_names, **kwargs),
@@ -121,14 +128,29 @@ def stop(*instance_names: str, **kwargs: str) -> Union[Dict, None]:
 
 # ---
 def _stop_aws(*instance_names: str, **kwargs: str):
+    if len(instance_names) > 1:
+        # the EC2 calls take many instances at once
+        from ._ec2_batch import process_batch
+
+        return process_batch("stop", instance_names, **kwargs)
     process_instances(_stop_instance_aws, "running", instance_names, **kwargs)
 
 
 # ---
 def _stop_gcp(*instance_names: str, **kwargs: str):
+    if len(instance_names) > 1:
+        # the requests are sent at once, then their operations awaited together
+        from ._gcp_batch import process_batch
+
+        return process_batch("stop", instance_names, **kwargs)
     process_instances(_stop_instance_gcp, "RUNNING", instance_names, **kwargs)
 
 
 # ---
 def _stop_azure(*instance_names: str, **kwargs: str):
+    if len(instance_names) > 1:
+        # the requests of all the VMs run concurrently over pooled connections
+        from ._azure_batch import process_batch
+
+        return process_batch("stop", instance_names, **kwargs)
     process_instances(_stop_instance_azure, "VM running", instance_names, **kwargs)
@@ -1,4 +1,4 @@
-from pyclvm.ssm import shell
+from pyclvm.ssm.shell import shell
 
 
 def install(instance_name: str, **kwargs: str) -> None:
@@ -1,4 +1,4 @@
-from pyclvm.ssm import shell
+from pyclvm.ssm.shell import shell
 from pyclvm.web import gui
 
 
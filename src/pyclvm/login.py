@@ -11,10 +11,7 @@ from pathlib import Path
 from subprocess import STDOUT, TimeoutExpired, check_output
 from typing import Tuple, Union
 
-from azure.core.exceptions import ClientAuthenticationError
-from azure.identity import DefaultAzureCredential
-
-from pyclvm.plt import _default_platform, _get_os, plt
+from pyclvm.plt import _get_os, plt
 
 _OS = _get_os()
 
@@ -66,7 +63,7 @@ def _login_aws(**kwargs: str) -> None:
 
 # ---
 def _login_gcp(**kwargs: str) -> None:
-    config_path = _get_config_path(str(_default_platform()))
+    config_path = _get_config_path("GCP")
     project_id = kwargs.get("project")
     try:
         # TODO make profile support
@@ -128,6 +125,10 @@ def _login_gcp(**kwargs: str) -> None:
 
 # ---
 def _login_azure(**kwargs: str) -> Union[None, Tuple]:
+    # Azure SDK is imported here to keep it off the start-up path of other platforms
+    from azure.core.exceptions import ClientAuthenticationError
+    from azure.identity import DefaultAzureCredential
+
     def _login():
         try:
             check_output(
@@ -143,7 +144,7 @@ def _login_azure(**kwargs: str) -> Union[None, Tuple]:
             sys.exit(-1)
         sys.exit(0)
 
-    config_path = _get_config_path(str(_default_platform()))
+    config_path = _get_config_path("AZURE")
     if not os.path.isdir(config_path):
         _login()
 
@@ -3,13 +3,13 @@ change default platform (AWS, GCP, AZURE)
 """
 
 
-import json
 import platform
 import sys
-from functools import wraps
-from os import environ, getenv, makedirs, path
-from pathlib import Path
-from typing import Any, Set, Union
+from typing import Any, Dict, Optional, Set, Union
+
+from pyclvm._common.user_data import data_version, fetch_settings, store_setting
+
+_DEFAULT_PLATFORM = "AWS"
 
 
 def _get_os() -> str:
@@ -20,66 +20,54 @@ def _get_supported_platforms() -> Set:
     return {"AWS", "GCP", "AZURE"}
 
 
-def _get_cache_path():
-    """returns the cache path"""
-    return path.join(Path.home(), ".clvm", ".cache.json")
+class _PlatformConfig:
+    """
+    The settings from the local state store, loaded once per process
+    and reloaded only when another process has modified the store
+    """
 
+    def __init__(self) -> None:
+        self._data: Dict[str, str] = {}
+        self._version: Optional[int] = None
 
-def _create_cache() -> None:
-    """creates the cache directory and file if they don't exist"""
-    makedirs(
-        name=path.join(Path.home(), ".clvm"),
-        mode=0o700,
-        exist_ok=True,
-    )
-    with open(_get_cache_path(), "w", encoding="utf8") as cache:
-        data = {"platform": "AWS"}
-        json.dump(data, cache, indent=4)
-    print("Cache file created!")
+    def _load(self) -> Dict[str, str]:
+        version = data_version()
+        if version != self._version:
+            self._data = fetch_settings()
+            self._version = version
+        return self._data
 
+    @property
+    def platform(self) -> str:
+        return self._load().get("platform", _DEFAULT_PLATFORM)
 
-def check_cache_for_platform(func):
-    # This is for preventing multiple cache file hit
-    @wraps(func)
-    def decorator(cloud_platform):
-        if cloud_platform.upper() == getenv("CLVM_DEFAULT_PLATFORM"):
-            return
-        return func(cloud_platform)
+    @platform.setter
+    def platform(self, cloud_platform: str) -> None:
+        if self.platform != cloud_platform:
+            store_setting("platform", cloud_platform)
+            self._data["platform"] = cloud_platform
 
-    return decorator
+
+_CONFIG = _PlatformConfig()
 
 
-@check_cache_for_platform
 def _set_default_platform(cloud_platform: str) -> None:
     """sets the default platform"""
     if cloud_platform in _get_supported_platforms():
-        with open(_get_cache_path(), "w", encoding="utf8") as cache:
-            data = {"platform": f"{cloud_platform.upper()}"}
-            cache.seek(0)
-            json.dump(data, cache, indent=4)
-            cache.truncate()
-            environ["CLVM_DEFAULT_PLATFORM"] = cloud_platform.upper()
-        print(f"Default platform is {cloud_platform.upper()}")
+        _CONFIG.platform = cloud_platform
+        print(f"Default platform is {cloud_platform}")
     else:
         _unsupported_platform(cloud_platform)
 
 
 def _default_platform(**kwargs) -> Union[str, Any]:
     """returns the default platform"""
-
-    if not path.exists(_get_cache_path()):
-        _create_cache()
-
-    if "platform" in kwargs:
-        _set_default_platform(kwargs["platform"].upper())
-    elif "platform" not in kwargs:
-        with open(_get_cache_path(), "r", encoding="utf-8") as cache:
-            cloud_platform = json.load(cache)
-        return cloud_platform["platform"]
+    if "platform" not in kwargs:
+        return _CONFIG.platform
     cloud_platform = str(kwargs["platform"]).upper()
-    if cloud_platform in _get_supported_platforms():
-        return cloud_platform
-    _unsupported_platform(cloud_platform)
+    if cloud_platform != _CONFIG.platform:
+        _set_default_platform(cloud_platform)
+    return cloud_platform
 
 
 def _unsupported_platform(cloud_platform: Union[str, None]) -> None:
@@ -2,6 +2,8 @@
 
 from typing import Dict, Tuple
 
+from pyclvm._common.lazy_commands import lazy_commands
+
 
 def _get_port_mapping(**kwargs: str) -> Tuple[int, int]:
     if kwargs:
@@ -20,7 +22,6 @@ def _make_file_name(
     return f"{platform}-{profile}-{instance_name}-8080={local_port}"
 
 
-from .start import start
-from .stop import stop
-
 __all__ = ["start", "stop"]
+
+__getattr__ = lazy_commands(__name__, __all__)
@@ -8,10 +8,9 @@ from time import sleep
 from typing import Optional
 
 import psutil
-from ec2instances.common.user_data import store
-from jdict import jdict
 
-from pyclvm.ssm.session import start as start_session
+from pyclvm._common.user_data import store_redirect
+from pyclvm.ssm.session.start import start as start_session
 
 from . import _get_port_mapping, _make_file_name
 
@@ -60,7 +59,7 @@ def start(instance_name: str, **kwargs: str) -> int:
     file_name = _make_file_name(
         "aws", kwargs.get("profile", "default"), instance_name, local_port
     )
-    store(file_name, jdict(pid=pid, session_id=session_id))
+    store_redirect(file_name, pid, session_id)
     print(
         f"[<!>] Click the link to redirect to browser: http://localhost:{local_port}/"
     )
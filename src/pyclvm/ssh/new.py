@@ -12,17 +12,9 @@ from typing import Dict, Final, List, Tuple, Union
 from cryptography.hazmat.backends import default_backend as crypto_default_backend
 from cryptography.hazmat.primitives import serialization as crypto_serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
-from ec2instances.ec2_instance_mapping import Ec2RemoteShellMapping, Ec2RemoteShellProxy
+from instances_map_abc.vm_instance_proxy import RemoteShellProxy
 
-from pyclvm._common.azure_instance_mapping import (
-    AzureRemoteShellMapping,
-    AzureRemoteShellProxy,
-)
-from pyclvm._common.gcp_instance_mapping import (
-    GcpRemoteShellMapping,
-    GcpRemoteShellProxy,
-)
-from pyclvm._common.session_aws import get_session
+from pyclvm._common.providers import get_provider
 from pyclvm.plt import (
     _default_platform,
     _get_os,
@@ -51,13 +43,22 @@ _GOOGLE_SSH_KNOWN_HOSTS: Final[str] = os.path.normpath(
 )
 
 _BACKUP_SUFFIX = "ORIG"
-_MAIN = sys.modules["__main__"].__file__
-if _OS == "Windows":
-    _MAIN = _MAIN[: -len("\\__main__.py")]
 
 cloud_platform = None
 
 
+def _get_proxy_command() -> str:
+    main = getattr(sys.modules["__main__"], "__file__", None) or sys.argv[0]
+    if _OS == "Windows":
+        main = main[: -len("\\__main__.py")]
+    # the slim `clvm-proxy` console script is installed next to `clvm`,
+    # fall back to the full command tree when running from sources
+    proxy = join(
+        os.path.dirname(main), "clvm-proxy.exe" if _OS == "Windows" else "clvm-proxy"
+    )
+    return proxy if exists(proxy) else f"{main} ssh start"
+
+
 def new(instance_name: str, **kwargs: str) -> Union[Dict, None]:
     """
     create new ssh key for particular Virtual Machine
@@ -88,30 +89,30 @@ def new(instance_name: str, **kwargs: str) -> Union[Dict, None]:
 
 # ---
 def _new_aws(instance_name: str, **kwargs: str) -> None:
-    instance = Ec2RemoteShellMapping(get_session(kwargs)).get(instance_name)
+    instance = get_provider("AWS").remote_shell_mapping(**kwargs).get(instance_name)
     _create_config_block(instance=instance, **kwargs)
 
 
 # ---
 def _new_gcp(instance_name: str, **kwargs: str) -> None:
-    instance = GcpRemoteShellMapping().get(instance_name)
+    instance = get_provider("GCP").remote_shell_mapping(**kwargs).get(instance_name)
     _create_config_block(instance=instance, **kwargs)
 
 
 # ---
 def _new_azure(instance_name: str, **kwargs: str) -> None:
-    instance = AzureRemoteShellMapping().get(instance_name)
+    instance = get_provider("AZURE").remote_shell_mapping(**kwargs).get(instance_name)
     _create_config_block(instance=instance, **kwargs)
 
 
 # ---
-def _aws_config_lines(instance: Ec2RemoteShellProxy, **kwargs: str) -> List:
+def _aws_config_lines(instance: RemoteShellProxy, **kwargs: str) -> List:
     profile = kwargs.pop("profile", "default")
     private_key_name, pubkey = _save_keys(profile, instance.name)
 
     proxy_data = {
         "identity_file": private_key_name,
-        "proxy_command": f"{str(_MAIN)} ssh start {instance.name} %p profile={profile} platform={cloud_platform}",
+        "proxy_command": f"{_get_proxy_command()} {instance.name} %p profile={profile} platform={cloud_platform}",
         "user_name": "ssm-user",
     }
     # ---
@@ -129,14 +130,14 @@ def _aws_config_lines(instance: Ec2RemoteShellProxy, **kwargs: str) -> List:
 
 
 # ---
-def _gcp_config_lines(instance: GcpRemoteShellProxy, **kwargs: str) -> List:
+def _gcp_config_lines(instance: RemoteShellProxy, **kwargs: str) -> List:
     return _config_lines(
         instance.name, _get_gcp_proxy_data(instance=instance, **kwargs)
     )
 
 
 # ---
-def _azure_config_lines(instance: AzureRemoteShellProxy, **kwargs: str) -> List:
+def _azure_config_lines(instance: RemoteShellProxy, **kwargs: str) -> List:
     profile = kwargs.get("profile", "default")
 
     account = kwargs.get("account")
@@ -151,7 +152,7 @@ def _azure_config_lines(instance: AzureRemoteShellProxy, **kwargs: str) -> List:
 
     proxy_data = {
         "identity_file": key,
-        "proxy_command": f"{str(_MAIN)} ssh start {instance.name} 0 profile={profile} platform={cloud_platform} account={account} key={os.path.normpath(key)}",
+        "proxy_command": f"{_get_proxy_command()} {instance.name} 0 profile={profile} platform={cloud_platform} account={account} key={os.path.normpath(key)}",
         "user_name": account,
     }
     return _config_lines(instance.name, proxy_data)
@@ -320,7 +321,7 @@ def _update_config(instance_name: str, config_lines: List) -> None:
 
 # ---
 def _create_config_block(
-    instance: Union[GcpRemoteShellProxy, AzureRemoteShellProxy, Ec2RemoteShellProxy],
+    instance: RemoteShellProxy,
     **kwargs: str,
 ) -> None:
     """
@@ -361,7 +362,7 @@ def _create_config_block(
 
 # -------------------------------------------------
 # --- Special for Google SDK extract proxy data ---
-def _get_gcp_proxy_data(instance: GcpRemoteShellProxy, **kwargs: str) -> Dict:
+def _get_gcp_proxy_data(instance: RemoteShellProxy, **kwargs: str) -> Dict:
     """
     Gets proxy string and real GCP instance's username
     Args:
@@ -384,7 +385,7 @@ def _get_gcp_proxy_data(instance: GcpRemoteShellProxy, **kwargs: str) -> Dict:
 
         return {
             "identity_file": _GOOGLE_SSH_PRIV_KEY,
-            "proxy_command": f"{str(_MAIN)} ssh start {instance.name} %p profile={profile} platform={cloud_platform}",
+            "proxy_command": f"{_get_proxy_command()} {instance.name} %p profile={profile} platform={cloud_platform}",
             "user_name": account[:32].strip(
                 "_"
             ),  # Google OSLogin account name length is <= 32 without
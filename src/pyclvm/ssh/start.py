@@ -2,9 +2,8 @@ import subprocess
 from functools import partial
 from typing import Optional
 
-from pyclvm._common.azure_instance_mapping import AzureRemoteShellMapping
-from pyclvm._common.azure_instance_proxy import ssh_connection_std_output
-from pyclvm._common.gcp_instance_mapping import GcpRemoteShellMapping
+from pyclvm._common.agent import target
+from pyclvm._common.azure_tunnel import ssh_connection_std_output
 from pyclvm.plt import (
     _default_platform,
     _get_os,
@@ -55,11 +54,7 @@ def _start_aws(instance_name: str, port: int, **kwargs: str) -> None:
 
 
 def _start_gcp(instance_name: str, port: Optional[int] = None, **kwargs: str) -> None:
-    instance = GcpRemoteShellMapping(**kwargs).get(instance_name)
-
-    print(f"Starting {instance_name} ...")
-    instance.start()  # type: ignore
-    print(f"\n{instance_name} is running")
+    instance = target("GCP", instance_name, **kwargs)
 
     cmd = [
         "gcloud.cmd" if _OS == "Windows" else "gcloud",
@@ -68,18 +63,15 @@ def _start_gcp(instance_name: str, port: Optional[int] = None, **kwargs: str) ->
         instance_name,
         "22",
         "--listen-on-stdin",
-        f"--project={instance.session.project}",  # type: ignore
-        f"--zone={instance.session.zone}",  # type: ignore
+        f"--project={instance['project']}",
+        f"--zone={instance['zone']}",
         "--verbosity=warning",
     ]
     subprocess.run(cmd, check=True)
 
 
 def _start_azure(instance_name: str, port: Optional[int] = None, **kwargs: str) -> None:
-    instance = AzureRemoteShellMapping().get(instance_name)
-
-    print(f"Starting {instance_name} ...")
-    instance.start(wait=False)  # type: ignore
-    print(f"\n{instance_name} is running")
-
-    ssh_connection_std_output(instance, **kwargs)
+    instance = target("AZURE", instance_name, **kwargs)
+    ssh_connection_std_output(
+        instance_name, instance["resource_group"], instance["subscription"], **kwargs
+    )
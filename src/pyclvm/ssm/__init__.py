@@ -1,7 +1,7 @@
 """session manager utilities"""
 
-from . import session
-from .clear import clear
-from .shell import shell
+from pyclvm._common.lazy_commands import lazy_commands
 
 __all__ = ["shell", "session", "clear"]
+
+__getattr__ = lazy_commands(__name__, __all__)
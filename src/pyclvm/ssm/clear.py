@@ -1,9 +1,7 @@
 """clear stored session credentials."""
 
-import os
-
 from pyclvm._common.session_aws import make_file_name
-from pyclvm._common.user_data import get_credentials_file_path
+from pyclvm._common.user_data import remove_credentials
 
 
 def clear(**kwargs: str) -> None:
@@ -18,10 +16,7 @@ def clear(**kwargs: str) -> None:
     """
 
     profile_name = kwargs.get("profile", "default")
-    credentials_file = make_file_name(profile_name)
-    credentials_file_path = get_credentials_file_path(credentials_file)
-    try:
-        os.remove(credentials_file_path)
+    if remove_credentials(make_file_name(profile_name)):
         print("[INFO] Successfully removed stored credentials")
-    except FileNotFoundError:
-        print("[SKIPPED] as there is no such file or directory to be removed...")
+    else:
+        print("[SKIPPED] as there are no stored credentials to be removed...")
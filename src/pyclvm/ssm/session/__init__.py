@@ -1,6 +1,7 @@
 """session manager session utilities"""
-from .ls import ls
-from .start import start
-from .stop import stop
+
+from pyclvm._common.lazy_commands import lazy_commands
 
 __all__ = ["start", "stop", "ls"]
+
+__getattr__ = lazy_commands(__name__, __all__)
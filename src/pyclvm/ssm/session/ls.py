@@ -1,8 +1,7 @@
 from typing import Final, Tuple
 
-from ec2instances.common.session import get_session
-from rich.console import Console
-from rich.table import Table
+from pyclvm._common.output import get_format, write_records
+from pyclvm._common.providers import get_provider
 
 _COLUMNS: Final[Tuple[str, ...]] = ("SessionId", "Target", "DocumentName", "Owner")
 
@@ -14,24 +13,39 @@ def ls(**kwargs: str) -> None:
 
 
     Args:
-        **kwargs (str): (optional) classifiers, at the moment, profile name
+        **kwargs (str): (optional) classifiers, at the moment, profile name,
+            format=jsonl|csv|tsv streams the records instead of the table
 
     Returns:
         None
 
     """
-    session = get_session(kwargs)
+    output_format = get_format(kwargs)
+    session = get_provider("AWS").get_session(kwargs)
     ssm_client = session.client("ssm")
-    sts_client = session.client("sts")
 
-    account = sts_client.get_caller_identity().Account
+    pages = ssm_client.get_paginator("describe_sessions").paginate(State="Active")
+    records = (
+        [ssm_session.get(column, "") for column in _COLUMNS]
+        for page in pages
+        for ssm_session in page["Sessions"]
+    )
+    if output_format:
+        write_records(output_format, _COLUMNS, records)
+        return
+
+    # rich is imported for the table only, the scripts do not wait for it
+    from rich.console import Console
+    from rich.table import Table
+
+    sts_client = session.client("sts")
+    account = sts_client.get_caller_identity()["Account"]
     table = Table(title=f"{account} Account SSM Sessions")
     for column in _COLUMNS:
         table.add_column(column, justify="left", no_wrap=True)
 
-    response = ssm_client.describe_sessions(State="Active")
-    for session in response.Sessions:
-        table.add_row(*(session.get(column, "") for column in _COLUMNS))
+    for record in records:
+        table.add_row(*record)
 
     console = Console()
     console.print(table)
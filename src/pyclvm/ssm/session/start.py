@@ -3,25 +3,14 @@
 import os
 import sys
 from subprocess import Popen, TimeoutExpired
-from typing import Optional
+from typing import Dict, Optional
 
-from ec2instances.common.session import Session
-from ec2instances.common.signal_handler import interrupt_handler
+from pyclvm._common.agent import target
+from pyclvm._common.signal_handler import interrupt_handler
 
-from pyclvm.instance import start as instance_start
 
-
-def _make_env(session: Session) -> dict:
-    credentials = session.get_credentials()
-    return {
-        **os.environ,
-        **{
-            "AWS_ACCESS_KEY_ID": credentials.access_key,
-            "AWS_SECRET_ACCESS_KEY": credentials.secret_key,
-            "AWS_SESSION_TOKEN": credentials.token,
-            "AWS_DEFAULT_REGION": session.region_name,
-        },
-    }
+def _make_env(credentials_env: Dict[str, str]) -> dict:
+    return {**os.environ, **credentials_env}
 
 
 def _call_subprocess(instance_id: str, env: dict, wait: bool, *args: str):
@@ -61,11 +50,10 @@ def start(instance_name: str, *args: str, **kwargs: str) -> Optional[Popen]:
 
     """
     try:
-        session, instance_id = instance_start(
-            instance_name,
-            **dict(kwargs, wait=True),
-        )  # type: ignore
-        return _start_ssm_session(instance_id, _make_env(session), True, *args)
+        target_ = target("AWS", instance_name, **kwargs)
+        return _start_ssm_session(
+            target_["instance_id"], _make_env(target_["env"]), True, *args
+        )
     except RuntimeError as err:
         print(err)
         return None
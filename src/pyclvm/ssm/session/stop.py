@@ -1,4 +1,4 @@
-from ec2instances.common.session import get_session
+from pyclvm._common.providers import get_provider
 
 
 def stop(identifier: str, **kwargs: str) -> None:
@@ -13,7 +13,7 @@ def stop(identifier: str, **kwargs: str) -> None:
         None
 
     """
-    session = get_session(kwargs)
+    session = get_provider("AWS").get_session(kwargs)
     client = session.client("ssm")
     if identifier.startswith("i-0"):  # close all sessions with a certain vm
         active_sessions = client.describe_sessions(
@@ -1,8 +1,6 @@
 from typing import Any, Tuple, Union
 
-from ec2instances.ec2_instance_mapping import Ec2RemoteShellMapping
-
-from pyclvm._common.session_aws import get_session
+from pyclvm._common.providers import get_provider
 
 
 def shell(
@@ -22,5 +20,5 @@ def shell(
         standard output, standard err if wait=True (default), otherwise ssm_client, command_id, instance_id
 
     """
-    instance = Ec2RemoteShellMapping(get_session(kwargs))[instance_name]
+    instance = get_provider("AWS").remote_shell_mapping(**kwargs)[instance_name]
     return instance.execute(*commands)  # type: ignore
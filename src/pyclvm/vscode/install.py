@@ -7,8 +7,6 @@ from typing import List
 
 # TODO: provide support for CentOS
 
-ENV = platform.uname()
-
 
 def _run_script(*commands: List[str]) -> None:
     # TODO: generic open source?
@@ -34,8 +32,9 @@ def install_extensions():
 def install_on_linux():
     """installs vscode for linux"""
 
-    assert "Ubuntu" in ENV.version
-    assert "x86_64" == ENV.machine
+    env = platform.uname()
+    assert "Ubuntu" in env.version
+    assert "x86_64" == env.machine
     _run_script(
         ["sudo", "apt", "update"],
         [
@@ -136,4 +135,4 @@ def install() -> None:
         "Linux": install_on_linux,
         "Darwin": install_on_macos,
         "Windows": install_on_windows,
-    }[ENV.system]()
+    }[platform.system()]()
@@ -3,14 +3,11 @@ from time import sleep
 from typing import Any, List
 
 import psutil
-from ec2instances.ec2_instance_mapping import Ec2RemoteShellMapping
-from plt import _get_os
 
-from pyclvm._common.azure_instance_mapping import AzureRemoteShellMapping
-from pyclvm._common.gcp_instance_mapping import GcpRemoteShellMapping
-from pyclvm._common.session_aws import get_session
+from pyclvm._common.providers import get_provider
 from pyclvm.plt import (
     _default_platform,
+    _get_os,
     _get_supported_platforms,
     _unsupported_platform,
 )
@@ -80,9 +77,4 @@ def _run_subprocess(instance_name: str, _platform: str, **kwargs: str) -> None:
 
 
 def _get_platform_instance(instance_name: str, _platform: str, **kwargs: str) -> Any:
-    platform_instance_map = {
-        "AWS": lambda: Ec2RemoteShellMapping(get_session(kwargs)).get(instance_name),
-        "GCP": lambda: GcpRemoteShellMapping().get(instance_name),
-        "AZURE": lambda: AzureRemoteShellMapping().get(instance_name),
-    }
-    return platform_instance_map.get(_platform.upper())()
+    return get_provider(_platform).remote_shell_mapping(**kwargs).get(instance_name)
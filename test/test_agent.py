@@ -0,0 +1,324 @@
+"""
+The agent runs the commands in the environment of the caller, with its own sessions
+kept warm, the listings within their TTL, until the credentials are refused
+"""
+
+import os
+import socket
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+# the agent resets the sessions of the imported platforms
+from pyclvm._common import agent, inventory, provider_gcp, session_gcp  # noqa: F401
+from pyclvm._common.session_gcp import GcpSession, get_session
+
+_ZONES: Dict[str, List[str]] = {
+    "europe-west2-a": ["alpha"],
+    "us-central1-a": ["beta", "gamma"],
+}
+
+
+class _Client:
+    def list(self, request, metadata=()) -> Iterator[SimpleNamespace]:
+        return iter(
+            [
+                SimpleNamespace(name=name, id=len(name), status="RUNNING")
+                for name in _ZONES[request.zone]
+            ]
+        )
+
+
+def _authenticate(session: GcpSession, **kwargs: str) -> None:
+    session.project_id = "project"
+    session._credentials = None
+
+
+@pytest.fixture(autouse=True)
+def _gcp(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(inventory, "fetch_cache", lambda name: None)
+    monkeypatch.setattr(inventory, "store_cache", lambda name, data: None)
+    monkeypatch.setattr(GcpSession, "_authenticate", _authenticate)
+    monkeypatch.setattr(session_gcp, "InstancesClient", lambda credentials: _Client())
+    monkeypatch.setattr(session_gcp, "_SESSIONS", {})
+
+
+def _dispatch() -> None:
+    # clvm instance ls name=value ...
+    kwargs = dict(arg.split("=", 1) for arg in sys.argv[3:])
+    session = get_session(**kwargs)
+    print(" ".join(instance.name for instance in session.instances))
+    print(os.getenv("CLOUDSDK_COMPUTE_ZONE"), os.getcwd())
+
+
+_SERVER = SimpleNamespace(
+    dispatch=_dispatch, context=agent._Context(), dispatching=threading.Lock()
+)
+
+
+def _respond(*args: str, env: Optional[Dict[str, str]] = None, cwd: str = "/") -> Dict:
+    handler = object.__new__(agent._AgentRequestHandler)
+    handler.server = _SERVER
+    stdout, stderr = sys.stdout, sys.stderr
+    # as installed by serve()
+    sys.stdout, sys.stderr = agent._Output(stdout), agent._Output(stderr)
+    try:
+        return handler._call(["clvm", "instance", "ls", *args], env or {}, cwd)
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+def _call(
+    *args: str, env: Optional[Dict[str, str]] = None, cwd: str = "/"
+) -> List[str]:
+    response = _respond(*args, env=env, cwd=cwd)
+    assert response["status"] == "ok", response.get("error")
+    return response["output"].splitlines()
+
+
+def test_calls_with_other_arguments() -> None:
+    assert _call("zones=europe-west2-a")[0] == "alpha"
+    assert _call("zones=us-central1-a")[0] == "beta gamma"
+    assert len(session_gcp._SESSIONS) == 2
+
+
+def test_calls_share_the_listing_within_its_ttl(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    assert _call("zones=europe-west2-a")[0] == "alpha"
+    monkeypatch.setitem(_ZONES, "europe-west2-a", ["alpha", "delta"])
+    assert _call("zones=europe-west2-a")[0] == "alpha"
+    assert _call("zones=europe-west2-a", "ttl=0")[0] == "alpha delta"
+    monkeypatch.setitem(_ZONES, "europe-west2-a", ["delta"])
+    assert _call("zones=europe-west2-a", "ttl=0")[0] == "delta"
+    assert len(session_gcp._SESSIONS) == 2
+
+
+@pytest.mark.parametrize(
+    "error, reset",
+    [
+        (session_gcp.RefreshError("revoked"), True),
+        (RuntimeError("No such instance"), False),
+    ],
+)
+def test_sessions_are_reset_on_auth_failure(
+    error: Exception, reset: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert _call("zones=europe-west2-a")[0] == "alpha"
+
+    def _fail() -> None:
+        get_session(zones="europe-west2-a")
+        raise error
+
+    monkeypatch.setattr(_SERVER, "dispatch", _fail)
+    assert _respond()["status"] == "error"
+    assert (not session_gcp._SESSIONS) == reset
+
+
+def test_sessions_are_reset_on_login(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert _call("zones=europe-west2-a")[0] == "alpha"
+
+    def _login() -> None:
+        try:
+            raise session_gcp.RefreshError("expired")
+        except session_gcp.RefreshError:
+            sys.exit(0)  # as the login callbacks do
+
+    monkeypatch.setattr(_SERVER, "dispatch", _login)
+    assert _call() == []
+    assert not session_gcp._SESSIONS
+
+
+def test_calls_in_the_environment_of_the_caller(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("CLOUDSDK_COMPUTE_ZONE", "us-central1-a")
+    current_dir = os.getcwd()
+
+    caller_env = {"CLOUDSDK_COMPUTE_ZONE": "europe-west2-a"}
+    assert _call("zones=europe-west2-a", env=caller_env, cwd=str(tmp_path))[1] == (
+        f"europe-west2-a {tmp_path}"
+    )
+    # unset by the caller
+    assert _call("zones=europe-west2-a")[1] == "None /"
+
+    assert os.environ["CLOUDSDK_COMPUTE_ZONE"] == "us-central1-a"
+    assert os.getcwd() == current_dir
+
+
+def test_cloud_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("AWS_PROFILE", "dev")
+    monkeypatch.delenv("AWS_DEFAULT_REGION", raising=False)
+    monkeypatch.setenv("EDITOR", "vi")
+    env = agent._cloud_env()
+    assert env["AWS_PROFILE"] == "dev"
+    assert "AWS_DEFAULT_REGION" not in env and "EDITOR" not in env
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Any]:
+    monkeypatch.setattr(agent, "_SOCKET_PATH", str(tmp_path / "agent.sock"))
+    monkeypatch.delenv("CLVM_AGENT", raising=False)
+    released = threading.Event()
+
+    def _dispatch() -> None:
+        released.wait(10)
+
+    server = agent._AgentServer(_dispatch, idle_timeout=1)
+    server.released = released
+    server.timeout = 0.1
+
+    def _serve() -> None:
+        while not server.stopped:
+            server.handle_request()
+
+    thread = threading.Thread(target=_serve)
+    thread.start()
+    yield server
+    released.set()
+    server.stopped = True
+    thread.join()
+    server.server_close()
+
+
+def test_requests_are_served_beside_a_command(server: Any) -> None:
+    responses: List[Optional[Dict]] = []
+    call = threading.Thread(
+        target=lambda: responses.append(
+            agent.request(
+                "call", 10, argv=["clvm", "instance", "start"], env={}, cwd="/"
+            )
+        )
+    )
+    call.start()
+    while not server.dispatching.locked():
+        pass
+    assert agent.request("status")["status"] == "ok"
+    # one command line at a time, the caller runs the other one locally
+    assert agent.request("call", argv=["clvm"], env={}, cwd="/") == {"status": "busy"}
+    server.released.set()
+    call.join()
+    assert responses[0]["status"] == "ok"
+
+
+def test_idle_agent_waits_for_the_command_in_progress(server: Any) -> None:
+    call = threading.Thread(
+        target=lambda: agent.request("call", 10, argv=["clvm"], env={}, cwd="/")
+    )
+    call.start()
+    while not server.dispatching.locked():
+        pass
+    server.handle_timeout()
+    assert not server.stopped
+    server.released.set()
+    call.join()
+
+
+def test_silent_agent_times_out(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(agent, "_SOCKET_PATH", str(tmp_path / "agent.sock"))
+    monkeypatch.delenv("CLVM_AGENT", raising=False)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(agent._SOCKET_PATH)
+        sock.listen()
+        assert agent.request("status", 0.2)["status"] == "error"
+
+
+def test_context_of_other_callers_is_turned_away(tmp_path: Path) -> None:
+    context = agent._Context()
+    current_dir = os.getcwd()
+    assert context.enter({"AWS_PROFILE": "dev", "COLUMNS": "80"}, str(tmp_path))
+    assert context.enter({"AWS_PROFILE": "dev"}, str(tmp_path))
+    assert not context.enter({"AWS_PROFILE": "prod"}, str(tmp_path))
+    assert not context.enter({"AWS_PROFILE": "dev"}, "/")
+    assert os.environ["AWS_PROFILE"] == "dev" and os.getcwd() == str(tmp_path)
+    context.leave()
+    context.leave()
+    assert os.getcwd() == current_dir
+
+
+@pytest.mark.parametrize(
+    "arguments, timeout",
+    [([], 900.0), (["timeout=60"], 960.0), (["timeout=1h"], 900.0)],
+)
+def test_response_timeout(arguments: List[str], timeout: float) -> None:
+    assert agent._get_response_timeout(arguments) == timeout
+
+
+def test_not_running_agent(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(agent, "_SOCKET_PATH", str(tmp_path / "agent.sock"))
+    monkeypatch.delenv("CLVM_AGENT", raising=False)
+    assert agent.request("status") is None
+
+
+_ARGV: List[str] = ["clvm", "instance", "start", "alpha"]
+
+
+@pytest.mark.parametrize(
+    "response, code",
+    [
+        (None, None),
+        ({"status": "busy"}, None),
+        ({"status": "ok", "output": "started\n", "code": 0}, 0),
+        ({"status": "error", "output": "started\n", "error": "Traceback"}, 1),
+    ],
+    ids=["not running", "busy", "ok", "error"],
+)
+def test_forward(
+    response: Optional[Dict],
+    code: Optional[int],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    monkeypatch.setattr(agent, "request", lambda op, timeout, **payload: response)
+    # an error after the dispatch is reported, the command is not run again locally
+    assert agent.forward(_ARGV) == code
+    captured = capsys.readouterr()
+    assert captured.out == (response or {}).get("output", "")
+    assert ("Traceback" in captured.err) == (code == 1)
+
+
+def test_interactive_command_is_not_forwarded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(agent, "request", pytest.fail)
+    assert agent.forward([*_ARGV, "watch=5"]) is None
+
+
+@pytest.mark.parametrize(
+    "response, tunnel_targets",
+    [
+        (None, 1),
+        ({"status": "busy"}, 1),
+        ({"status": "ok", "output": "", "code": 0, "target": {"zone": "z"}}, 0),
+    ],
+    ids=["not running", "busy", "ok"],
+)
+def test_target(
+    response: Optional[Dict], tunnel_targets: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: List[str] = []
+    monkeypatch.setattr(agent, "request", lambda op, timeout, **payload: response)
+    monkeypatch.setattr(
+        agent,
+        "get_provider",
+        lambda platform: SimpleNamespace(
+            tunnel_target=lambda name, **kwargs: calls.append(name) or {"zone": "z"}
+        ),
+    )
+    assert agent.target("GCP", "alpha") == {"zone": "z"}
+    assert len(calls) == tunnel_targets
+
+
+def test_target_error_is_not_run_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        agent,
+        "request",
+        lambda op, timeout, **payload: {"status": "error", "error": "no response"},
+    )
+    monkeypatch.setattr(agent, "get_provider", pytest.fail)
+    with pytest.raises(RuntimeError, match="no response"):
+        agent.target("GCP", "alpha")
@@ -0,0 +1,149 @@
+"""
+EC2 instances of several profiles and regions are listed concurrently, one session per pair
+"""
+
+from datetime import datetime
+from threading import Barrier
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from pyclvm._common import provider_aws
+from pyclvm.instance import _mapping
+
+
+class _Client:
+    def __init__(self, profile: str, region: str, barrier: Optional[Barrier]) -> None:
+        self.profile = profile
+        self.barrier = barrier
+        self.meta = SimpleNamespace(region_name=region)
+        self.params: List[Dict] = []
+
+    def get_caller_identity(self) -> Dict[str, str]:
+        return {"Account": f"{self.profile}-account"}
+
+    def get_paginator(self, operation: str) -> "_Client":
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.params.append(params)
+        if self.barrier:
+            self.barrier.wait(timeout=5)  # all the pairs are listed at once
+        yield {
+            "Reservations": [
+                {
+                    "Instances": [
+                        {
+                            "InstanceId": f"i-{self.profile}-{self.meta.region_name}",
+                            "State": {"Name": "running"},
+                            "InstanceType": "t3.micro",
+                            "Placement": {"AvailabilityZone": "a"},
+                            "LaunchTime": datetime(2022, 1, 1),
+                            "Tags": [{"Key": "Name", "Value": self.profile}],
+                        }
+                    ]
+                }
+            ]
+        }
+
+
+def _fake_clients(
+    monkeypatch: pytest.MonkeyPatch, barrier: Optional[Barrier] = None
+) -> Dict:
+    clients: Dict = {}
+
+    def get_client(service: str, kwargs: Dict[str, str]) -> _Client:
+        profile, region = kwargs["profile"], kwargs["region"] or "eu-west-1"
+        return clients.setdefault(
+            (service, profile, region), _Client(profile, region, barrier)
+        )
+
+    monkeypatch.setattr(provider_aws, "get_client", get_client)
+    return clients
+
+
+def test_profiles_and_regions_are_listed_concurrently(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    clients = _fake_clients(monkeypatch, Barrier(4))
+    title, instances = provider_aws.list_instances(
+        profiles="dev,prod", regions="eu-west-1,us-east-1", states="running"
+    )
+    assert title == "EC2 Instances of 4 Profiles and Regions"
+    assert sorted(instances) == [
+        (
+            "i-dev-eu-west-1",
+            "dev",
+            "running",
+            {"Profile": "dev", "Region": "eu-west-1"},
+        ),
+        (
+            "i-dev-us-east-1",
+            "dev",
+            "running",
+            {"Profile": "dev", "Region": "us-east-1"},
+        ),
+        (
+            "i-prod-eu-west-1",
+            "prod",
+            "running",
+            {"Profile": "prod", "Region": "eu-west-1"},
+        ),
+        (
+            "i-prod-us-east-1",
+            "prod",
+            "running",
+            {"Profile": "prod", "Region": "us-east-1"},
+        ),
+    ]
+    assert len(clients) == 4  # a session per profile and region
+    assert all(
+        client.params[0]["Filters"]
+        == [{"Name": "instance-state-name", "Values": ["running"]}]
+        for client in clients.values()
+    )
+
+
+def test_single_profile_is_listed_with_its_account(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _fake_clients(monkeypatch)
+    title, instances = provider_aws.list_instances(profile="dev")
+    assert title == "dev-account Account EC2 Instances"
+    assert list(instances) == [("i-dev-eu-west-1", "dev", "running")]
+
+
+class _StatusClient:
+    def __init__(self) -> None:
+        self.params: List[Dict] = []
+
+    def get_paginator(self, operation: str) -> "_StatusClient":
+        assert operation == "describe_instance_status"
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.params.append(params)
+        yield {
+            "InstanceStatuses": [
+                {"InstanceId": instance_id, "InstanceState": {"Name": "running"}}
+                for instance_id in params.get("InstanceIds", ["i-1", "i-2", "i-3"])
+            ]
+        }
+
+
+def test_watched_ids_are_read_by_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _StatusClient()
+    monkeypatch.setattr(provider_aws, "get_client", lambda service, kwargs: client)
+    monkeypatch.setattr(_mapping, "_BATCH_SIZE", 2)
+    read_states = provider_aws.watch_states(profile="dev")
+    assert read_states(["i-1", "i-2", "i-3"]) == dict.fromkeys(
+        ["i-1", "i-2", "i-3"], "running"
+    )
+    assert [params["InstanceIds"] for params in client.params] == [
+        ["i-1", "i-2"],
+        ["i-3"],
+    ]
+    # the whole account, watching the listing
+    assert len(read_states()) == 3
+    assert "InstanceIds" not in client.params[-1]
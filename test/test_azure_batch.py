@@ -0,0 +1,190 @@
+"""
+Several Azure VMs are started concurrently, on a pool of threads over pooled connections
+"""
+
+from threading import Lock
+from time import sleep
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytest
+
+from pyclvm._common.azure_rest_api import PooledAzureRestApi
+from pyclvm.instance import _azure_batch
+
+
+class _RestApi:
+    def __init__(self, states: Dict[str, str]) -> None:
+        self.states = states
+        self.calls: List[str] = []
+        self.lock = Lock()
+        self.running = self.most_running = 0
+
+    def __enter__(self) -> "_RestApi":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.calls.append("close")
+
+    def _call(self, call: str, vm_instance_name: str) -> None:
+        with self.lock:
+            self.calls.append(f"{call} {vm_instance_name}")
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        sleep(0.05)
+        with self.lock:
+            self.running -= 1
+
+    def vm_state(
+        self, resource_group_name: str, vm_instance_name: str
+    ) -> Optional[str]:
+        self._call("state", vm_instance_name)
+        state = self.states[vm_instance_name]
+        if state == "VM starting":  # running at the next poll
+            self.states[vm_instance_name] = "VM running"
+        return state
+
+    def vm_start(self, resource_group_name: str, vm_instance_name: str) -> Dict:
+        self._call("start", vm_instance_name)
+        if vm_instance_name == "broken":
+            raise RuntimeError("Azure REST API error: Conflict, code: 409")
+        self.states[vm_instance_name] = "VM starting"
+        return {}
+
+
+@pytest.fixture
+def rest_api(monkeypatch: pytest.MonkeyPatch) -> _RestApi:
+    rest_api = _RestApi(
+        {
+            "a": "VM deallocated",
+            "b": "VM stopped",
+            "c": "VM running",
+            "d": "VM deallocating",
+            "broken": "VM deallocated",
+        }
+    )
+    session = SimpleNamespace(
+        find_instances=lambda instance_names: {
+            name: {"resource_group": "RG", "instance_name": name}
+            if name in rest_api.states
+            else None
+            for name in instance_names
+        },
+        get_pooled_rest_api=lambda limit: rest_api,
+    )
+    monkeypatch.setattr(_azure_batch, "get_session", lambda **kwargs: session)
+    monkeypatch.setattr(_azure_batch, "_POLL_INTERVAL", 0)
+    return rest_api
+
+
+def test_vms_are_started_concurrently(rest_api: _RestApi) -> None:
+    results = _azure_batch.process_batch(
+        "start", ("a", "b", "c", "d", "broken", "ghost")
+    )
+    assert [result[:3] for result in results] == [
+        ("a", "VM deallocated", "VM running"),
+        ("b", "VM stopped", "VM running"),
+        ("c", "VM running", "VM running"),
+        ("d", "VM deallocating", None),
+        ("broken", "VM deallocated", None),
+        ("ghost", None, None),
+    ]
+    assert [result.error for result in results[3:]] == [
+        "can not start an instance in VM deallocating state",
+        "RuntimeError: Azure REST API error: Conflict, code: 409",
+        "No such instance registered",
+    ]
+    # the states of the 5 VMs, the starts of 3 of them, then 2 polls of 2 VMs
+    assert [call.split()[0] for call in rest_api.calls] == [
+        *["state"] * 5,
+        *["start"] * 3,
+        *["state"] * 4,
+        "close",
+    ]
+    assert rest_api.most_running == 5
+
+
+def test_no_wait_reads_the_states_once(rest_api: _RestApi) -> None:
+    results = _azure_batch.process_batch("start", ("a", "b"), wait="no")
+    assert [result[:3] for result in results] == [
+        ("a", "VM deallocated", "VM starting"),
+        ("b", "VM stopped", "VM starting"),
+    ]
+    assert len(rest_api.calls) == 2 + 2 + 2 + 1
+
+
+@pytest.mark.parametrize("timeout", ["0", "20"])
+def test_vms_not_done_in_time_fail(
+    rest_api: _RestApi, monkeypatch: pytest.MonkeyPatch, timeout: str
+) -> None:
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr(_azure_batch, "perf_counter", lambda: float(next(clock)))
+
+    def vm_start(resource_group_name: str, vm_instance_name: str) -> Dict:
+        rest_api.calls.append(f"start {vm_instance_name}")
+        if vm_instance_name != "a":  # a hangs, b is running at the first poll
+            rest_api.states[vm_instance_name] = "VM running"
+        return {}
+
+    rest_api.vm_start = vm_start
+    results = _azure_batch.process_batch("start", ("a", "b"), timeout=timeout)
+    assert results[0][:3] == ("a", "VM deallocated", None)
+    assert results[0].error == f"not done in {timeout}s"
+    assert results[1][:3] == ("b", "VM stopped", "VM running")
+    assert results[1].error is None
+    assert rest_api.calls.count("state b") == 2
+
+
+class _Http:
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.running = self.most_running = 0
+        self.urls: List[str] = []
+
+    def close(self) -> None:
+        pass
+
+    def request(self, method: str, url: str, headers: Dict) -> SimpleNamespace:
+        with self.lock:
+            self.urls.append(f"{method} {url}")
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return SimpleNamespace(
+            status_code=200,
+            reason="OK",
+            text='{"statuses": [{}, {"displayStatus": "VM running"}]}',
+        )
+
+
+def test_requests_are_limited(
+    rest_api: _RestApi, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    blocking = SimpleNamespace(
+        base_url="https://management.azure.com/",
+        subscription_id="sid",
+        headers=lambda: {},
+    )
+    http = _Http()
+    pooled = PooledAzureRestApi(blocking, limit=2)
+    pooled._http = http
+    rest_api.states = {f"vm-{index}": "VM running" for index in range(6)}
+    session = _azure_batch.get_session()
+    monkeypatch.setattr(session, "get_pooled_rest_api", lambda limit: pooled)
+
+    results = _azure_batch.process_batch("start", tuple(rest_api.states), workers="2")
+    assert [result.new_state for result in results] == ["VM running"] * 6
+    assert http.most_running == 2
+    assert http.urls[0] == (
+        "GET https://management.azure.com/subscriptions/sid/resourceGroups/rg"
+        "/providers/Microsoft.Compute/virtualMachines/vm-0/instanceView"
+        "?api-version=2022-08-01"
+    )
+
+
+def test_invalid_timeout_starts_nothing(rest_api: _RestApi) -> None:
+    with pytest.raises(SystemExit):
+        _azure_batch.process_batch("start", ("a", "b"), timeout="1h")
+    assert rest_api.calls == []
@@ -0,0 +1,61 @@
+"""
+Azure VM instances are streamed page by page, following the nextLink of the responses
+"""
+
+from typing import Dict, List
+
+from pyclvm._common.azure_rest_api import AzureRestApi
+
+_BASE_URL = "https://management.azure.com/"
+
+
+def _make_api(pages: Dict[str, Dict]) -> AzureRestApi:
+    api = object.__new__(AzureRestApi.__wrapped__)
+    api._base_url = _BASE_URL
+    api._base_api_version = "2022-01-01"
+    api._subscription_id = "subscription"
+    api.requested: List[str] = []
+
+    def _get(url: str) -> Dict:
+        api.requested.append(url)
+        return pages[url.split("?")[0]]
+
+    api._get = _get
+    return api
+
+
+def test_all_the_pages_are_streamed() -> None:
+    first = f"{_BASE_URL}/subscriptions/subscription/providers/Microsoft.Compute/virtualMachines"
+    api = _make_api(
+        {
+            first: {"value": [{"name": "alpha"}], "nextLink": f"{_BASE_URL}page2"},
+            f"{_BASE_URL}page2": {"value": [{"name": "beta"}, {"name": "gamma"}]},
+        }
+    )
+    instances = api.iter_vm_instances(_filter={"statusOnly": "true"})
+    assert next(instances) == {"name": "alpha"}
+    assert len(api.requested) == 1
+    assert api.requested[0].endswith("?api-version=2022-08-01&statusOnly=true")
+    assert [instance["name"] for instance in instances] == ["beta", "gamma"]
+    assert api.requested[1] == f"{_BASE_URL}page2"
+
+
+def test_vm_instances_are_found_by_name() -> None:
+    resources = f"{_BASE_URL}/subscriptions/subscription/resources"
+    api = _make_api(
+        {
+            resources: {
+                "value": [
+                    {"name": "alpha-2", "id": "/subscriptions/s/resourceGroups/b"},
+                    {"name": "Alpha", "id": "/subscriptions/s/resourceGroups/a"},
+                ]
+            }
+        }
+    )
+    assert [vm["id"] for vm in api.find_vm_instances("alpha")] == [
+        "/subscriptions/s/resourceGroups/a"
+    ]
+    assert api.requested[0].endswith(
+        "?api-version=2021-04-01&$filter=resourceType%20eq%20"
+        "%27Microsoft.Compute/virtualMachines%27%20and%20name%20eq%20%27alpha%27"
+    )
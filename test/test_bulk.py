@@ -0,0 +1,42 @@
+"""
+The arguments shared by the start and stop of several instances
+"""
+
+from typing import Dict
+
+import pytest
+
+from pyclvm.instance._bulk import get_timeout, get_workers, should_wait
+
+
+@pytest.mark.parametrize(
+    "kwargs, timeout",
+    [
+        ({}, 600.0),
+        ({"timeout": "90"}, 90.0),
+        ({"timeout": "1.5"}, 1.5),
+        ({"timeout": "0"}, 0.0),
+    ],
+)
+def test_timeout(kwargs: Dict[str, str], timeout: float) -> None:
+    assert get_timeout(kwargs, 600.0) == timeout
+
+
+@pytest.mark.parametrize("value", ["soon", "-5", "nan"])
+def test_invalid_timeout(value: str, capsys: pytest.CaptureFixture) -> None:
+    with pytest.raises(SystemExit):
+        get_timeout({"timeout": value}, 600.0)
+    assert f"[ERROR] timeout={value}:" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("value", ["many", "0"])
+def test_invalid_workers(value: str, capsys: pytest.CaptureFixture) -> None:
+    with pytest.raises(SystemExit):
+        get_workers({"workers": value})
+    assert f"[ERROR] workers={value}:" in capsys.readouterr().out
+
+
+def test_wait() -> None:
+    assert should_wait({})
+    assert should_wait({"wait": "yes"})
+    assert not should_wait({"wait": "No"})
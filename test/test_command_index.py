@@ -0,0 +1,116 @@
+"""
+The command tree is indexed from the sources, the commands are imported on first use
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import pytest
+
+from pyclvm._common import command_index
+from pyclvm._common.command_index import _index_group, is_help_request, resolve
+
+_TREE: Dict[str, str] = {
+    "__init__.py": '"""clvm"""\n',
+    "_private.py": "def _private(): ...\n",
+    "group/__init__.py": (
+        '"""group of commands"""\n\n'
+        "from pyclvm._common.lazy_commands import lazy_commands\n\n"
+        '__all__ = ["start", "sub_group", "helpers"]\n\n'
+        "__getattr__ = lazy_commands(__name__, __all__)\n"
+    ),
+    "group/start.py": (
+        "def start(name: str) -> str:\n"
+        '    """\n    Starts it\n\n    Args:\n        name (str): name\n    """\n'
+        "    return f'started {name}'\n"
+    ),
+    "group/hidden.py": "def hidden(): ...\n",
+    "group/helpers.py": '"""several commands"""\n\ndef one(): ...\n',
+    "group/sub_group/__init__.py": '"""subgroup"""\n',
+    "group/sub_group/ls.py": "def ls(): ...\n",
+}
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    for name, source in _TREE.items():
+        (tmp_path / "lazy_pkg" / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "lazy_pkg" / name).write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path / "lazy_pkg"
+    for name in [name for name in sys.modules if name.startswith("lazy_pkg")]:
+        del sys.modules[name]
+
+
+def test_index(package: Path) -> None:
+    assert _index_group(package, "lazy_pkg", None) == {
+        "group": {
+            "help": "group of commands",
+            "commands": {
+                "start": {
+                    "help": "\n    Starts it\n\n    ",
+                    "module": "lazy_pkg.group.start",
+                },
+                "sub_group": {
+                    "help": "subgroup",
+                    "commands": {
+                        "ls": {
+                            "help": "[ERROR] Missing command docstring",
+                            "module": "lazy_pkg.group.sub_group.ls",
+                        }
+                    },
+                },
+                "helpers": {"help": "several commands"},
+            },
+        }
+    }
+
+
+def test_resolve(package: Path) -> None:
+    index = _index_group(package, "lazy_pkg", None)
+    names, entry = resolve(index, ["group", "sub-group", "ls", "name=value"])
+    assert names == ["group", "sub_group", "ls"]
+    assert entry["module"] == "lazy_pkg.group.sub_group.ls"
+    assert resolve(index, ["group", "stop"])[0] == ["group"]
+    assert resolve(index, ["other"]) == ([], None)
+
+
+@pytest.mark.parametrize(
+    "names, args, expected",
+    [
+        ([], [], True),
+        ([], ["--version"], True),
+        (["group"], ["group"], True),
+        (["group"], ["group", "-h"], True),
+        (["group"], ["group", "-v"], False),
+        (["group", "start"], ["group", "start", "name"], False),
+    ],
+)
+def test_is_help_request(names: List[str], args: List[str], expected: bool) -> None:
+    assert is_help_request(names, args) is expected
+
+
+def test_index_of_the_package(monkeypatch: pytest.MonkeyPatch) -> None:
+    stored = {}
+    monkeypatch.setattr(command_index, "fetch_cache", lambda name: None)
+    monkeypatch.setattr(command_index, "store_cache", stored.__setitem__)
+    index = command_index.get_index("1.0")
+    assert index["instance"]["commands"]["start"]["module"] == "pyclvm.instance.start"
+    # the next invocations read it from the cache
+    monkeypatch.setattr(command_index, "fetch_cache", lambda name: (stored[name], 0.0))
+    monkeypatch.setattr(command_index, "_index_group", None)
+    assert command_index.get_index("1.0") == index
+
+
+def test_commands_are_imported_on_first_use(package: Path) -> None:
+    import lazy_pkg.group
+
+    assert "lazy_pkg.group.start" not in sys.modules
+    assert lazy_pkg.group.start("vm") == "started vm"
+    assert "lazy_pkg.group.start" in sys.modules
+    assert "lazy_pkg.group.helpers" not in sys.modules
+    # the subgroups are packages, returned as they are
+    assert lazy_pkg.group.sub_group.__name__ == "lazy_pkg.group.sub_group"
+    with pytest.raises(AttributeError):
+        lazy_pkg.group.hidden
@@ -0,0 +1,231 @@
+"""
+Several EC2 instances are started by chunks of ids, then awaited by one poll loop
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from pyclvm.instance import _ec2_batch, _mapping
+
+
+class _Client:
+    def __init__(self, states: Dict[str, str]) -> None:
+        self.states = states
+        self.calls: List[Any] = []
+
+    def get_paginator(self, operation: str) -> "_Client":
+        assert operation == "describe_instance_status"
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.calls.append(("describe", params.get("InstanceIds")))
+        for instance_id, state in self.states.items():
+            if state == "pending":  # running at the next poll
+                self.states[instance_id] = "running"
+        yield {
+            "InstanceStatuses": [
+                {"InstanceId": instance_id, "InstanceState": {"Name": state}}
+                for instance_id, state in self.states.items()
+                if instance_id in params.get("InstanceIds", self.states)
+            ]
+        }
+
+    def start_instances(self, InstanceIds: List[str]) -> None:
+        self.calls.append(("start", InstanceIds))
+        if any(self.states[instance_id] != "stopped" for instance_id in InstanceIds):
+            raise _ec2_batch.ClientError(
+                {"Error": {"Code": "IncorrectInstanceState"}}, "StartInstances"
+            )
+        for instance_id in InstanceIds:
+            self.states[instance_id] = "pending"
+
+
+class _Inventory:
+    def __init__(self, **instance_ids: str) -> None:
+        self.instance_ids = instance_ids
+        self.discarded: List[str] = []
+        self.listed = False
+
+    def get_many(
+        self, instance_names, list_instances, fetch_instance=None
+    ) -> Dict[str, Optional[Dict]]:
+        if set(instance_names) & set(self.discarded):
+            self.listed = True
+            instances = dict(list_instances())
+            return {name: instances.get(name) for name in instance_names}
+        return {
+            name: {"instance_id": self.instance_ids.get(name, f"i-{name}")}
+            if name != "ghost"
+            else None
+            for name in instance_names
+        }
+
+    def discard(self, instance_names) -> None:
+        self.discarded.extend(instance_names)
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> _Client:
+    client = _Client(
+        {
+            "i-a": "stopped",
+            "i-b": "stopped",
+            "i-c": "stopped",
+            "i-d": "running",
+            "i-e": "stopping",
+        }
+    )
+    monkeypatch.setattr(_mapping, "_BATCH_SIZE", 2)
+    monkeypatch.setattr(_ec2_batch, "get_client", lambda service, kwargs: client)
+    monkeypatch.setattr(_ec2_batch, "get_session", lambda kwargs: None)
+    monkeypatch.setattr(_ec2_batch, "get_inventory", lambda session, **kw: _Inventory())
+    monkeypatch.setattr(_ec2_batch, "sleep", lambda seconds: None)
+    return client
+
+
+def test_instances_are_started_by_chunks(client: _Client) -> None:
+    results = _ec2_batch.process_batch("start", ("a", "b", "c", "d", "e", "ghost"))
+    assert [result[:3] for result in results] == [
+        ("a", "stopped", "running"),
+        ("b", "stopped", "running"),
+        ("c", "stopped", "running"),
+        ("d", "running", "running"),
+        ("e", "stopping", None),
+        ("ghost", None, None),
+    ]
+    assert results[4].error == "can not start an instance in stopping state"
+    assert results[5].error == "No such instance registered"
+    assert [call for call in client.calls if call[0] == "start"] == [
+        ("start", ["i-a", "i-b"]),
+        ("start", ["i-c"]),
+    ]
+    # the states of the 5 instances before, then of the 3 started ones
+    assert [call for call in client.calls if call[0] == "describe"] == [
+        ("describe", ["i-a", "i-b"]),
+        ("describe", ["i-c", "i-d"]),
+        ("describe", ["i-e"]),
+        ("describe", ["i-a", "i-b"]),
+        ("describe", ["i-c"]),
+    ]
+
+
+def test_no_wait_reads_the_states_once(client: _Client) -> None:
+    results = _ec2_batch.process_batch("start", ("a", "c"), wait="no")
+    assert [result[:3] for result in results] == [
+        ("a", "stopped", "running"),
+        ("c", "stopped", "running"),
+    ]
+    assert [call[0] for call in client.calls] == ["describe", "start", "describe"]
+
+
+def test_failed_chunk_is_retried_one_by_one(client: _Client) -> None:
+    def start_instances(InstanceIds: List[str]) -> None:
+        client.calls.append(("start", InstanceIds))
+        if "i-b" in InstanceIds:
+            raise _ec2_batch.ClientError(
+                {"Error": {"Code": "InvalidInstanceID.NotFound"}}, "StartInstances"
+            )
+        for instance_id in InstanceIds:
+            client.states[instance_id] = "pending"
+
+    client.start_instances = start_instances
+    results = _ec2_batch.process_batch("start", ("b", "c"))
+    assert [call for call in client.calls if call[0] == "start"] == [
+        ("start", ["i-b", "i-c"]),
+        ("start", ["i-b"]),
+        ("start", ["i-c"]),
+    ]
+    assert "InvalidInstanceID.NotFound" in results[0].error
+    assert results[1][:3] == ("c", "stopped", "running")
+
+
+def test_failed_call_fails_the_chunk(client: _Client) -> None:
+    def start_instances(InstanceIds: List[str]) -> None:
+        client.calls.append(("start", InstanceIds))
+        raise _ec2_batch.ClientError(
+            {"Error": {"Code": "UnauthorizedOperation"}}, "StartInstances"
+        )
+
+    client.start_instances = start_instances
+    results = _ec2_batch.process_batch("start", ("b", "c"))
+    assert [call for call in client.calls if call[0] == "start"] == [
+        ("start", ["i-b", "i-c"])
+    ]
+    assert all("UnauthorizedOperation" in result.error for result in results)
+
+
+@pytest.mark.parametrize("throttled, started", [(2, True), (4, False)])
+def test_throttled_call_is_tried_again(
+    client: _Client, throttled: int, started: bool
+) -> None:
+    start_instances = client.start_instances
+
+    def throttle(InstanceIds: List[str]) -> None:
+        nonlocal throttled
+        if throttled:
+            throttled -= 1
+            client.calls.append(("start", InstanceIds))
+            raise _ec2_batch.ClientError(
+                {"Error": {"Code": "RequestLimitExceeded"}}, "StartInstances"
+            )
+        start_instances(InstanceIds)
+
+    client.start_instances = throttle
+    results = _ec2_batch.process_batch("start", ("b", "c"))
+    calls = [call for call in client.calls if call[0] == "start"]
+    # never one by one, a throttled chunk fails as a whole
+    assert calls == [("start", ["i-b", "i-c"])] * (3 if started else 4)
+    if started:
+        assert [result[:3] for result in results] == [
+            ("b", "stopped", "running"),
+            ("c", "stopped", "running"),
+        ]
+    else:
+        assert all("RequestLimitExceeded" in result.error for result in results)
+
+
+@pytest.mark.parametrize("timeout", ["0", "20"])
+def test_instances_not_done_in_time_fail(
+    client: _Client, monkeypatch: pytest.MonkeyPatch, timeout: str
+) -> None:
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr(_ec2_batch, "perf_counter", lambda: float(next(clock)))
+    start_instances = client.start_instances
+    client.start_instances = lambda InstanceIds: start_instances(["i-b"])  # a hangs
+    results = _ec2_batch.process_batch("start", ("a", "b"), timeout=timeout)
+    assert results[0][:3] == ("a", "stopped", None)
+    assert results[0].error == f"not done in {timeout}s"
+    assert results[1][:3] == ("b", "stopped", "running")
+    assert results[1].error is None
+    # the states are read once the instances are started, at least
+    assert len([call for call in client.calls if call[0] == "describe"]) >= 2
+
+
+def test_outdated_inventory_is_listed_again(
+    client: _Client, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        _ec2_batch, "get_inventory", lambda session, **kw: _Inventory(a="i-gone")
+    )
+    monkeypatch.setattr(
+        _mapping,
+        "list_inventory",
+        lambda client: iter(
+            [("a", {"instance_id": "i-a"}), ("b", {"instance_id": "i-b"})]
+        ),
+    )
+    results = _ec2_batch.process_batch("start", ("a", "b"), wait="no")
+    assert [result[:3] for result in results] == [
+        ("a", "stopped", "running"),
+        ("b", "stopped", "running"),
+    ]
+    assert [call for call in client.calls if call[0] == "start"] == [
+        ("start", ["i-a", "i-b"])
+    ]
+
+
+def test_invalid_timeout_starts_nothing(client: _Client) -> None:
+    with pytest.raises(SystemExit):
+        _ec2_batch.process_batch("start", ("a", "b"), timeout="10m")
+    assert client.calls == []
@@ -0,0 +1,88 @@
+"""
+states=, names= and selector= select the instances on every platform
+"""
+
+from types import SimpleNamespace
+from typing import Dict, Iterator
+
+import pytest
+
+from pyclvm._common.filters import get_filters
+from pyclvm._common.session_azure import AzureSession
+from pyclvm.instance._mapping import build_filters
+
+
+def test_filters_are_parsed() -> None:
+    filters = get_filters({"states": "running", "selector": "team=ml, env=dev"})
+    assert filters.states == ["running"]
+    assert filters.names == []
+    assert filters.labels == {"team": "ml", "env": "dev"}
+    assert not filters.empty
+    assert get_filters({"profile": "dev"}).empty
+
+
+def test_selector_expects_pairs() -> None:
+    with pytest.raises(SystemExit):
+        get_filters({"selector": "team"})
+
+
+def test_filters_match() -> None:
+    filters = get_filters(
+        {"states": "Running", "names": "web-*,db", "selector": "team=ml"}
+    )
+    assert filters.matches("web-1", "running", {"team": "ml", "env": "dev"})
+    assert not filters.matches("web-1", "stopped", {"team": "ml"})
+    assert not filters.matches("cache", "running", {"team": "ml"})
+    assert not filters.matches("db", "running", {})
+
+
+def test_selector_becomes_ec2_tag_filters() -> None:
+    assert build_filters({"states": "running", "selector": "team=ml"}) == {
+        "Filters": [
+            {"Name": "instance-state-name", "Values": ["running"]},
+            {"Name": "tag:team", "Values": ["ml"]},
+        ]
+    }
+
+
+def _make_vm(name: str, power_state: str, tags: Dict[str, str]) -> Dict:
+    return {
+        "id": f"/subscriptions/s/resourceGroups/group/vm/{name}",
+        "name": name,
+        "location": "westeurope",
+        "tags": tags,
+        "properties": {
+            "vmId": name,
+            "instanceView": {
+                "statuses": [
+                    {"code": "ProvisioningState/succeeded"},
+                    {
+                        "code": f"PowerState/{power_state}",
+                        "displayStatus": f"VM {power_state}",
+                    },
+                ]
+            },
+        },
+    }
+
+
+def test_azure_instances_are_filtered_on_the_way() -> None:
+    vms = [
+        _make_vm("web-1", "running", {"team": "ml"}),
+        _make_vm("web-2", "deallocated", {"team": "ml"}),
+        _make_vm("web-3", "running", {}),
+    ]
+
+    def iter_vm_instances(_filter: Dict) -> Iterator[Dict]:
+        assert _filter == {"statusOnly": "true"}
+        return iter(vms)
+
+    session = object.__new__(AzureSession)
+    session._instances = None
+    session._get_rest_api = lambda: SimpleNamespace(iter_vm_instances=iter_vm_instances)
+    filters = get_filters({"states": "running", "selector": "team=ml"})
+    assert [
+        (name, entry["state"])
+        for name, entry in session.iter_matching_instances(filters)
+    ] == [("web-1", "VM running")]
+    assert session._instances is None  # not a complete listing
@@ -0,0 +1,136 @@
+"""
+Several GCP instances are started at once, then their operations awaited together
+"""
+
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytest
+
+from pyclvm._common import gcp_instance_proxy
+from pyclvm.instance import _gcp_batch
+
+
+class _Operation:
+    def __init__(
+        self, calls: List[str], name: str, polls: int, error: str = ""
+    ) -> None:
+        self.calls = calls
+        self.name = name
+        self.polls = polls
+        self.error_code = 409 if error else 0
+        self.error_message = error
+        self.warnings = []
+
+    def done(self) -> bool:
+        self.calls.append(f"done {self.name}")
+        self.polls -= 1
+        return self.polls <= 0
+
+
+class _Session:
+    project_id = "project"
+
+    def __init__(self, states: Dict[str, str], polls: Dict[str, int]) -> None:
+        self.states = states
+        self.polls = polls
+        self.calls: List[str] = []
+
+    def find_instances(self, instance_names) -> Dict[str, Optional[Dict[str, str]]]:
+        return {
+            name: {"instance_id": f"id-{name}", "zone": "europe-west2-b"}
+            if name in self.states
+            else None
+            for name in instance_names
+        }
+
+    def list_states(self) -> Dict[str, str]:
+        self.calls.append("list_states")
+        return {f"id-{name}": state for name, state in self.states.items()}
+
+    def get_client(self) -> SimpleNamespace:
+        return SimpleNamespace(start=self.start)
+
+    def start(self, project: str, zone: str, instance: str) -> _Operation:
+        self.calls.append(f"start {instance}")
+        if instance == "broken":
+            raise RuntimeError("quota exceeded")
+        self.states[instance] = "RUNNING"
+        return _Operation(
+            self.calls,
+            instance,
+            self.polls.get(instance, 1),
+            "not enough resources" if instance == "failed" else "",
+        )
+
+
+@pytest.fixture
+def session(monkeypatch: pytest.MonkeyPatch) -> _Session:
+    session = _Session(
+        {
+            "a": "TERMINATED",
+            "b": "TERMINATED",
+            "c": "RUNNING",
+            "d": "SUSPENDED",
+            "failed": "TERMINATED",
+            "broken": "TERMINATED",
+        },
+        {"a": 3, "b": 1},
+    )
+    monkeypatch.setattr(_gcp_batch, "get_session", lambda **kwargs: session)
+    monkeypatch.setattr(gcp_instance_proxy, "sleep", lambda seconds: None)
+    return session
+
+
+def test_operations_are_awaited_together(session: _Session) -> None:
+    results = _gcp_batch.process_batch(
+        "start", ("a", "b", "c", "d", "failed", "broken", "ghost")
+    )
+    assert [result[:3] for result in results] == [
+        ("a", "TERMINATED", "RUNNING"),
+        ("b", "TERMINATED", "RUNNING"),
+        ("c", "RUNNING", "RUNNING"),
+        ("d", "SUSPENDED", None),
+        ("failed", "TERMINATED", None),
+        ("broken", "TERMINATED", None),
+        ("ghost", None, None),
+    ]
+    assert [result.error for result in results] == [
+        None,
+        None,
+        None,
+        "can not start an instance in SUSPENDED state",
+        "[Code: 409]: not enough resources",
+        "RuntimeError: quota exceeded",
+        "No such instance registered",
+    ]
+    # every request is sent before the first poll, the states are read twice
+    calls = [call.split()[0] for call in session.calls]
+    assert calls.index("done") == 1 + 4
+    assert calls.count("done") == 3 + 1 + 1
+    assert calls.count("list_states") == 2
+
+
+def test_deadline_is_shared(session: _Session) -> None:
+    session.polls["a"] = session.polls["b"] = 10
+    results = _gcp_batch.process_batch("start", ("a", "b"), timeout="0")
+    assert [result.error for result in results] == ["not done in 0s"] * 2
+    assert [call for call in session.calls if call.startswith("done")] == [
+        "done a",
+        "done b",
+    ]
+
+
+def test_no_wait_sends_the_requests_only(session: _Session) -> None:
+    results = _gcp_batch.process_batch("start", ("a", "b"), wait="no")
+    assert [result[:3] for result in results] == [
+        ("a", "TERMINATED", "RUNNING"),
+        ("b", "TERMINATED", "RUNNING"),
+    ]
+    assert not [call for call in session.calls if call.startswith("done")]
+
+
+def test_invalid_timeout_starts_nothing(session: _Session) -> None:
+    with pytest.raises(SystemExit):
+        _gcp_batch.process_batch("start", ("a", "b"), timeout="-1")
+    assert session.calls == []
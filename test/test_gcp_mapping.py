@@ -0,0 +1,69 @@
+"""
+GCP proxies of listed instances are built from the listing, not fetched one by one
+"""
+
+from types import SimpleNamespace
+from typing import List
+
+from pyclvm._common.gcp_instance_mapping import GcpRemoteShellMapping
+
+_ZONE = "https://www.googleapis.com/compute/v1/projects/project/zones/europe-west2-a"
+
+
+class _Client:
+    def __init__(self) -> None:
+        self.fetched: List[str] = []
+
+    def get(self, project: str, zone: str, instance: str) -> SimpleNamespace:
+        self.fetched.append(f"{project} {zone} {instance}")
+        return SimpleNamespace(name=instance, id=1, status="TERMINATED", zone=zone)
+
+    def start(self, project: str, zone: str, instance: str) -> None:
+        return None
+
+
+class _Session:
+    project_id = "project"
+    zone = "us-central1-a"
+
+    def __init__(self) -> None:
+        self.client = _Client()
+        self.instances = [
+            SimpleNamespace(name=f"vm-{index}", id=index, status="RUNNING", zone=_ZONE)
+            for index in range(300)
+        ]
+
+    def get_client(self) -> _Client:
+        return self.client
+
+    def find_instance(self, instance_name: str) -> dict:
+        return {"zone": "europe-west2-b"}
+
+
+def _make_mapping(session: _Session) -> GcpRemoteShellMapping:
+    mapping = object.__new__(GcpRemoteShellMapping)
+    mapping._session = session
+    mapping._kwargs = {}
+    return mapping
+
+
+def test_iteration_does_not_fetch_the_instances() -> None:
+    session = _Session()
+    mapping = _make_mapping(session)
+    assert len(mapping) == 300
+    assert list(mapping.keys())[:2] == ["vm-0", "vm-1"]
+    assert {instance.state for instance in mapping.values()} == {"RUNNING"}
+    assert {instance.zone for _, instance in mapping.items()} == {"europe-west2-a"}
+    assert session.client.fetched == []
+
+
+def test_named_instance_is_fetched_on_demand() -> None:
+    session = _Session()
+    instance = _make_mapping(session)["vm-7"]
+    assert session.client.fetched == []
+    assert instance.state == "TERMINATED"
+    assert instance.state == "TERMINATED"
+    assert session.client.fetched == ["project europe-west2-b vm-7"]
+    instance.start(wait=False)
+    assert instance.state == "TERMINATED"
+    assert len(session.client.fetched) == 2
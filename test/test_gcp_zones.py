@@ -0,0 +1,163 @@
+"""
+GCP instances are listed for all the zones, or concurrently for the zones of `zones=`
+"""
+
+from threading import Barrier
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pytest
+
+from pyclvm._common import gcp_instance_mapping, inventory
+from pyclvm._common.filters import get_filters
+from pyclvm._common.inventory import Inventory
+from pyclvm._common.session_gcp import GcpSession, _get_zones
+
+_ZONES: Dict[str, List[str]] = {
+    "europe-west2-a": ["alpha"],
+    "europe-west2-b": [],
+    "us-central1-a": ["beta", "gamma"],
+}
+
+
+def _make_instance(zone: str, name: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        name=name, id=len(name), status="RUNNING", zone=zone, tags=None
+    )
+
+
+class _Client:
+    def __init__(self, barrier: Optional[Barrier] = None) -> None:
+        self.barrier = barrier
+        self.calls: List[str] = []
+
+    def aggregated_list(
+        self, request, metadata: Sequence[Tuple[str, str]] = ()
+    ) -> Iterator[Tuple[str, SimpleNamespace]]:
+        self.calls.append(f"aggregated_list {request.project} {request.filter}")
+        self.metadata = list(metadata)
+        for zone, names in _ZONES.items():
+            yield f"zones/{zone}", SimpleNamespace(
+                instances=[
+                    _make_instance(zone, name)
+                    for name in names
+                    if not request.filter or request.filter == f'name = "{name}"'
+                ]
+            )
+
+    def list(
+        self, request, metadata: Sequence[Tuple[str, str]] = ()
+    ) -> Iterator[SimpleNamespace]:
+        self.metadata = list(metadata)
+        self.calls.append(
+            f"list {request.project} {request.zone} {request.filter}".rstrip()
+        )
+        if self.barrier:
+            self.barrier.wait(timeout=5)  # all the zones are listed at once
+        return iter(
+            [_make_instance(request.zone, name) for name in _ZONES[request.zone]]
+        )
+
+
+@pytest.fixture(autouse=True)
+def _cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(inventory, "fetch_cache", lambda name: None)
+    monkeypatch.setattr(inventory, "store_cache", lambda name, data: None)
+
+
+def _make_session(client: _Client, **kwargs: str) -> GcpSession:
+    session = object.__new__(GcpSession)
+    session.project_id = "project"
+    session._client = client
+    session._zones = _get_zones(kwargs)
+    session._zone = None
+    session._instances = None
+    session._inventory = Inventory("GCP", "project", **kwargs)
+    return session
+
+
+def test_all_zones_are_listed_at_once() -> None:
+    client = _Client()
+    session = _make_session(client)
+    assert [instance.name for instance in session.instances] == [
+        "alpha",
+        "beta",
+        "gamma",
+    ]
+    assert session.find_instance("gamma")["zone"] == "us-central1-a"
+    assert client.calls == ["aggregated_list project "]
+
+
+def test_listing_is_streamed_page_by_page(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _Client()
+    session = _make_session(client)
+    monkeypatch.setattr(gcp_instance_mapping, "get_session", lambda **kwargs: session)
+    instances = iter(gcp_instance_mapping.GcpComputeAllInstancesData())
+    assert client.calls == []  # nothing is listed up front
+    assert next(instances)[1:] == ("alpha", "RUNNING")
+    assert session._instances is None  # the first page only
+    assert [row[1] for row in instances] == ["beta", "gamma"]
+    # a complete listing, indexed on the way
+    assert session.find_instance("gamma")["zone"] == "us-central1-a"
+    assert [instance.name for instance in session.iter_instances()] == [
+        "alpha",
+        "beta",
+        "gamma",
+    ]
+    assert client.calls == ["aggregated_list project "]
+
+
+def test_selected_zones_are_listed_concurrently() -> None:
+    client = _Client(Barrier(2))
+    session = _make_session(client, zones="us-central1-a,europe-west2-a")
+    assert len(session.instances) == 3
+    assert session.find_instance("alpha")["zone"] == "europe-west2-a"
+    assert session.find_instance("beta")["zone"] == "us-central1-a"
+    assert sorted(client.calls) == [
+        "list project europe-west2-a",
+        "list project us-central1-a",
+    ]
+
+
+def test_named_instance_is_fetched_with_a_filter() -> None:
+    client = _Client()
+    session = _make_session(client)
+    assert session.find_instance("beta") == {
+        "instance_id": "4",
+        "zone": "us-central1-a",
+        "state": "RUNNING",
+    }
+    assert session.find_instance("delta") is None
+    assert client.calls == [
+        'aggregated_list project name = "beta"',
+        'aggregated_list project name = "delta"',
+    ]
+    assert session._instances is None
+
+
+def test_filters_are_sent_to_the_service() -> None:
+    client = _Client()
+    session = _make_session(client, zones="us-central1-a")
+    filters = get_filters(
+        {"states": "running,stopping", "names": "web-*,db", "selector": "team=ml"}
+    )
+    assert [instance.name for instance in session.iter_instances(filters)] == [
+        "beta",
+        "gamma",
+    ]
+    assert client.calls == [
+        "list project us-central1-a "
+        '(status eq "(RUNNING|STOPPING)") (name eq "(web-.*|db)") '
+        '(labels.team eq "ml")'
+    ]
+    assert session._instances is None  # not a complete listing
+
+
+def test_states_are_read_with_a_field_mask() -> None:
+    client = _Client()
+    session = _make_session(client)
+    assert session.list_states() == {"5": "RUNNING", "4": "RUNNING"}
+    assert client.metadata == [
+        ("x-goog-fieldmask", "nextPageToken,items/*/instances(id,status)")
+    ]
+    assert session._instances is None
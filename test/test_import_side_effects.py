@@ -0,0 +1,89 @@
+"""
+Importing pyclvm command modules must not construct cloud clients nor touch the filesystem
+"""
+
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+# executed in a fresh interpreter, so that nothing is imported yet
+_PROBE = """
+import importlib
+import json
+import pkgutil
+import sys
+import sysconfig
+
+import botocore.session
+
+violations = []
+skipped = []
+importing = [True]
+stdlib = sysconfig.get_paths()["stdlib"]
+site_packages = (sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"])
+
+
+def _is_stdlib(file_name):
+    return file_name.startswith((stdlib, "<frozen")) and not file_name.startswith(
+        site_packages
+    )
+
+
+def _caused_by_pyclvm():
+    # the first frame outside of the standard library is responsible for the event,
+    # third party packages doing I/O while imported are out of our control
+    frame = sys._getframe(2)
+    while frame and _is_stdlib(frame.f_code.co_filename):
+        frame = frame.f_back
+    return frame is not None and "pyclvm" in frame.f_code.co_filename
+
+
+def _is_side_effect(event, args):
+    if event == "open":
+        return isinstance(args[1], str) and bool(set(args[1]) & set("wax+"))
+    return event in {"os.mkdir", "os.remove", "os.rename", "socket.connect", "subprocess.Popen"}
+
+
+def _audit(event, args):
+    if importing[0] and _is_side_effect(event, args) and _caused_by_pyclvm():
+        violations.append(f"{event} {args[0]}")
+
+
+def _create_client(*args, **kwargs):
+    violations.append(f"client {args[1] if len(args) > 1 else kwargs}")
+    raise RuntimeError("client constructed at import time")
+
+
+botocore.session.Session.create_client = _create_client
+sys.addaudithook(_audit)
+
+import pyclvm
+
+for module in pkgutil.walk_packages(pyclvm.__path__, "pyclvm."):
+    if module.name.startswith(%(excluded)r):
+        continue
+    try:
+        importlib.import_module(module.name)
+    except ImportError as err:  # optional dependencies, e.g. Qt components
+        skipped.append(f"{module.name}: {err}")
+
+importing[0] = False
+print(json.dumps({"violations": violations, "skipped": skipped}))
+"""
+
+_EXCLUDED = ("pyclvm.jupyterlab", "pyclvm.web", "pyclvm.rdp")
+
+
+def _probe() -> Dict[str, List[str]]:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE % {"excluded": _EXCLUDED}],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_import_has_no_side_effects() -> None:
+    assert _probe()["violations"] == []
@@ -0,0 +1,132 @@
+"""
+`instance ls platform=all` lists the platforms concurrently, in one table
+"""
+
+import importlib
+import sys
+from time import perf_counter, sleep
+from types import SimpleNamespace
+from typing import Iterator, Tuple
+
+import pytest
+
+# the package exposes the commands, not the modules
+ls_module = importlib.import_module("pyclvm.instance.ls")
+
+_DELAY = 0.5
+
+
+def _make_provider(cloud_platform: str, state: str) -> SimpleNamespace:
+    def _list_instances(**kwargs: str) -> Tuple[str, Iterator]:
+        sleep(_DELAY)
+        return f"{cloud_platform} Instances", iter(
+            [(f"{cloud_platform.lower()}-1", f"{cloud_platform.lower()}-vm", state)]
+        )
+
+    return SimpleNamespace(list_instances=_list_instances)
+
+
+def _fail(**kwargs: str) -> None:
+    print("\n------\nSpecify project name")
+    sys.exit(-1)
+
+
+_PROVIDERS = {
+    "AWS": _make_provider("AWS", "running"),
+    "GCP": SimpleNamespace(list_instances=_fail),
+    "AZURE": _make_provider("AZURE", "VM deallocated"),
+}
+
+
+@pytest.fixture(autouse=True)
+def _providers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("COLUMNS", "200")
+    monkeypatch.setattr(ls_module, "get_provider", _PROVIDERS.__getitem__)
+
+
+def test_platforms_are_listed_concurrently(capsys: pytest.CaptureFixture) -> None:
+    started = perf_counter()
+    ls_module.ls(platform="all")
+    assert perf_counter() - started < 2 * _DELAY
+    output = capsys.readouterr().out
+    assert "AWS Instances, AZURE Instances" in output
+    assert "aws-vm" in output and "azure-vm" in output
+    assert "[ERROR] SystemExit: -1" in output
+
+
+def test_platform_list_keeps_the_platform_order() -> None:
+    assert ls_module._get_platforms("azure, aws") == ["AWS", "AZURE"]
+    assert ls_module._get_platforms("gcp") == ["GCP"]
+    assert ls_module._get_platforms("") == []
+
+
+def test_extra_columns_come_with_the_rows(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    rows = [
+        ("i-1", "vm-1", "running", {"Profile": "dev", "Region": "eu-west-1"}),
+        ("i-2", "vm-2", "stopped", {"Profile": "prod", "Region": "us-east-1"}),
+    ]
+    provider = SimpleNamespace(list_instances=lambda **kwargs: ("EC2", iter(rows)))
+    monkeypatch.setattr(ls_module, "get_provider", lambda cloud_platform: provider)
+    ls_module._ls("AWS")
+    output = capsys.readouterr().out
+    assert "Profile" in output and "Region" in output
+    assert "prod" in output and "us-east-1" in output
+
+
+def test_watch_refreshes_the_states(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    states = iter([{"i-1": "running", "i-2": "stopped"}])
+    provider = SimpleNamespace(
+        list_instances=lambda **kwargs: (
+            "EC2",
+            iter([("i-1", "vm-1", "pending"), ("i-2", "vm-2", "stopped")]),
+        ),
+        watch_states=lambda **kwargs: lambda: next(states),
+    )
+    monkeypatch.setattr(ls_module, "get_provider", lambda cloud_platform: provider)
+    sleeps = []
+
+    def _sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        if len(sleeps) > 1:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(ls_module, "sleep", _sleep)
+    ls_module._watch("AWS", watch="2.5")
+    output = capsys.readouterr().out
+    assert "pending -> running" in output
+    assert "stopped ->" not in output
+    assert sleeps == [2.5, 2.5]
+
+
+@pytest.mark.parametrize("watch", ["soon", "0", "-1", "nan", "inf"])
+def test_watch_expects_seconds(capsys: pytest.CaptureFixture, watch: str) -> None:
+    with pytest.raises(SystemExit):
+        ls_module._watch("AWS", watch=watch)
+    assert f"[ERROR] watch={watch}: the period is a number of seconds" in (
+        capsys.readouterr().out
+    )
+
+
+def test_unknown_states_are_shown(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    providers = {
+        "AWS": _make_provider("AWS", "hibernated"),
+        "GCP": _make_provider("GCP", "UNKNOWN"),
+    }
+    monkeypatch.setattr(ls_module, "get_provider", providers.__getitem__)
+    ls_module._ls("AWS")
+    ls_module.ls(platform="aws,gcp")
+    output = capsys.readouterr().out
+    assert output.count("hibernated") == 2
+    assert "UNKNOWN" in output
+
+
+def test_watch_of_several_platforms(capsys: pytest.CaptureFixture) -> None:
+    with pytest.raises(SystemExit):
+        ls_module.ls(platform="all", watch="5")
+    assert "[ERROR] watch=" in capsys.readouterr().out
@@ -0,0 +1,254 @@
+"""
+EC2 instances are streamed page by page, straight from the describe_instances response
+"""
+
+from datetime import datetime
+from time import time
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from botocore.exceptions import ClientError
+
+from pyclvm._common import inventory
+from pyclvm.instance._mapping import (
+    InstanceMapping,
+    iter_instances,
+    list_inventory,
+    list_states,
+    resolve_instances,
+)
+
+
+def _make_instance(index: int, state: str = "running") -> Dict[str, Any]:
+    return {
+        "InstanceId": f"i-{index}",
+        "State": {"Name": state},
+        "InstanceType": "t3.micro",
+        "Placement": {"AvailabilityZone": "eu-west-1a"},
+        "LaunchTime": datetime(2022, 1, 1),
+        "Tags": [{"Key": "Name", "Value": f"vm-{index}"}] if index else [],
+    }
+
+
+class _Client:
+    def __init__(self, pages: int) -> None:
+        self.pages = pages
+        self.params: List[Dict] = []
+        self.fetched = 0
+
+    def get_paginator(self, operation: str) -> "_Client":
+        assert operation == "describe_instances"
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.params.append(params)
+        for page in range(self.pages):
+            self.fetched += 1
+            yield {
+                "Reservations": [
+                    {
+                        "Instances": [
+                            _make_instance(page * 2),
+                            _make_instance(page * 2 + 1),
+                        ]
+                    }
+                ]
+            }
+
+
+def test_pages_are_fetched_on_demand() -> None:
+    client = _Client(pages=3)
+    instances = iter_instances(client)
+    assert next(instances).id == "i-0"
+    assert next(instances).name == "vm-1"
+    assert client.fetched == 1
+    assert [instance.id for instance in instances] == ["i-2", "i-3", "i-4", "i-5"]
+    assert client.params == [{"PaginationConfig": {"PageSize": 1000}}]
+
+
+def test_instance_ids_are_not_paged() -> None:
+    client = _Client(pages=1)
+    instance = next(iter_instances(client, InstanceIds=["i-1"]))
+    assert instance.zone == "eu-west-1a"
+    assert client.params == [{"InstanceIds": ["i-1"]}]
+
+
+def test_inventory_skips_unnamed_instances() -> None:
+    assert dict(list_inventory(_Client(pages=1))) == {
+        "vm-1": {"instance_id": "i-1", "state": "running"}
+    }
+
+
+class _StatusClient(_Client):
+    def get_paginator(self, operation: str) -> "_Client":
+        assert operation == "describe_instance_status"
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.params.append(params)
+        yield {
+            "InstanceStatuses": [
+                {"InstanceId": "i-1", "InstanceState": {"Name": "pending"}},
+                {"InstanceId": "i-2", "InstanceState": {"Name": "running"}},
+            ]
+        }
+
+
+def test_states_are_read_from_the_instance_status() -> None:
+    client = _StatusClient(pages=1)
+    assert list_states(client) == {"i-1": "pending", "i-2": "running"}
+    assert client.params == [
+        {"IncludeAllInstances": True, "PaginationConfig": {"PageSize": 1000}}
+    ]
+
+
+class _DescribeClient:
+    def __init__(self, *indexes: int) -> None:
+        self.instances = {f"i-{index}": _make_instance(index) for index in indexes}
+        self.params: List[Dict] = []
+
+    def get_paginator(self, operation: str) -> "_DescribeClient":
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.params.append(params)
+        instance_ids = params.get("InstanceIds", self.instances)
+        if any(instance_id not in self.instances for instance_id in instance_ids):
+            raise ClientError(
+                {"Error": {"Code": "InvalidInstanceID.NotFound"}}, "DescribeInstances"
+            )
+        yield {
+            "Reservations": [
+                {"Instances": [self.instances[instance_id]]}
+                for instance_id in instance_ids
+            ]
+        }
+
+
+def _make_mapping(
+    client: _DescribeClient, monkeypatch: pytest.MonkeyPatch, cached: Dict
+) -> InstanceMapping:
+    monkeypatch.setattr(inventory, "fetch_cache", lambda name: (cached, time()))
+    monkeypatch.setattr(inventory, "store_cache", lambda name, data: None)
+    mapping = object.__new__(InstanceMapping)
+    mapping._client = client
+    mapping._filters = {}
+    mapping._inventory = inventory.Inventory("AWS", "default:eu-west-1")
+    return mapping
+
+
+def test_outdated_instance_id_is_listed_again(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client = _DescribeClient(1, 2)
+    mapping = _make_mapping(client, monkeypatch, {"vm-1": {"instance_id": "i-9"}})
+    assert mapping["vm-1"].id == "i-1"
+    assert [params.get("InstanceIds") for params in client.params] == [
+        ["i-9"],
+        None,
+        ["i-1"],
+    ]
+    # once listed, the inventory is current
+    client.instances.pop("i-2")
+    with pytest.raises(KeyError):
+        mapping["vm-2"]
+    assert len(client.params) == 4
+
+
+class _ResolveClient:
+    def __init__(self, **states: str) -> None:
+        self.states = states  # by id, i-<n> is named vm-<n>
+        self.calls: List[Any] = []
+
+    def get_paginator(self, operation: str) -> "_ResolveClient":
+        self.operation = operation
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.calls.append((self.operation, params.get("InstanceIds")))
+        if self.operation == "describe_instance_status":
+            if any(i not in self.states for i in params.get("InstanceIds", ())):
+                raise ClientError(
+                    {"Error": {"Code": "InvalidInstanceID.NotFound"}},
+                    "DescribeInstanceStatus",
+                )
+            yield {
+                "InstanceStatuses": [
+                    {"InstanceId": instance_id, "InstanceState": {"Name": state}}
+                    for instance_id, state in self.states.items()
+                    if instance_id in params["InstanceIds"]
+                ]
+            }
+            return
+        filters = {item["Name"]: item["Values"] for item in params["Filters"]}
+        yield {
+            "Reservations": [
+                {"Instances": [_make_instance(int(instance_id[2:]), state)]}
+                for instance_id, state in self.states.items()
+                if instance_id in filters.get("instance-id", [instance_id])
+                and f"vm-{instance_id[2:]}"
+                in filters.get("tag:Name", [f"vm-{instance_id[2:]}"])
+                and state in filters.get("instance-state-name", [state])
+            ]
+        }
+
+
+def _make_inventory(monkeypatch: pytest.MonkeyPatch, cached: Dict) -> Any:
+    cache = {"inventory:AWS:default:eu-west-1": (cached, time())}
+    monkeypatch.setattr(inventory, "fetch_cache", cache.get)
+    monkeypatch.setattr(inventory, "store_cache", lambda name, data: None)
+    monkeypatch.setattr(inventory, "remove_cache", lambda name: cache.pop(name, None))
+    return inventory.Inventory("AWS", "default:eu-west-1")
+
+
+@pytest.mark.parametrize(
+    "states",
+    [{"i-1": "stopped"}, {"i-9": "terminated", "i-1": "stopped"}],
+    ids=["gone", "terminated"],
+)
+def test_outdated_id_is_fetched_again_by_name(
+    monkeypatch: pytest.MonkeyPatch, states: Dict[str, str]
+) -> None:
+    client = _ResolveClient(**states)
+    entries, states = resolve_instances(
+        client,
+        _make_inventory(monkeypatch, {"vm-1": {"instance_id": "i-9"}}),
+        ("vm-1",),
+    )
+    assert entries == {"vm-1": {"instance_id": "i-1", "state": "stopped"}}
+    assert states["i-1"] == "stopped"
+    # a single name is fetched by its Name tag, not by listing the instances
+    assert ("describe_instances", None) in client.calls
+    assert client.calls[-1] == ("describe_instance_status", ["i-1"])
+
+
+def test_current_id_is_checked_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _ResolveClient(**{"i-1": "running"})
+    entries, states = resolve_instances(
+        client,
+        _make_inventory(monkeypatch, {"vm-1": {"instance_id": "i-1"}}),
+        ("vm-1",),
+    )
+    assert entries["vm-1"]["instance_id"] == "i-1"
+    assert client.calls == [("describe_instance_status", ["i-1"])]
+
+
+def test_remote_shell_mapping_checks_the_id(monkeypatch: pytest.MonkeyPatch) -> None:
+    from pyclvm._common.provider_aws import _Ec2RemoteShellMapping
+
+    logins: List[Dict] = []
+    mapping = object.__new__(_Ec2RemoteShellMapping)
+    mapping._client = _ResolveClient(**{"i-1": "stopped"})
+    mapping._inventory = _make_inventory(monkeypatch, {"vm-1": {"instance_id": "i-9"}})
+    mapping._reauth = lambda **kwargs: logins.append(kwargs)
+    # a gone id is no credentials issue
+    assert mapping._get_instance_id("vm-1") == "i-1"
+    assert logins == []
+
+    def paginate(**params: Any) -> Iterator[Dict]:
+        raise ClientError({"Error": {"Code": "ExpiredToken"}}, "DescribeInstanceStatus")
+
+    mapping._client.paginate = paginate
+    with pytest.raises(ClientError):
+        mapping._get_instance_id("vm-1")
+    assert logins == [{}]
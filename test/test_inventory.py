@@ -0,0 +1,194 @@
+"""
+Name lookups are served by the local inventory, the instances are listed only when needed
+"""
+
+from time import time
+from typing import Dict, Iterator, List, Tuple
+
+import pytest
+
+from pyclvm._common import inventory
+from pyclvm._common.inventory import Inventory
+
+
+class _Lister:
+    def __init__(self, *names: str) -> None:
+        self.names = names
+        self.calls = 0
+
+    def __call__(self) -> Iterator[Tuple[str, Dict[str, str]]]:
+        self.calls += 1
+        for index, name in enumerate(self.names):
+            yield name, {"instance_id": f"i-{index}", "state": "running"}
+
+
+@pytest.fixture(autouse=True)
+def _cache(monkeypatch: pytest.MonkeyPatch) -> Dict[str, List]:
+    cache: Dict[str, List] = {}
+    monkeypatch.setattr(inventory, "fetch_cache", cache.get)
+    monkeypatch.setattr(
+        inventory,
+        "store_cache",
+        lambda name, data: cache.update({name: [data, time()]}),
+    )
+    return cache
+
+
+def test_lookup_is_served_from_the_inventory() -> None:
+    lister = _Lister("alpha", "beta")
+    assert Inventory("AWS", "default:eu-west-1").get("beta", lister) == {
+        "instance_id": "i-1",
+        "state": "running",
+    }
+    assert (
+        Inventory("AWS", "default:eu-west-1").get("alpha", lister)["instance_id"]
+        == "i-0"
+    )
+    assert lister.calls == 1
+
+
+def test_inventories_are_kept_per_scope() -> None:
+    lister = _Lister("alpha")
+    Inventory("AWS", "default:eu-west-1").get("alpha", lister)
+    Inventory("AWS", "default:us-east-1").get("alpha", lister)
+    assert lister.calls == 2
+
+
+def test_refresh_lists_the_instances() -> None:
+    lister = _Lister("alpha")
+    Inventory("GCP", "project").get("alpha", lister)
+    Inventory("GCP", "project", refresh="yes").get("alpha", lister)
+    assert lister.calls == 2
+
+
+def test_outdated_inventory_is_listed_again(_cache: Dict[str, List]) -> None:
+    lister = _Lister("alpha")
+    Inventory("AZURE", "subscription").get("alpha", lister)
+    _cache["inventory:AZURE:subscription"][1] -= 60
+    Inventory("AZURE", "subscription", ttl="120").get("alpha", lister)
+    assert lister.calls == 1
+    Inventory("AZURE", "subscription", ttl="30").get("alpha", lister)
+    assert lister.calls == 2
+
+
+def test_unknown_name_is_listed_once() -> None:
+    lister = _Lister("alpha")
+    Inventory("AWS", "default:eu-west-1").get("alpha", lister)
+    instances = Inventory("AWS", "default:eu-west-1")
+    assert instances.get("gamma", lister) is None
+    assert instances.get("gamma", lister) is None
+    assert lister.calls == 2
+
+
+def test_first_instance_of_a_name_wins() -> None:
+    lister = _Lister("alpha", "alpha")
+    assert (
+        Inventory("AWS", "default:eu-west-1").get("alpha", lister)["instance_id"]
+        == "i-0"
+    )
+
+
+def test_single_instance_is_fetched_instead_of_listing() -> None:
+    lister = _Lister("alpha")
+    fetched: List[str] = []
+
+    def _fetch(instance_name: str) -> Dict[str, str]:
+        fetched.append(instance_name)
+        return {"instance_id": "i-9", "state": "running"}
+
+    assert Inventory("AZURE", "subscription").get("alpha", lister, _fetch) == {
+        "instance_id": "i-9",
+        "state": "running",
+    }
+    Inventory("AZURE", "subscription").get("alpha", lister, _fetch)
+    Inventory("AZURE", "subscription", refresh="yes").get("alpha", lister, _fetch)
+    assert fetched == ["alpha", "alpha"]
+    assert lister.calls == 0
+
+
+def test_unknown_instance_is_not_fetched_again_from_listing() -> None:
+    lister = _Lister("alpha")
+    instances = Inventory("AZURE", "subscription")
+    instances.get("alpha", lister)
+    assert instances.get("gamma", lister, lambda name: None) is None
+    assert lister.calls == 1
+
+
+def test_discarded_name_is_resolved_again(
+    _cache: Dict[str, List], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(inventory, "remove_cache", lambda name: _cache.pop(name, None))
+    lister = _Lister("alpha", "beta")
+    Inventory("AWS", "default:eu-west-1").get("alpha", lister)
+    instances = Inventory("AWS", "default:eu-west-1")
+    assert instances.get("beta", lister)["instance_id"] == "i-1"
+    instances.discard(["beta"])
+    assert "inventory:AWS:default:eu-west-1" not in _cache
+    assert instances.get("alpha", lister)["instance_id"] == "i-0"
+    assert instances.get("beta", lister)["instance_id"] == "i-1"
+    assert lister.calls == 2
+
+
+def test_several_names_are_resolved_by_one_listing() -> None:
+    lister = _Lister("alpha", "beta", "gamma")
+    fetched: List[str] = []
+
+    def fetch(name: str) -> Dict[str, str]:
+        fetched.append(name)
+        return {"instance_id": f"i-{name}", "state": "running"}
+
+    entries = Inventory("GCP", "project").get_many(
+        ["alpha", "gamma", "delta"], lister, fetch
+    )
+    assert [entry and entry["instance_id"] for entry in entries.values()] == [
+        "i-0",
+        "i-2",
+        None,
+    ]
+    assert (lister.calls, fetched) == (1, [])
+
+    # a single missing name is fetched
+    lister = _Lister("alpha")
+    entries = Inventory("AZURE", "subscription").get_many(["beta"], lister, fetch)
+    assert entries == {"beta": {"instance_id": "i-beta", "state": "running"}}
+    assert (lister.calls, fetched) == (0, ["beta"])
+
+
+@pytest.mark.parametrize(
+    "kwargs, ttl", [({}, 600.0), ({"ttl": "30"}, 30.0), ({"ttl": "0"}, 0.0)]
+)
+def test_ttl(kwargs: Dict[str, str], ttl: float) -> None:
+    assert inventory._get_ttl(kwargs) == ttl
+
+
+@pytest.mark.parametrize("value", ["ten", "-1", "nan"])
+def test_invalid_ttl(value: str, capsys: pytest.CaptureFixture) -> None:
+    with pytest.raises(SystemExit):
+        Inventory("AWS", "default:eu-west-1", ttl=value)
+    assert f"[ERROR] ttl={value}:" in capsys.readouterr().out
+
+
+def test_invalid_ttl_variable(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    monkeypatch.setenv("CLVM_INVENTORY_TTL", "10m")
+    with pytest.raises(SystemExit):
+        Inventory("AWS", "default:eu-west-1")
+    assert "[ERROR] CLVM_INVENTORY_TTL=10m:" in capsys.readouterr().out
+
+
+def test_outdated_listing(_cache: Dict[str, List]) -> None:
+    lister = _Lister("alpha")
+    instances = Inventory("GCP", "project")
+    assert instances.outdated  # nothing listed yet
+    instances.get("alpha", lister)
+    assert not instances.outdated
+    _cache["inventory:GCP:project"][1] -= 60
+    cached = Inventory("GCP", "project", ttl="120")
+    cached.get("alpha", lister)
+    assert not cached.outdated
+    listed = Inventory("GCP", "project", ttl="30")
+    listed.get("alpha", lister)
+    assert not listed.outdated
+    assert lister.calls == 2
+    assert Inventory("GCP", "project", refresh="yes").outdated
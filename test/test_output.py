@@ -0,0 +1,98 @@
+"""
+format=jsonl|csv|tsv streams the records of the listings, without rich
+"""
+
+import importlib
+import json
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from pyclvm._common.output import get_columns, select_columns, write_records
+
+ls_module = importlib.import_module("pyclvm.instance.ls")
+
+_ROWS = [
+    ("i-1", "vm-1", "running", {"Zone": "eu-west-1a", "Private IP": "10.0.0.1"}),
+    ("i-2", "vm, 2", "stopped", {"Zone": "eu-west-1b", "Private IP": ""}),
+]
+
+
+@pytest.fixture
+def provider(monkeypatch: pytest.MonkeyPatch) -> None:
+    provider = SimpleNamespace(list_instances=lambda **kwargs: ("EC2", iter(_ROWS)))
+    monkeypatch.setattr(ls_module, "get_provider", lambda cloud_platform: provider)
+
+
+def test_jsonl(provider: None, capsys: pytest.CaptureFixture) -> None:
+    ls_module._ls("AWS", format="jsonl")
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "id": "i-1",
+            "name": "vm-1",
+            "status": "running",
+            "zone": "eu-west-1a",
+            "private_ip": "10.0.0.1",
+        },
+        {
+            "id": "i-2",
+            "name": "vm, 2",
+            "status": "stopped",
+            "zone": "eu-west-1b",
+            "private_ip": "",
+        },
+    ]
+
+
+def test_csv_and_tsv(provider: None, capsys: pytest.CaptureFixture) -> None:
+    ls_module._ls("AWS", format="csv")
+    assert capsys.readouterr().out.splitlines() == [
+        "id,name,status,zone,private_ip",
+        "i-1,vm-1,running,eu-west-1a,10.0.0.1",
+        'i-2,"vm, 2",stopped,eu-west-1b,',
+    ]
+    ls_module._ls("AWS", format="TSV")
+    assert capsys.readouterr().out.splitlines()[1] == (
+        "i-1\tvm-1\trunning\teu-west-1a\t10.0.0.1"
+    )
+
+
+def test_records_are_flushed_one_by_one(capsys: pytest.CaptureFixture) -> None:
+    def records():
+        yield ["a"]
+        assert capsys.readouterr().out == '{"session_id": "a"}\n'
+        yield ["b"]
+
+    write_records("jsonl", ["SessionId"], records())
+    assert capsys.readouterr().out == '{"session_id": "b"}\n'
+
+
+def test_columns_on_request() -> None:
+    columns = get_columns({"columns": "type, launch_time"})
+    assert columns == ["Type", "Launch Time"]
+    assert select_columns(columns, {"zone": "a", "type": "t3.micro"}) == {
+        "Type": "t3.micro",
+        "Launch Time": "",
+    }
+    with pytest.raises(SystemExit):
+        get_columns({"columns": "cpu"})
+    with pytest.raises(SystemExit):
+        ls_module._ls("AWS", format="yaml")
+
+
+def test_rich_is_not_imported() -> None:
+    code = (
+        "import importlib, sys; from types import SimpleNamespace;"
+        "ls = importlib.import_module('pyclvm.instance.ls');"
+        "provider = SimpleNamespace(list_instances=lambda **kwargs: ('EC2', iter([])));"
+        "ls.get_provider = lambda cloud_platform: provider;"
+        "ls._ls('AWS', format='jsonl');"
+        "print('rich' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,70 @@
+"""
+The default platform is read from the store once, and again only after
+another process has modified the store
+"""
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from pyclvm import plt
+from pyclvm._common import user_data
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    monkeypatch.setattr(user_data, "SYSTEM_CLVM_PATH", tmp_path)
+    monkeypatch.setattr(user_data, "_DATABASE_PATH", tmp_path / "state.db")
+    monkeypatch.setattr(user_data, "_connection", None)
+    yield tmp_path / "state.db"
+    user_data._connection.close()
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    calls: List[str] = []
+
+    def _fetch_settings():
+        calls.append("fetch")
+        return user_data.fetch_settings()
+
+    def _store_setting(name: str, value: str) -> None:
+        calls.append(f"store {name}={value}")
+        user_data.store_setting(name, value)
+
+    monkeypatch.setattr(plt, "fetch_settings", _fetch_settings)
+    monkeypatch.setattr(plt, "store_setting", _store_setting)
+    return calls
+
+
+def test_settings_are_loaded_once(calls: List[str]) -> None:
+    config = plt._PlatformConfig()
+    assert config.platform == "AWS"
+    assert config.platform == "AWS"
+    assert calls == ["fetch"]
+
+
+def test_unchanged_platform_is_not_stored(calls: List[str]) -> None:
+    config = plt._PlatformConfig()
+    config.platform = "AWS"
+    config.platform = "GCP"
+    config.platform = "GCP"
+    # its own writes do not change the data version
+    assert config.platform == "GCP"
+    assert calls == ["fetch", "store platform=GCP"]
+
+
+def test_settings_are_reloaded_when_modified(calls: List[str], store: Path) -> None:
+    config = plt._PlatformConfig()
+    config.platform = "GCP"
+    # another clvm process
+    with closing(sqlite3.connect(store)) as connection, connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO settings VALUES (?, ?)", ("platform", "AZURE")
+        )
+    assert config.platform == "AZURE"
+    assert config.platform == "AZURE"
+    assert calls == ["fetch", "store platform=GCP", "fetch"]
@@ -0,0 +1,92 @@
+"""
+Several instances are started or stopped concurrently on every platform
+"""
+
+import importlib
+from threading import Barrier
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from pyclvm.instance import _process
+
+start_module = importlib.import_module("pyclvm.instance.start")
+
+
+class _Proxy:
+    def __init__(self, name: str, state: str, barrier: Barrier) -> None:
+        self.name = name
+        self.id = f"id-{name}"
+        self.state = state
+        self.barrier = barrier
+        self.timeout = 5.0
+
+    def start(self, wait: bool = True) -> str:
+        self.barrier.wait(timeout=self.timeout)  # all the instances are started at once
+        return f"{self.name} started"
+
+
+class _Mapping:
+    def __init__(self, proxies: Dict[str, _Proxy]) -> None:
+        self.proxies = proxies
+        self.resolved: List[List[str]] = []
+
+    def find_instances(self, instance_names: List[str]) -> None:
+        self.resolved.append(list(instance_names))
+
+    def get(self, instance_name: str) -> Optional[_Proxy]:
+        return self.proxies.get(instance_name)
+
+
+@pytest.fixture
+def mapping(monkeypatch: pytest.MonkeyPatch) -> _Mapping:
+    barrier = Barrier(2)
+    mapping = _Mapping(
+        {
+            "alpha": _Proxy("alpha", "TERMINATED", barrier),
+            "beta": _Proxy("beta", "TERMINATED", barrier),
+            "gamma": _Proxy("gamma", "RUNNING", barrier),
+        }
+    )
+    provider = SimpleNamespace(
+        remote_shell_mapping=lambda **kwargs: mapping,
+        watch_states=lambda **kwargs: lambda instance_ids: {
+            "id-alpha": "STAGING",
+            "id-beta": "STAGING",
+            "id-gamma": "RUNNING",
+        },
+    )
+    monkeypatch.setattr(_process, "get_provider", lambda cloud_platform: provider)
+    monkeypatch.setattr(_process, "_default_platform", lambda **kwargs: "GCP")
+    return mapping
+
+
+def _start(instance_names: Tuple[str, ...], **kwargs: str) -> List:
+    # the GCP handler on the generic executor, the bulk start of GCP is batched
+    return _process.process_instances(
+        start_module._start_instance_gcp, "TERMINATED", instance_names, **kwargs
+    )
+
+
+def test_instances_are_started_concurrently(mapping: _Mapping) -> None:
+    results = _start(("alpha", "beta", "gamma", "delta"), platform="gcp")
+    assert mapping.resolved == [["alpha", "beta", "gamma", "delta"]]
+    assert [result[:3] for result in results] == [
+        ("alpha", "TERMINATED", "STAGING"),
+        ("beta", "TERMINATED", "STAGING"),
+        ("gamma", "RUNNING", "RUNNING"),
+        ("delta", None, None),
+    ]
+    assert results[3].error == "RuntimeError: No such instance registered"
+    assert all(result.error is None for result in results[:3])
+
+
+def test_workers_are_bounded(mapping: _Mapping) -> None:
+    # a single worker would wait for the second start forever
+    for proxy in mapping.proxies.values():
+        proxy.timeout = 0.2
+    results = _start(("alpha", "beta"), platform="gcp", workers="1")
+    assert all("BrokenBarrierError" in result.error for result in results)
+    with pytest.raises(SystemExit):
+        _start(("alpha", "beta"), platform="gcp", workers="none")
@@ -0,0 +1,100 @@
+"""
+The cloud platform implementations are imported on the first request for them
+"""
+
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pyclvm._common import providers
+
+# executed in a fresh interpreter, so that nothing is imported yet
+_PROBE = """
+import json
+import sys
+
+import pyclvm.instance.ls
+import pyclvm.instance.start
+from pyclvm._common.providers import get_loaded_providers, get_provider
+
+def _sdks():
+    return sorted(
+        name
+        for name in ("boto3", "google.cloud.compute_v1", "azure.identity")
+        if name in sys.modules
+    )
+
+before = (get_loaded_providers(), _sdks())
+provider = get_provider("aws")
+print(json.dumps({
+    "before": before,
+    "after": (get_loaded_providers(), _sdks()),
+    "module": provider.__name__,
+}))
+"""
+
+# the functions the commands call on every platform
+_PROTOCOL = {
+    "remote_shell_mapping",
+    "list_instances",
+    "watch_states",
+    "select_instances",
+    "tunnel_target",
+    "expire_listings",
+    "reset_sessions",
+    "is_auth_error",
+}
+
+
+def test_provider_is_imported_on_request() -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    probe = json.loads(result.stdout.splitlines()[-1])
+    assert probe["before"] == [[], []]
+    assert probe["after"] == [["AWS"], ["boto3"]]
+    assert probe["module"] == "pyclvm._common.provider_aws"
+
+
+def test_unknown_platform() -> None:
+    with pytest.raises(KeyError):
+        providers.get_provider("oci")
+
+
+def _get_all(module: str) -> List[str]:
+    # read from the source, importing the providers would import the SDKs
+    file_name = Path(providers.__file__).with_name(f"{module.rpartition('.')[2]}.py")
+    for node in ast.parse(file_name.read_text()).body:
+        if isinstance(node, ast.Assign) and node.targets[0].id == "__all__":
+            return [element.value for element in node.value.elts]
+    return []
+
+
+@pytest.mark.parametrize("cloud_platform", sorted(providers._PROVIDERS))
+def test_providers_share_the_protocol(cloud_platform: str) -> None:
+    assert _PROTOCOL <= set(_get_all(providers._PROVIDERS[cloud_platform]))
+
+
+def test_auth_failure_is_found_in_the_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    from botocore.exceptions import ClientError
+
+    from pyclvm._common import provider_aws
+
+    monkeypatch.setattr(providers, "get_loaded_providers", lambda: ["AWS"])
+    expired = ClientError({"Error": {"Code": "ExpiredToken"}}, "DescribeInstances")
+    missing = ClientError({"Error": {"Code": "InvalidInstanceID.NotFound"}}, "Start")
+    assert provider_aws.is_auth_error(expired)
+    assert not providers.is_auth_failure(missing)
+    try:
+        try:
+            raise expired
+        except ClientError:
+            sys.exit(0)  # as the login callbacks do
+    except SystemExit as err:
+        assert providers.is_auth_failure(err)
@@ -0,0 +1,64 @@
+"""
+The minimal `clvm-proxy` entry point of the SSH ProxyCommand
+"""
+
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pyclvm import _proxy
+from pyclvm.ssh import new
+
+
+def test_parse_args() -> None:
+    assert _proxy._parse_args(
+        ["vm-1", "22", "profile=dev", "platform=AWS", "key-file=/tmp/a=b"]
+    ) == (
+        "vm-1",
+        22,
+        {"profile": "dev", "platform": "AWS", "key_file": "/tmp/a=b"},
+    )
+
+
+@pytest.mark.parametrize("args", [[], ["vm-1"], ["vm-1", "%p"]])
+def test_usage(
+    args: List[str], monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    monkeypatch.setattr(sys, "argv", ["clvm-proxy", *args])
+    with pytest.raises(SystemExit) as exit_info:
+        _proxy.main()
+    assert exit_info.value.code == 2
+    assert capsys.readouterr().err.strip() == _proxy._USAGE
+
+
+def test_main_starts_the_tunnel(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: List[tuple] = []
+
+    def _start(instance_name: str, port: int, **kwargs: str) -> None:
+        calls.append((instance_name, port, kwargs))
+
+    monkeypatch.setattr(_proxy, "start", _start)
+    monkeypatch.setattr(sys, "argv", ["clvm-proxy", "vm-1", "0", "platform=AZURE"])
+    _proxy.main()
+    assert calls == [("vm-1", 0, {"platform": "AZURE"})]
+
+
+def _set_main(monkeypatch: pytest.MonkeyPatch, main: Path) -> None:
+    monkeypatch.setattr(new, "_OS", "Linux")
+    monkeypatch.setattr(sys.modules["__main__"], "__file__", str(main), raising=False)
+
+
+def test_proxy_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "clvm-proxy").touch()
+    _set_main(monkeypatch, tmp_path / "clvm")
+    assert new._get_proxy_command() == str(tmp_path / "clvm-proxy")
+
+
+def test_proxy_command_fallback(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # running from sources, the console script is not installed
+    _set_main(monkeypatch, tmp_path / "clvm")
+    assert new._get_proxy_command() == f"{tmp_path / 'clvm'} ssh start"
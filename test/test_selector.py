@@ -0,0 +1,123 @@
+"""
+The instances of `selector=` are started, stopped or sent commands with the named ones
+"""
+
+import importlib
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from pyclvm._common import provider_aws
+from pyclvm.instance import _process
+
+command_module = importlib.import_module("pyclvm.instance.command")
+
+
+class _Client:
+    def __init__(self, *names: str) -> None:
+        self.names = names or ("web-1", "web-2")
+        self.params: List[Dict] = []
+
+    def get_paginator(self, operation: str) -> "_Client":
+        return self
+
+    def paginate(self, **params: Any) -> Iterator[Dict]:
+        self.params.append(params)
+        yield {
+            "Reservations": [
+                {
+                    "Instances": [
+                        {
+                            "InstanceId": f"i-{name}",
+                            "State": {"Name": "running"},
+                            "InstanceType": "t3.micro",
+                            "Placement": {"AvailabilityZone": "a"},
+                            "LaunchTime": None,
+                            "Tags": [{"Key": "Name", "Value": name}] if name else [],
+                        }
+                        for name in self.names
+                    ]
+                }
+            ]
+        }
+
+
+@pytest.fixture
+def selected(monkeypatch: pytest.MonkeyPatch) -> List[Dict]:
+    calls: List[Dict] = []
+
+    def select_instances(**kwargs: str) -> List[str]:
+        calls.append(kwargs)
+        return ["web-1", "web-2"] if kwargs["selector"] == "team=ml" else []
+
+    provider = SimpleNamespace(select_instances=select_instances)
+    monkeypatch.setattr(_process, "get_provider", lambda cloud_platform: provider)
+    monkeypatch.setattr(_process, "_default_platform", lambda **kwargs: "AWS")
+    return calls
+
+
+def test_tags_are_filtered_by_the_service(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _Client()
+    monkeypatch.setattr(provider_aws, "get_client", lambda service, kwargs: client)
+    names = provider_aws.select_instances(selector="team=ml,env=dev", states="running")
+    assert names == ["web-1", "web-2"]
+    assert client.params[0]["Filters"] == [
+        {"Name": "instance-state-name", "Values": ["running"]},
+        {"Name": "tag:team", "Values": ["ml"]},
+        {"Name": "tag:env", "Values": ["dev"]},
+    ]
+
+
+def test_terminated_and_unnamed_instances_are_not_selected(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    client = _Client("web-1", "", "web-2", "web-1")
+    monkeypatch.setattr(provider_aws, "get_client", lambda service, kwargs: client)
+    assert provider_aws.select_instances(selector="team=ml") == ["web-1", "web-2"]
+    assert client.params[0]["Filters"][0] == {
+        "Name": "instance-state-name",
+        "Values": ["pending", "running", "shutting-down", "stopping", "stopped"],
+    }
+    assert "2 instances are named web-1" in capsys.readouterr().out
+
+
+def test_selected_instances_are_added(selected: List[Dict]) -> None:
+    assert _process.select_instances(("db", "web-1")) == ("db", "web-1")
+    assert not selected
+    assert _process.select_instances(("db", "web-1"), selector="team=ml") == (
+        "db",
+        "web-1",
+        "web-2",
+    )
+    assert _process.select_instances((), selector="team=none") == ()
+
+
+def test_command_is_sent_to_the_selected_instances(
+    selected: List[Dict], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    processed = []
+    monkeypatch.setattr(
+        command_module,
+        "process_instances",
+        lambda func, state, instance_names, **kwargs: processed.append(
+            (instance_names, kwargs["script"])
+        ),
+    )
+    monkeypatch.setattr(command_module, "_default_platform", lambda **kwargs: "AWS")
+    command_module.command("uptime", selector="team=ml", platform="aws")
+    command_module.command("db", "uptime", platform="aws")
+    # the former keyword of the commands
+    command_module.command("db", script="uptime", platform="aws")
+    command_module.command(script="uptime", selector="team=ml")
+    assert command_module.command("uptime", selector="team=none") is None
+    assert processed == [
+        (("web-1", "web-2"), "uptime"),
+        (("db",), "uptime"),
+        (("db",), "uptime"),
+        (("web-1", "web-2"), "uptime"),
+    ]
+    with pytest.raises(SystemExit):
+        command_module.command("uptime")
+    with pytest.raises(SystemExit):
+        command_module.command(script="uptime")
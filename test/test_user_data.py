@@ -0,0 +1,134 @@
+"""
+The local state store, and the import of the JSON files of the previous versions
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List
+
+import pytest
+
+from pyclvm._common import user_data
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    monkeypatch.setattr(user_data, "SYSTEM_CLVM_PATH", tmp_path / "clvm")
+    monkeypatch.setattr(user_data, "_DATABASE_PATH", tmp_path / "clvm" / "state.db")
+    monkeypatch.setattr(user_data, "_SYSTEM_SSM_PATH", tmp_path / "ssm")
+    monkeypatch.setattr(user_data, "_connection", None)
+    yield tmp_path
+    if user_data._connection:
+        user_data._connection.close()
+
+
+def test_credentials() -> None:
+    user_data.store_credentials(
+        "aws-dev-credentials", {"AccessKeyId": "key"}, "2030-01-01T00:00:00+00:00"
+    )
+    assert user_data.fetch_credentials("aws-dev-credentials").AccessKeyId == "key"
+    assert user_data.remove_credentials("aws-dev-credentials")
+    assert not user_data.remove_credentials("aws-dev-credentials")
+    assert user_data.fetch_credentials("aws-dev-credentials") is None
+
+
+def test_lock(store: Path) -> None:
+    events: List[str] = []
+
+    def _wait_for_lock() -> None:
+        with user_data.lock("aws-dev-credentials"):
+            events.append("second")
+
+    with user_data.lock("aws-dev-credentials"):
+        thread = threading.Thread(target=_wait_for_lock)
+        thread.start()
+        time.sleep(0.2)
+        events.append("first")
+    thread.join(timeout=5)
+    assert events == ["first", "second"]
+    assert (store / "clvm" / "aws-dev-credentials.lock").exists()
+
+
+def _check_settings() -> Any:
+    return user_data.fetch_settings() == {"platform": "GCP"}
+
+
+def _check_azure_token() -> Any:
+    return user_data.fetch_credentials("azure-token").expires_on == 1700000000
+
+
+def _check_credentials() -> Any:
+    return user_data.fetch_credentials("aws-dev-credentials").AccessKeyId == "key"
+
+
+def _check_redirect() -> Any:
+    return user_data.fetch_redirect("aws-dev-vm-8080=8081") == {
+        "pid": 42,
+        "session_id": "session",
+    }
+
+
+@pytest.mark.parametrize(
+    "directory, file_name, data, check",
+    [
+        ("clvm", ".cache.json", {"platform": "GCP"}, _check_settings),
+        ("clvm", "token.json", ["token", 1700000000], _check_azure_token),
+        (
+            "clvm",
+            "aws-dev-credentials.json",
+            {"AccessKeyId": "key", "Expiration": "2030-01-01T00:00:00+00:00"},
+            _check_credentials,
+        ),
+        (
+            "clvm",
+            "aws-dev-vm-8080=8081.json",
+            {"pid": 42, "session_id": "session"},
+            _check_redirect,
+        ),
+        (
+            "ssm",
+            "aws-dev-vm-8080=8081.json",
+            {"pid": 42, "session_id": "session"},
+            _check_redirect,
+        ),
+        # the command index is rebuilt, not imported
+        (
+            "clvm",
+            "commands.json",
+            {},
+            lambda: user_data.fetch_cache("commands") is None,
+        ),
+    ],
+)
+def test_migration(
+    store: Path,
+    directory: str,
+    file_name: str,
+    data: Any,
+    check: Callable[[], Any],
+) -> None:
+    file_path = store / directory / file_name
+    file_path.parent.mkdir()
+    file_path.write_text(json.dumps(data))
+    assert check()
+    assert not file_path.exists()
+
+
+def test_broken_file_is_left(store: Path) -> None:
+    file_path = store / "ssm" / "aws-dev-vm-8080=8081.json"
+    file_path.parent.mkdir()
+    file_path.write_text("{")
+    assert user_data.fetch_redirect("aws-dev-vm-8080=8081") is None
+    assert file_path.exists()
+
+
+def test_migration_runs_once(store: Path) -> None:
+    assert user_data.fetch_settings() == {}
+    file_path = store / "clvm" / ".cache.json"
+    file_path.write_text(json.dumps({"platform": "GCP"}))
+    user_data._connection.close()
+    user_data._connection = None
+    assert user_data.fetch_settings() == {}
+    assert file_path.exists()